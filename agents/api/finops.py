@@ -0,0 +1,40 @@
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, HTTPException, Query
+
+from agents.helpers.finops_persistence import get_rolling_percentiles, merge_exports
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/finops", tags=["finops"])
+
+
+@router.get("/percentiles")
+async def get_percentiles(
+    window: Optional[int] = Query(None, description="Janela em minutos (ex.: 1, 5, 60). Sem valor, retorna todas."),
+    sketches: bool = Query(False, description="Retorna os sketches serializados, para combinar vários workers.")
+) -> dict:
+    """Percentis de latência e tokens de todas as sessões deste processo, em janelas móveis."""
+    rolling = get_rolling_percentiles()
+    if rolling is None:
+        raise HTTPException(status_code=404, detail="Percentis desabilitados (FINOPS_ROLLING_ENABLED=false).")
+
+    payload = rolling.export() if sketches else rolling.snapshot()
+    if window is not None:
+        if str(window) not in payload["windows"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Janela {window} não configurada. Disponíveis: {rolling.windows_minutes}"
+            )
+        payload["windows"] = {str(window): payload["windows"][str(window)]}
+    return payload
+
+
+@router.post("/percentiles/merge")
+async def merge_percentiles(exports: List[dict] = Body(...)) -> dict:
+    """Combina as respostas de `/finops/percentiles?sketches=true` de vários workers."""
+    try:
+        return merge_exports(exports)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Sketches inválidos: {e}")
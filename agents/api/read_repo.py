@@ -0,0 +1,22 @@
+import asyncio
+
+from fastapi import APIRouter
+
+from catalog.tools.read_repo.context_cache import get_context_cache
+from catalog.tools.read_repo.mirror import get_mirror_cache
+from catalog.tools.read_repo.search import get_index_store
+
+router = APIRouter(prefix="/read_repo", tags=["read_repo"])
+
+
+@router.get("/cache/stats")
+async def get_cache_stats() -> dict:
+    """Estatísticas do cache de contexto empacotado, do cache de mirrors e dos índices de busca deste processo."""
+    context_cache = get_context_cache()
+    mirror_cache = get_mirror_cache()
+    return {
+        # Lista o diretório do cache: fora do event loop
+        "context": await asyncio.to_thread(context_cache.snapshot) if context_cache else None,
+        "mirrors": dict(mirror_cache.stats) if mirror_cache else None,
+        "search_index": dict(get_index_store().stats),
+    }
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict
+from fastapi import APIRouter, HTTPException
+
+from agents.helpers import metrics
+from agents.helpers.finops_callbacks import get_finops_service
+from agents.helpers.finops_persistence import ContentStore, FinopsReport, get_rolling_percentiles
+from catalog.callbacks.translate_thought.thought_store import StoredThought, get_thought_store
+from catalog.callbacks.translate_thought.translator import TranslationResult, translate_texts
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/thoughts", tags=["thoughts"])
+
+# Traduções em andamento por handle, para que pedidos simultâneos compartilhem uma chamada
+_inflight: Dict[str, "asyncio.Task[TranslationResult]"] = {}
+
+
+def _persist_translation_report(entry: StoredThought, result: TranslationResult) -> None:
+    """Envia o relatório FinOps da tradução sob demanda direto ao serviço de persistência."""
+    usage_meta = result.usage_metadata
+    report = FinopsReport(
+        user_id=entry.user_id,
+        session_id=entry.session_id,
+        invocation_id=entry.invocation_id,
+        agent_app_name=os.getenv("AGENT_APP_NAME", "default_agent_app"),
+        agent_base_url=os.getenv("AGENT_BASE_URL", "http://localhost"),
+        user_prompt=result.original_text,
+        agent_response=result.translated_text,
+        model_name=entry.model,
+        prompt_token_count=getattr(usage_meta, "prompt_token_count", 0) or 0,
+        candidates_token_count=getattr(usage_meta, "candidates_token_count", 0) or 0,
+        total_token_count=getattr(usage_meta, "total_token_count", 0) or 0,
+        execution_time_ms=result.duration_ms,
+        interaction_timestamp=datetime.now(timezone.utc).isoformat(),
+        interaction_kind="translation" if result.outcome == "translated" else f"translation_{result.outcome}"
+    )
+    rolling = get_rolling_percentiles()
+    if rolling:
+        rolling.add([report])
+
+    service = get_finops_service()
+    if not service:
+        return
+
+    contents = ContentStore()
+    contents.put(result.original_text)
+    contents.put(result.translated_text)
+    service.save_report(report, contents.drain())
+
+
+async def _translate_entry(entry: StoredThought) -> TranslationResult:
+    results = await translate_texts([entry.text], entry.model)
+    result = results[0]
+    metrics.TRANSLATION_CALLS.inc((entry.model, result.outcome))
+    metrics.TRANSLATION_DURATION.observe(result.duration_ms / 1000.0, (entry.model,))
+
+    if result.accounted:
+        get_thought_store().set_translation(entry.handle, result.translated_text)
+        try:
+            await asyncio.to_thread(_persist_translation_report, entry, result)
+        except Exception as e:
+            logger.warning(f"[FinOps] Falha ao registrar tradução sob demanda: {e}")
+
+    return result
+
+
+@router.get("/{handle}/translation")
+async def get_thought_translation(handle: str) -> dict:
+    """Traduz sob demanda um pensamento guardado pelo translate_thought em modo lazy."""
+    entry = get_thought_store().get(handle)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Pensamento '{handle}' não encontrado ou expirado.")
+
+    if entry.translated_text is not None:
+        return {
+            "handle": handle,
+            "original_text": entry.text,
+            "translated_text": entry.translated_text,
+            "model": entry.model,
+            "memoized": True
+        }
+
+    task = _inflight.get(handle)
+    if task is None:
+        task = asyncio.create_task(_translate_entry(entry))
+        _inflight[handle] = task
+        task.add_done_callback(lambda _: _inflight.pop(handle, None))
+
+    result = await asyncio.shield(task)
+    return {
+        "handle": handle,
+        "original_text": entry.text,
+        "translated_text": result.translated_text,
+        "model": entry.model,
+        "memoized": False
+    }
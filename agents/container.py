@@ -43,7 +43,7 @@ class Container:
         tools_config = self.config.get("tools", [])
         github_config = None
         for tool in tools_config:
-            if tool.get("kind") == PreBuiltTools.READ_REPO_CONTEXT:
+            if tool.get("kind") in (PreBuiltTools.READ_REPO_CONTEXT, PreBuiltTools.READ_REPO_PAGE, PreBuiltTools.SEARCH_REPO):
                 github_config = tool
         
         if github_config is None:
@@ -6,10 +6,16 @@ from google.adk.planners import BuiltInPlanner
 from google.genai import types
 
 from agents.core.domain.agent.enums import AgentFlowType, CallbackType
-from agents.helpers import hooks, finops_callbacks
+from agents.helpers import hooks, finops_callbacks, metrics, waterfall
+from agents.helpers.finops_persistence import register_sampling_policy
 from agents.core.adapters.agent_builder.adk_tools_builder import ADKToolsBuilder
 from agents.utils import prompt_functions
 from catalog.tools.datetime import get_current_datetime
+from catalog.callbacks.tool_metrics import (
+    before_tool_metrics_callback,
+    after_tool_metrics_callback,
+    on_tool_error_metrics_callback
+)
 from .model_builder import ModelBuilder
 from agents.core.domain.exceptions import (
     AgentConfigurationError,
@@ -20,6 +26,8 @@ from agents.core.domain.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+ON_TOOL_ERROR_CALLBACK = "on_tool_error_callback"
+
 class ADKAgentBuilder:
     def __init__(self, config):
         if not config:
@@ -69,6 +77,7 @@ class ADKAgentBuilder:
                 agent_tools_names = agent_tools_names
             )
 
+            self._register_finops_sampling(agent_config)
             agent = self._create_adk_llm_agent(
                 name = agent_config.get("name"),
                 model = agent_config.get("model"),
@@ -100,6 +109,7 @@ class ADKAgentBuilder:
                     agent_tools_names = agent_config.get("tools", [])
                 )
 
+                self._register_finops_sampling(agent_config)
                 agent = self._create_adk_llm_agent(
                     name = agent_config.get("name"), 
                     model = agent_config.get("model"), 
@@ -118,6 +128,7 @@ class ADKAgentBuilder:
             model_builder = ModelBuilder(hierarchical_config.get("generate_content_config"))
             content_config = model_builder.model_generate_configuration()
             resolved_callbacks = self._configure_callbacks(hierarchical_config.get("callbacks"))
+            self._register_finops_sampling(hierarchical_config)
 
             coordinator_agent = Agent(
                 name = hierarchical_config.get("name"),
@@ -163,6 +174,7 @@ class ADKAgentBuilder:
                     agent_tools_names=agent_config.get("tools", [])
                 )
 
+                self._register_finops_sampling(agent_config)
                 agent = self._create_adk_llm_agent(
                     name = agent_config.get("name"), 
                     model = agent_config.get("model"), 
@@ -231,14 +243,19 @@ class ADKAgentBuilder:
             logger.error(f"Erro ao instanciar Agent '{name}': {e}")
             raise AgentCreationError(f"Falha na instanciação do agente '{name}': {e}") from e
     
+    def _register_finops_sampling(self, agent_config: dict) -> None:
+        """Registra a política de amostragem FinOps (bloco `finops.sampling`) do agente."""
+        finops_config = agent_config.get("finops") or {}
+        register_sampling_policy(agent_config.get("name"), finops_config.get("sampling"))
+
     def _configure_callbacks(self, callbacks_config: Optional[dict]) -> Dict[str, List[Any]]:
         try:
             callbacks = {
                 CallbackType.BEFORE_AGENT.value: [],
                 CallbackType.BEFORE_MODEL.value: [finops_callbacks.finops_before_model_callback],
-                CallbackType.BEFORE_TOOL.value: [hooks.inject_log_before_tool_callback],
+                CallbackType.BEFORE_TOOL.value: [hooks.inject_log_before_tool_callback, before_tool_metrics_callback],
                 CallbackType.AFTER_MODEL.value: [hooks.translate_thought, finops_callbacks.collect_finops_metrics],
-                CallbackType.AFTER_TOOL.value: [],
+                CallbackType.AFTER_TOOL.value: [after_tool_metrics_callback],
                 CallbackType.AFTER_AGENT.value: [finops_callbacks.persist_finops_metrics]
             }
 
@@ -249,7 +266,28 @@ class ADKAgentBuilder:
                         resolved = self._resolve_callbacks(callbacks_config[key], callback_type)
                         callbacks[key].extend(resolved)
             
-            return callbacks
+            # Cada callback tem seu tempo medido em adk_callback_duration_seconds (/metrics)
+            resolved = {
+                key: [metrics.timed_callback(callback, key) for callback in registered]
+                for key, registered in callbacks.items()
+            }
+
+            # Spans do waterfall: abrem depois dos demais "before" e fecham antes dos demais "after",
+            # medindo só o agente, o modelo e a tool (os callbacks têm spans próprios)
+            resolved[CallbackType.BEFORE_AGENT.value].insert(0, waterfall.waterfall_before_agent)
+            resolved[CallbackType.AFTER_AGENT.value].append(waterfall.waterfall_after_agent)
+            resolved[CallbackType.BEFORE_MODEL.value].append(waterfall.waterfall_before_model)
+            resolved[CallbackType.AFTER_MODEL.value].insert(0, waterfall.waterfall_after_model)
+            resolved[CallbackType.BEFORE_TOOL.value].append(waterfall.waterfall_before_tool)
+            resolved[CallbackType.AFTER_TOOL.value].insert(0, waterfall.waterfall_after_tool)
+
+            # Tools que lançam exceção não passam pelo after_tool; versões do ADK sem este campo ficam sem a medição
+            if ON_TOOL_ERROR_CALLBACK in Agent.model_fields:
+                resolved[ON_TOOL_ERROR_CALLBACK] = [
+                    waterfall.waterfall_on_tool_error,
+                    metrics.timed_callback(on_tool_error_metrics_callback, ON_TOOL_ERROR_CALLBACK)
+                ]
+            return resolved
         except CallbackResolutionError:
             raise
         except Exception as e:
@@ -66,7 +66,10 @@ class ADKToolsBuilder:
     def _get_pre_built_tool(self, tool_name: str, params: dict) -> FunctionTool:
         try:
             pre_built_functions_map: dict[str, Callable[[dict], FunctionTool]] = {
-                PreBuiltTools.READ_REPO_CONTEXT: lambda _: pre_built_functions.read_repo_context,
+                PreBuiltTools.READ_REPO_CONTEXT: pre_built_functions.read_repo_context_with_params,
+                PreBuiltTools.READ_REPO_PAGE: pre_built_functions.read_repo_page_with_params,
+                PreBuiltTools.SEARCH_REPO: pre_built_functions.search_repo_with_params,
+                PreBuiltTools.READ_FILE: lambda _: pre_built_functions.read_file,
                 PreBuiltTools.SEND_EMAIL: lambda _: catalog_send_email.send_email_tool,
                 PreBuiltTools.GOOGLE_SEARCH: lambda _: adk_pre_built_tools.search_agent_tool,
                 PreBuiltTools.GET_DATETIME: lambda _: prompt_functions.get_current_datetime,
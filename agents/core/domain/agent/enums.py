@@ -16,6 +16,9 @@ class ToolsType(str, Enum):
 class PreBuiltTools(str, Enum):
     """Tipos de ferramentas pré-construídas."""
     READ_REPO_CONTEXT = "read_repo_context"
+    READ_REPO_PAGE = "read_repo_page"
+    SEARCH_REPO = "search_repo"
+    READ_FILE = "read_file"
     GOOGLE_SEARCH = "SearchAgent"
     SEND_EMAIL = "send_email_tool"
     GET_DATETIME = "get_current_datetime"
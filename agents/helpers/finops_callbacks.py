@@ -1,5 +1,4 @@
 import logging
-import json
 import os
 import time
 from datetime import datetime, timezone
@@ -10,8 +9,17 @@ from google.adk.agents.callback_context import CallbackContext
 from agents.helpers.finops_persistence import (
     FinopsPersistenceService, 
     PersistenceFactory,
-    FinopsReport
+    FinopsReport,
+    InvocationAccumulator,
+    get_invocation_accumulator,
+    release_invocation_accumulator,
+    get_rollup_aggregator,
+    get_rolling_percentiles,
+    get_report_sampler,
+    ContentStore
 )
+from catalog.callbacks.finops_persistence.accumulator import ModelCallFrame
+from agents.helpers import metrics, waterfall
 
 logger = logging.getLogger(__name__)
 
@@ -36,20 +44,11 @@ def finops_before_model_callback(
     llm_request: LlmRequest
 ) -> Optional[LlmRequest]:
     """
-    Captures initial metrics and snapshots usage state before the model call.
+    Captures initial metrics and snapshots usage counters before the model call.
+    Everything is kept in the invocation accumulator; no session state is written.
     """
     try:
-        # 1. Capture Start Time for Latency Calculation
-        callback_context.state["temp:finops_start_time"] = time.time()
-
-        # 2. Snapshot current side-channel usage stats
-        state_dict = callback_context.state.to_dict()
-        current_stats = state_dict.get("model_usage_stats", {})
-        
-        snapshot_json = json.dumps(current_stats)
-        callback_context.state["temp:finops_pre_usage"] = snapshot_json
-        
-        # 3. Capture basic request metadata
+        # 1. Capture basic request metadata
         model_name = "unknown_model"
         full_input = "N/A"
         
@@ -62,29 +61,28 @@ def finops_before_model_callback(
             if hasattr(last_content, 'parts') and last_content.parts:
                 full_input = "".join([p.text for p in last_content.parts if hasattr(p, 'text') and p.text])
         
-        callback_context.state["temp:finops_model_name"] = model_name
-        callback_context.state["temp:finops_user_prompt"] = full_input
+        # 2. Open the model call frame (start time + usage snapshot)
+        accumulator = get_invocation_accumulator(callback_context.invocation_id)
+        accumulator.begin_model_call(callback_context.agent_name, model_name, full_input)
 
     except Exception as e:
         logger.error(f"[FinOps] Before-callback failed: {e}", exc_info=True)
     
     return None 
 
-def _get_base_context_data(callback_context: CallbackContext) -> Dict[str, Any]:
+def _get_base_context_data(
+    callback_context: CallbackContext,
+    frame: Optional[ModelCallFrame]
+) -> Dict[str, Any]:
     """Extracts common context data used for all reports."""
-    state_dict = callback_context.state.to_dict()
     end_time = time.time()
-    
-    start_time_val = callback_context.state.get("temp:finops_start_time")
-    try:
-        start_time = float(start_time_val) if start_time_val else end_time
-    except (ValueError, TypeError):
-        start_time = end_time
+    start_time = frame.start_time if frame else end_time
     
     return {
         "execution_time_ms": (end_time - start_time) * 1000.0,
-        "model_name": state_dict.get("temp:finops_model_name") or "unknown_model",
-        "user_prompt": state_dict.get("temp:finops_user_prompt", "N/A"),
+        "model_name": (frame.model_name if frame else None) or "unknown_model",
+        "user_prompt": frame.user_prompt if frame else "N/A",
+        "agent_name": callback_context.agent_name,
         "user_id": callback_context._invocation_context.session.user_id,
         "session_id": callback_context._invocation_context.session.id,
         "agent_app_name": os.getenv("AGENT_APP_NAME", "default_agent_app"),
@@ -115,16 +113,32 @@ def _extract_usage_metrics(llm_response: LlmResponse) -> Dict[str, int]:
             
     return metrics
 
+def _observe_model_call(base_data: Dict[str, Any], usage: Dict[str, int], had_error: bool) -> None:
+    """Updates the /metrics counters of the model call."""
+    labels = (base_data["agent_name"], base_data["model_name"])
+    metrics.MODEL_CALLS.inc(labels)
+    metrics.MODEL_CALL_DURATION.observe(base_data["execution_time_ms"] / 1000.0, labels)
+    if had_error:
+        metrics.MODEL_ERRORS.inc(labels)
+    for kind in ("prompt", "candidates", "thoughts", "cache"):
+        if usage[kind]:
+            metrics.MODEL_TOKENS.inc(labels + (kind,), usage[kind])
+
 def _create_main_report(
     base_data: Dict[str, Any], 
     usage: Dict[str, int], 
-    llm_response: LlmResponse
+    llm_response: LlmResponse,
+    contents: ContentStore
 ) -> FinopsReport:
     """Creates the primary report for the model interaction."""
     agent_response_text = "N/A"
     if hasattr(llm_response, 'content') and llm_response.content and llm_response.content.parts:
          agent_response_text = "\n\n".join([p.text for p in llm_response.content.parts if hasattr(p, 'text') and p.text])
 
+    # Full texts are kept once in the content store; the report carries previews
+    user_prompt_hash = contents.put(base_data["user_prompt"])
+    agent_response_hash = contents.put(agent_response_text)
+
     return FinopsReport(
         user_id=base_data["user_id"],
         agent_base_url=base_data["agent_base_url"],
@@ -133,6 +147,10 @@ def _create_main_report(
         invocation_id=base_data["invocation_id"],
         user_prompt=base_data["user_prompt"],
         agent_response=agent_response_text,
+        user_prompt_hash=user_prompt_hash,
+        user_prompt_chars=len(base_data["user_prompt"]) if user_prompt_hash else 0,
+        agent_response_hash=agent_response_hash,
+        agent_response_chars=len(agent_response_text) if agent_response_hash else 0,
         thoughts_token_count=usage["thoughts"],
         prompt_token_count=usage["prompt"],
         candidates_token_count=usage["candidates"],
@@ -141,11 +159,13 @@ def _create_main_report(
         interaction_timestamp=base_data["interaction_timestamp"],
         execution_time_ms=base_data["execution_time_ms"],
         model_name=base_data["model_name"],
-        interaction_kind="agent"
+        interaction_kind="agent",
+        agent_name=base_data["agent_name"]
     )
 
 def _process_side_channels(
-    callback_context: CallbackContext,
+    accumulator: InvocationAccumulator,
+    frame: Optional[ModelCallFrame],
     base_data: Dict[str, Any],
     main_report: FinopsReport,
     buffer: List[FinopsReport]
@@ -154,24 +174,26 @@ def _process_side_channels(
     Handles explicit side-channel reports and calculates generic deltas 
     for unaccounted usage.
     """
-    state_dict = callback_context.state.to_dict()
+    if frame is None:
+        return
+
     reported_side_usage: Dict[str, int] = {} 
 
     # 1. Handle Explicit Side Reports (e.g., Translations)
-    side_reports: List[FinopsReport] = state_dict.get("temp:finops_side_reports", [])
-    for report in side_reports:
+    for report in frame.side_reports:
         # Enrich context
         if not report.user_id: report.user_id = base_data["user_id"]
         if not report.session_id: report.session_id = base_data["session_id"]
         if not report.invocation_id: report.invocation_id = base_data["invocation_id"]
         if not report.agent_app_name: report.agent_app_name = base_data["agent_app_name"]
         if not report.agent_base_url: report.agent_base_url = base_data["agent_base_url"]
+        if not report.agent_name: report.agent_name = base_data["agent_name"]
         
         # Enrich prompt/response if missing
-        if report.user_prompt == "N/A": 
-            report.user_prompt = base_data["user_prompt"]
+        if report.user_prompt == "N/A":
+            report.copy_prompt_from(main_report)
         if report.agent_response == "N/A":
-            report.agent_response = main_report.agent_response
+            report.copy_response_from(main_report)
         
         buffer.append(report)
         logger.debug(f"[FinOps] Buffered Side Report: {report.model_name} (Kind: {report.interaction_kind})")
@@ -180,19 +202,9 @@ def _process_side_channels(
         reported_side_usage[report.model_name] = current_reported + report.total_token_count
 
     # 2. Calculate Generic Delta (Unaccounted Usage)
-    pre_usage_str = state_dict.get("temp:finops_pre_usage", "{}")
-    pre_usage_snapshot = json.loads(pre_usage_str) if pre_usage_str else {}
-    current_usage_stats = state_dict.get("model_usage_stats", {})
-    
-    for model_key, stats in current_usage_stats.items():
-        pre_stats = pre_usage_snapshot.get(model_key, {"prompt": 0, "candidates": 0, "total": 0})
-        
-        delta_prompt = stats.get("prompt", 0) - pre_stats.get("prompt", 0)
-        delta_candidates = stats.get("candidates", 0) - pre_stats.get("candidates", 0)
-        delta_total = stats.get("total", 0) - pre_stats.get("total", 0)
-        
-        if delta_total > 0:
-            remaining_delta = delta_total
+    for model_key, delta in accumulator.usage_delta(frame).items():
+        if delta.total > 0:
+            remaining_delta = delta.total
             
             # Subtract Main Model Usage
             if (main_report.total_token_count > 0 and 
@@ -203,23 +215,25 @@ def _process_side_channels(
             remaining_delta -= reported_side_usage.get(model_key, 0)
             
             if remaining_delta > 0:
-                ratio = remaining_delta / delta_total
+                ratio = remaining_delta / delta.total
                 
-                buffer.append(FinopsReport(
+                unaccounted = FinopsReport(
                     user_id=base_data["user_id"],
                     agent_base_url=base_data["agent_base_url"],
                     agent_app_name=base_data["agent_app_name"],
                     session_id=base_data["session_id"],
                     invocation_id=base_data["invocation_id"],
-                    user_prompt=base_data["user_prompt"],
-                    agent_response=main_report.agent_response,
                     total_token_count=remaining_delta,
-                    prompt_token_count=int(delta_prompt * ratio),
-                    candidates_token_count=int(delta_candidates * ratio),
+                    prompt_token_count=int(delta.prompt * ratio),
+                    candidates_token_count=int(delta.candidates * ratio),
                     interaction_timestamp=datetime.now(timezone.utc).isoformat(),
                     model_name=model_key,
-                    interaction_kind="unaccounted"
-                ))
+                    interaction_kind="unaccounted",
+                    agent_name=base_data["agent_name"]
+                )
+                unaccounted.copy_prompt_from(main_report)
+                unaccounted.copy_response_from(main_report)
+                buffer.append(unaccounted)
                 logger.debug(f"[FinOps] Buffered Generic Report: {model_key} (Unaccounted)")
 
 def collect_finops_metrics(
@@ -228,40 +242,76 @@ def collect_finops_metrics(
 ) -> Optional[LlmResponse]:
     """
     Aggregates usage and buffers FinOps reports for batch persistence.
+    Partial (streamed) chunks are skipped: usage arrives with the final response.
     """
+    if getattr(llm_response, "partial", False):
+        return None
+
     try:
+        accumulator = get_invocation_accumulator(callback_context.invocation_id)
+        frame = accumulator.end_model_call(callback_context.agent_name)
+
         # 1. Prepare Base Data
-        base_data = _get_base_context_data(callback_context)
+        base_data = _get_base_context_data(callback_context, frame)
         usage_metrics = _extract_usage_metrics(llm_response)
+        if getattr(llm_response, "error_code", None):
+            accumulator.mark_error()
+        _observe_model_call(base_data, usage_metrics, bool(getattr(llm_response, "error_code", None)))
         
         # 2. Main Report
-        main_report = _create_main_report(base_data, usage_metrics, llm_response)
+        main_report = _create_main_report(base_data, usage_metrics, llm_response, accumulator.contents)
         
         # 3. Buffer Management
-        state_dict = callback_context.state.to_dict()
-        buffer: List[FinopsReport] = state_dict.get("finops_reports_buffer", [])
-        buffer.append(main_report)
+        buffer: List[FinopsReport] = [main_report]
         logger.debug(f"[FinOps] Buffered Main Report: {base_data['model_name']}")
 
         # 4. Process Side Channels
         try:
-            _process_side_channels(callback_context, base_data, main_report, buffer)
+            _process_side_channels(accumulator, frame, base_data, main_report, buffer)
         except Exception as e:
              logger.warning(f"[FinOps] Side-channel processing failed: {e}", exc_info=True)
 
-        # 5. Save State & Cleanup
-        callback_context.state["finops_reports_buffer"] = buffer
-        callback_context.state["temp:finops_pre_usage"] = ""
-        callback_context.state["temp:finops_model_name"] = ""
-        callback_context.state["temp:finops_user_prompt"] = ""
-        callback_context.state["temp:finops_start_time"] = ""
-        callback_context.state["temp:finops_side_reports"] = []
+        # 5. Buffer in the invocation accumulator (not in session state)
+        accumulator.add_reports(buffer)
+
+        # Per-minute rollups count every call, whatever is kept as detailed rows
+        rollup = get_rollup_aggregator()
+        if rollup:
+            rollup.add(callback_context.agent_name, buffer)
+
+        # Process-wide percentiles across sessions (/finops/percentiles)
+        rolling = get_rolling_percentiles()
+        if rolling:
+            rolling.add(buffer)
         
     except Exception as e:
         logger.error(f"[FinOps] Metric collection failed: {e}", exc_info=True)
 
     return None
 
+def _collect_finops_metrics_families() -> List[metrics.MetricFamily]:
+    """Queue depth and persistence counters of the FinOps worker, read at scrape time."""
+    service = _finops_service_instance
+    worker = getattr(service, "worker", None) if service else None
+    if worker is None:
+        return []
+
+    stats = worker.stats()
+    return [
+        ("finops_queue_depth", "gauge", "FinOps reports waiting in the persistence queue",
+         [("", {}, stats["queued"])]),
+        ("finops_reports", "counter", "FinOps reports by outcome (enqueued, persisted, dropped, spilled)",
+         [("_total", {"outcome": outcome}, stats[outcome]) for outcome in ("enqueued", "persisted", "dropped", "spilled")]),
+        ("finops_persist_duration_seconds", "summary", "Latency of FinOps batch persistence calls",
+         [("_sum", {}, stats["persist_seconds"]), ("_count", {}, stats["persist_calls"])]),
+    ]
+
+metrics.REGISTRY.register_collector(_collect_finops_metrics_families)
+
+def _is_root_agent(callback_context: CallbackContext) -> bool:
+    agent = getattr(callback_context._invocation_context, "agent", None)
+    return agent is None or getattr(agent, "parent_agent", None) is None
+
 def persist_finops_metrics(
     callback_context: CallbackContext,
     agent_response: Any = None 
@@ -271,8 +321,22 @@ def persist_finops_metrics(
     Registered as an AFTER_AGENT callback.
     """
     try:
-        state_dict = callback_context.state.to_dict()
-        buffer: List[FinopsReport] = state_dict.get("finops_reports_buffer", [])
+        # The root agent finishes last: only then is the invocation's accounting
+        # complete, so sub-agents leave their reports in the accumulator and the
+        # sampling decision is taken once for every row of the invocation
+        if not _is_root_agent(callback_context):
+            return None
+
+        invocation_id = callback_context.invocation_id
+        accumulator = get_invocation_accumulator(invocation_id)
+        buffer: List[FinopsReport] = accumulator.drain_reports()
+        contents = accumulator.contents.drain()
+        release_invocation_accumulator(invocation_id)
+
+        # Per-session rollups close with the invocation, even when no detailed row is kept
+        rollup = get_rollup_aggregator()
+        if rollup:
+            rollup.flush_session(callback_context._invocation_context.session.id)
         
         if not buffer:
             return None
@@ -281,10 +345,12 @@ def persist_finops_metrics(
         
         service = get_finops_service()
         if service:
-            service.save_reports_batch(buffer)
-        
-        # Clear buffer after persistence
-        callback_context.state["finops_reports_buffer"] = []
+            # Sampling only thins the detailed rows; rollups already counted every call
+            sampled = get_report_sampler().sample(
+                buffer, accumulator.had_error, accumulator.latency_ms(), accumulator.total_tokens
+            )
+            with waterfall.span("finops", "save_reports_batch", callback_context.agent_name):
+                service.save_reports_batch(sampled, contents)
         
     except Exception as e:
         logger.error(f"[FinOps] Batch persistence failed: {e}", exc_info=True)
\ No newline at end of file
@@ -1,20 +1,29 @@
 import os
 import logging
-import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional
 from google.adk.tools import BaseTool
 from google.adk.tools.tool_context import ToolContext
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmResponse
 from google.genai import types
-import google.genai as genai
 
 from agents.core.domain.agent.enums import PRE_BUILT_TOOL_VALUES
-from agents.helpers.finops_persistence import FinopsReport
+from agents.helpers import metrics
+from agents.helpers.finops_persistence import FinopsReport, get_invocation_accumulator
+from catalog.callbacks.translate_thought.streaming import (
+    is_partial_response,
+    translate_final_thoughts,
+    translate_partial_thoughts
+)
+from catalog.callbacks.translate_thought.thought_store import get_thought_store, translation_mode
+from catalog.callbacks.translate_thought.translator import TranslationResult
+from catalog.callbacks.tool_metrics import ToolCallStats, register_tool_observer
 
 logger = logging.getLogger(__name__)
 
+THOUGHT_HANDLES_METADATA_KEY = "thought_translation_handles"
+
 def inject_log_before_tool_callback(
     tool: BaseTool,
     args: Dict[str, Any],
@@ -25,96 +34,140 @@ def inject_log_before_tool_callback(
     logger.info(f"[Tool] {agent_name}: Start tool call '{tool_name}'")
     return None
 
-def _translate_to_ptbr(text: str) -> Tuple[str, Optional[types.GenerateContentResponseUsageMetadata], float]:
-    """Traduz text do inglês para português usando Gemini."""
-    if not text or len(text.strip()) < 10:
-        return text, None, 0.0
+def _observe_tool_call(stats: ToolCallStats) -> None:
+    """Atualiza as métricas de tool do /metrics com cada chamada medida pelo tool_metrics."""
+    labels = (stats.agent_name, stats.tool_name)
+    metrics.TOOL_CALLS.inc(labels)
+    metrics.TOOL_CALL_DURATION.observe(stats.duration_ms / 1000.0, labels)
+    metrics.TOOL_OUTPUT_BYTES.inc(labels, stats.output_bytes)
+    if stats.error:
+        metrics.TOOL_ERRORS.inc(labels)
+
+register_tool_observer(_observe_tool_call)
 
+def _register_translation(
+    callback_context: CallbackContext,
+    result: TranslationResult,
+    translation_model: str
+) -> None:
+    """Contabiliza uma tradução (cache hit ou texto já em pt-br) no acumulador FinOps da invocação."""
+    metrics.TRANSLATION_CALLS.inc((translation_model, result.outcome))
+    metrics.TRANSLATION_DURATION.observe(result.duration_ms / 1000.0, (translation_model,))
     try:
-        logger.info(f"Iniciando tradução ({len(text)} chars)")
-        client = genai.Client(vertexai=True)
+        accumulator = get_invocation_accumulator(callback_context.invocation_id)
+
+        if result.cache_hit or result.skipped_language:
+            # Cache hit ou texto já em pt-br: sem chamada ao modelo, registra relatório com zero tokens
+            report = FinopsReport(
+                user_prompt=result.original_text,
+                agent_response=result.translated_text,
+                model_name=translation_model,
+                execution_time_ms=result.duration_ms,
+                interaction_timestamp=datetime.now(timezone.utc).isoformat(),
+                interaction_kind=f"translation_{result.outcome}"
+            )
+            logger.debug(f"Tradução sem chamada ao modelo ({result.outcome})")
+        else:
+            usage_meta = result.usage_metadata
+
+            # 1. Update Invocation Usage Counters
+            p_count = getattr(usage_meta, "prompt_token_count", 0) or 0
+            c_count = getattr(usage_meta, "candidates_token_count", 0) or 0
+            t_count = getattr(usage_meta, "total_token_count", 0) or 0
+            
+            accumulator.add_usage(translation_model, p_count, c_count, t_count)
+            logger.info(f"Tradução para pt-br contabilizada: +{t_count} tokens ({translation_model})")
+            
+            # 2. Create Rich FinOps Report for this Side Channel action
+            report = FinopsReport(
+                user_prompt=result.original_text,  # The original thought (English)
+                agent_response=result.translated_text, # The translation
+                model_name=translation_model,
+                prompt_token_count=p_count,
+                candidates_token_count=c_count,
+                total_token_count=t_count,
+                execution_time_ms=result.duration_ms,
+                interaction_timestamp=datetime.now(timezone.utc).isoformat(),
+                interaction_kind="translation"
+            )
         
-        start_time = time.time()
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=f"Traduza o seguinte texto para português do Brasil. Retorne APENAS a tradução, sem explicações:\n\n{text}"
-        )
-        duration_ms = (time.time() - start_time) * 1000.0
+        # Full texts go to the content store; the report keeps previews and hashes
+        accumulator.contents.put(result.original_text)
+        accumulator.contents.put(result.translated_text)
+
+        # Attach to the agent's in-flight model call
+        accumulator.add_side_report(callback_context.agent_name, report)
         
-        logger.info("Tradução concluída")
-        return response.text.strip(), response.usage_metadata, duration_ms
     except Exception as e:
-        logger.error(f"Erro ao traduzir: {e}")
-        return text, None, 0.0
+        logger.warning(f"Falha ao registrar uso de tradução no FinOps: {e}")
 
-def translate_thought(
+def _store_thoughts_for_lazy_translation(
+    callback_context: CallbackContext,
+    llm_response: LlmResponse,
+    thought_indexes: List[int],
+    translation_model: str
+) -> None:
+    """Guarda os pensamentos originais e anexa os handles ao custom_metadata da resposta."""
+    store = get_thought_store()
+    session = callback_context._invocation_context.session
+
+    handles = []
+    for index in thought_indexes:
+        handle = store.put(
+            text=llm_response.content.parts[index].text,
+            model=translation_model,
+            user_id=session.user_id,
+            session_id=session.id,
+            invocation_id=callback_context.invocation_id
+        )
+        handles.append({"part_index": index, "handle": handle})
+
+    metadata = dict(llm_response.custom_metadata or {})
+    metadata[THOUGHT_HANDLES_METADATA_KEY] = handles
+    llm_response.custom_metadata = metadata
+    logger.debug(f"{len(handles)} pensamento(s) guardado(s) para tradução sob demanda")
+
+async def translate_thought(
     callback_context: CallbackContext, 
     llm_response: LlmResponse
 ) -> Optional[LlmResponse]:
-    """Intercepta o pensamento REAL do Gemini e traduz para português."""
+    """
+    Intercepta o pensamento REAL do Gemini e traduz para português.
+    Todas as partes de pensamento da resposta são traduzidas concorrentemente.
+    Em streaming, fragmentos parciais são acumulados e traduzidos uma vez por
+    pensamento (ou por frase, conforme TRANSLATION_STREAM_FLUSH_CHARS).
+    Com TRANSLATION_MODE=lazy, apenas guarda os pensamentos e publica handles
+    para tradução sob demanda via API.
+    """
 
+    # Sem conteúdo (ex.: resposta de erro) não há o que traduzir. Retornar a resposta
+    # encerraria a cadeia de after_model e o FinOps não veria o erro
     if not llm_response.content or not llm_response.content.parts:
-        return llm_response
+        return None
 
-    new_parts = []
-    modified = False
-    
     # Modelo usado para tradução
     translation_model = os.getenv("TRANSLATION_MODEL", "gemini-2.5-flash-lite")
 
-    for part in llm_response.content.parts:
-        if hasattr(part, 'thought') and part.thought and part.text:            
-            translated_text, usage_meta, duration_ms = _translate_to_ptbr(part.text)
-            
-            if usage_meta:
-                try:
-                    # 1. Update Global Usage Stats
-                    state_data = callback_context.state.to_dict()
-                    usage_stats = state_data.get("model_usage_stats", {})
-                    
-                    if translation_model not in usage_stats:
-                        usage_stats[translation_model] = {"prompt": 0, "candidates": 0, "total": 0}
-                    
-                    p_count = getattr(usage_meta, "prompt_token_count", 0)
-                    c_count = getattr(usage_meta, "candidates_token_count", 0)
-                    t_count = getattr(usage_meta, "total_token_count", 0)
-                    
-                    usage_stats[translation_model]["prompt"] += p_count
-                    usage_stats[translation_model]["candidates"] += c_count
-                    usage_stats[translation_model]["total"] += t_count
-                    
-                    callback_context.state["model_usage_stats"] = usage_stats
-                    logger.info(f"Tradução para pt-br contabilizada: +{t_count} tokens ({translation_model})")
-                    
-                    # 2. Create Rich FinOps Report for this Side Channel action
-                    report = FinopsReport(
-                        user_prompt=part.text,  # The original thought (English)
-                        agent_response=translated_text, # The translation
-                        model_name=translation_model,
-                        prompt_token_count=p_count,
-                        candidates_token_count=c_count,
-                        total_token_count=t_count,
-                        execution_time_ms=duration_ms,
-                        interaction_timestamp=datetime.now(timezone.utc).isoformat(),
-                        interaction_kind="translation"
-                    )
-                    
-                    # Store in state list
-                    side_reports = state_data.get("temp:finops_side_reports", [])
-                    side_reports.append(report)
-                    callback_context.state["temp:finops_side_reports"] = side_reports
-                    
-                except Exception as e:
-                    logger.warning(f"Falha ao registrar uso de tradução no state: {e}")
-
-            new_parts.append(types.Part(thought=True, text=translated_text))
-            modified = True
-        else:
-            new_parts.append(part)
+    parts = llm_response.content.parts
+    thought_indexes = [
+        i for i, part in enumerate(parts)
+        if hasattr(part, 'thought') and part.thought and part.text
+    ]
+    if not thought_indexes:
+        return None
 
-    if modified:
-        if hasattr(llm_response, 'content'):
-            llm_response.content.parts = new_parts
+    if translation_mode() == "lazy":
+        # Em streaming, só a resposta final agregada gera handles
+        if not is_partial_response(llm_response):
+            _store_thoughts_for_lazy_translation(callback_context, llm_response, thought_indexes, translation_model)
         return None
-    
-    return None
\ No newline at end of file
+
+    stream_key = f"{callback_context.invocation_id}:{callback_context.agent_name}"
+    on_translation = lambda result: _register_translation(callback_context, result, translation_model)
+
+    if is_partial_response(llm_response):
+        await translate_partial_thoughts(llm_response, stream_key, translation_model, on_translation)
+    else:
+        await translate_final_thoughts(llm_response, thought_indexes, stream_key, translation_model, on_translation)
+
+    return None
@@ -0,0 +1,269 @@
+import bisect
+import functools
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from agents.helpers import waterfall
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; covers fast tools and callbacks up to long model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = Tuple[str, ...]
+# (name, type, help, [(suffix, labels dict, value)])
+MetricFamily = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+class _ShardedMetric:
+    """
+    Base for metrics whose updates go to a per-thread shard.
+
+    Each thread only writes to its own dict, so the hot path takes no lock:
+    the shard is created once per thread (under a lock) and scrapes copy every
+    shard, which is atomic for a plain dict under the GIL.
+    """
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[Labels, Any]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[Labels, Any] = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self) -> List[Dict[Labels, Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+    def _labels(self, values: Labels) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def collect(self) -> MetricFamily:
+        raise NotImplementedError
+
+
+class Counter(_ShardedMetric):
+    metric_type = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        if not METRICS_ENABLED:
+            return
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def collect(self) -> MetricFamily:
+        totals: Dict[Labels, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        samples = [("_total", self._labels(labels), value) for labels, value in totals.items()]
+        return self.name, self.metric_type, self.documentation, samples
+
+
+class Histogram(_ShardedMetric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        if not METRICS_ENABLED:
+            return
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # One slot per bucket plus +Inf, then the sum
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def collect(self) -> MetricFamily:
+        merged: Dict[Labels, List[float]] = {}
+        for shard in self._snapshots():
+            for labels, entry in shard.items():
+                entry = list(entry)
+                target = merged.get(labels)
+                if target is None:
+                    merged[labels] = entry
+                else:
+                    for i, value in enumerate(entry):
+                        target[i] += value
+
+        samples = []
+        for labels, entry in merged.items():
+            base = self._labels(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), entry[:-1]):
+                cumulative += count
+                samples.append(("_bucket", {**base, "le": _format_bound(bound)}, cumulative))
+            samples.append(("_sum", base, entry[-1]))
+            samples.append(("_count", base, cumulative))
+        return self.name, self.metric_type, self.documentation, samples
+
+
+class MetricsRegistry:
+    """Metrics of the process plus collectors that read gauges at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[_ShardedMetric] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.warning(f"[Metrics] Collector {getattr(collector, '__name__', collector)} failed: {e}")
+
+        lines = []
+        for name, metric_type, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+MODEL_CALLS = REGISTRY.counter("adk_model_calls", "Model calls", ("agent", "model"))
+MODEL_ERRORS = REGISTRY.counter("adk_model_errors", "Model calls that returned an error code", ("agent", "model"))
+MODEL_CALL_DURATION = REGISTRY.histogram(
+    "adk_model_call_duration_seconds", "Model call latency (before_model to after_model)", ("agent", "model")
+)
+MODEL_TOKENS = REGISTRY.counter(
+    "adk_model_tokens", "Tokens reported by the model, by kind", ("agent", "model", "kind")
+)
+TOOL_CALLS = REGISTRY.counter("adk_tool_calls", "Tool calls", ("agent", "tool"))
+TOOL_ERRORS = REGISTRY.counter("adk_tool_errors", "Tool calls that failed", ("agent", "tool"))
+TOOL_CALL_DURATION = REGISTRY.histogram("adk_tool_call_duration_seconds", "Tool call latency", ("agent", "tool"))
+TOOL_OUTPUT_BYTES = REGISTRY.counter("adk_tool_output_bytes", "Serialized size of tool outputs", ("agent", "tool"))
+TRANSLATION_CALLS = REGISTRY.counter(
+    "adk_translation_calls", "Thought translations (result: translated | cache_hit | skipped_language)", ("model", "result")
+)
+TRANSLATION_DURATION = REGISTRY.histogram(
+    "adk_translation_duration_seconds", "Thought translation latency", ("model",)
+)
+CALLBACK_DURATION = REGISTRY.histogram(
+    "adk_callback_duration_seconds", "Time spent inside agent callbacks", ("callback", "type")
+)
+
+
+def timed_callback(callback: Callable[..., Any], callback_type: str) -> Callable[..., Any]:
+    """
+    Wraps an ADK callback (sync or async) to observe its duration in
+    adk_callback_duration_seconds and as a callback span of the invocation waterfall.
+    """
+    if not METRICS_ENABLED and not waterfall.WATERFALL_ENABLED:
+        return callback
+
+    name = getattr(callback, "__name__", repr(callback))
+    labels = (name, callback_type)
+
+    def observe(start: float, kwargs: Dict[str, Any]) -> None:
+        end = time.perf_counter()
+        CALLBACK_DURATION.observe(end - start, labels)
+        context = kwargs.get("callback_context") or kwargs.get("tool_context")
+        if context is not None:
+            waterfall.record_callback(
+                getattr(context, "invocation_id", None), name, getattr(context, "agent_name", None), start, end
+            )
+
+    if inspect.iscoroutinefunction(callback):
+        @functools.wraps(callback)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                observe(start, kwargs)
+        return async_wrapper
+
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            observe(start, kwargs)
+    return wrapper
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
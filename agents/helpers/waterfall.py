@@ -0,0 +1,372 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WATERFALL_ENABLED = os.getenv("WATERFALL_ENABLED", "true").lower() == "true"
+# Invocations slower than this are written to WATERFALL_DIR
+WATERFALL_THRESHOLD_MS = float(os.getenv("WATERFALL_THRESHOLD_MS", "10000"))
+WATERFALL_DIR = os.getenv("WATERFALL_DIR", ".adk/waterfalls")
+# Retention of WATERFALL_DIR: the oldest dumps are removed past either limit
+WATERFALL_MAX_FILES = int(os.getenv("WATERFALL_MAX_FILES", "200"))
+WATERFALL_MAX_BYTES = int(os.getenv("WATERFALL_MAX_BYTES", str(100 * 1024 ** 2)))
+WATERFALL_MAX_SPANS = int(os.getenv("WATERFALL_MAX_SPANS", "2000"))
+WATERFALL_TTL_SECONDS = float(os.getenv("WATERFALL_TTL_SECONDS", "3600"))
+
+RENDER_WIDTH = 60
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed step of an invocation; offsets are milliseconds since the invocation started."""
+    kind: str
+    name: str
+    agent: Optional[str]
+    start_ms: float
+    end_ms: float
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return self.end_ms - self.start_ms
+
+
+class Timeline:
+    """
+    Spans (agent, model, tool, callback) of one invocation.
+
+    Recording a span is a perf_counter read and a list append; the timeline is
+    only rendered when the invocation crosses WATERFALL_THRESHOLD_MS.
+    """
+
+    def __init__(self, invocation_id: str, session_id: Optional[str] = None):
+        self.invocation_id = invocation_id
+        self.session_id = session_id
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.last_access = time.time()
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._t0 = time.perf_counter()
+        self._open: Dict[Tuple[str, str], Tuple[float, str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def offset_ms(self, perf_time: Optional[float] = None) -> float:
+        return ((perf_time if perf_time is not None else time.perf_counter()) - self._t0) * 1000.0
+
+    def open(self, kind: str, key: str, name: str, agent: Optional[str]) -> None:
+        with self._lock:
+            self._open[(kind, key)] = (self.offset_ms(), name, agent)
+
+    def close(self, kind: str, key: str, error: Optional[str] = None) -> None:
+        end_ms = self.offset_ms()
+        with self._lock:
+            opened = self._open.pop((kind, key), None)
+        if opened is not None:
+            start_ms, name, agent = opened
+            self.add(kind, name, agent, start_ms, end_ms, error)
+
+    def add(
+        self,
+        kind: str,
+        name: str,
+        agent: Optional[str],
+        start_ms: float,
+        end_ms: float,
+        error: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            if len(self.spans) >= WATERFALL_MAX_SPANS:
+                self.dropped_spans += 1
+                return
+            self.spans.append(Span(kind, name, agent, start_ms, end_ms, error))
+
+    def duration_ms(self) -> float:
+        with self._lock:
+            return max((span.end_ms for span in self.spans), default=0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: (s.start_ms, -s.end_ms))
+        return {
+            "invocation_id": self.invocation_id,
+            "session_id": self.session_id,
+            "started_at": self.started_at,
+            "duration_ms": round(max((s.end_ms for s in spans), default=0.0), 2),
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {**asdict(span), "start_ms": round(span.start_ms, 2), "end_ms": round(span.end_ms, 2),
+                 "duration_ms": round(span.duration_ms, 2)}
+                for span in spans
+            ]
+        }
+
+    def render_text(self, width: int = RENDER_WIDTH) -> str:
+        """Waterfall with one line per span, indented by nesting and drawn to scale."""
+        data = self.to_dict()
+        total = data["duration_ms"] or 1.0
+        lines = [
+            f"Invocation {self.invocation_id} (session {self.session_id}) - {data['duration_ms']:.0f} ms",
+            f"{'start':>9} {'duration':>9}  span",
+        ]
+
+        stack: List[float] = []
+        for span in data["spans"]:
+            # Depth = spans still open when this one starts
+            while stack and stack[-1] <= span["start_ms"]:
+                stack.pop()
+            depth = len(stack)
+            stack.append(span["end_ms"])
+
+            begin = int(span["start_ms"] / total * width)
+            length = max(1, int(span["duration_ms"] / total * width))
+            bar = " " * begin + "█" * min(length, width - begin)
+            label = f"{'  ' * depth}{span['kind']}:{span['name']}"
+            if span["agent"] and span["kind"] != "agent":
+                label += f" [{span['agent']}]"
+            if span["error"]:
+                label += " !error"
+            lines.append(f"{span['start_ms']:>7.0f}ms {span['duration_ms']:>7.0f}ms  |{bar:<{width}}| {label}")
+
+        if self.dropped_spans:
+            lines.append(f"... {self.dropped_spans} spans dropped (WATERFALL_MAX_SPANS={WATERFALL_MAX_SPANS})")
+        return "\n".join(lines) + "\n"
+
+
+# --- Registry ---
+_timelines: Dict[str, Timeline] = {}
+_timelines_lock = threading.Lock()
+# Fast path for code running inside the invocation's task (no registry lookup)
+_current_timeline: contextvars.ContextVar[Optional[Timeline]] = contextvars.ContextVar(
+    "waterfall_timeline", default=None
+)
+
+
+def get_timeline(invocation_id: Optional[str], session_id: Optional[str] = None) -> Optional[Timeline]:
+    """Returns the timeline of the invocation, creating it on first use."""
+    if not WATERFALL_ENABLED or not invocation_id:
+        return None
+
+    current = _current_timeline.get()
+    if current is not None and current.invocation_id == invocation_id:
+        return current
+
+    now = time.time()
+    with _timelines_lock:
+        timeline = _timelines.get(invocation_id)
+        if timeline is None:
+            _evict_stale(now)
+            timeline = _timelines[invocation_id] = Timeline(invocation_id, session_id)
+        timeline.last_access = now
+    _current_timeline.set(timeline)
+    return timeline
+
+
+def release_timeline(invocation_id: str) -> Optional[Timeline]:
+    with _timelines_lock:
+        timeline = _timelines.pop(invocation_id, None)
+    if _current_timeline.get() is timeline:
+        _current_timeline.set(None)
+    return timeline
+
+
+def _evict_stale(now: float) -> None:
+    stale = [key for key, t in _timelines.items() if now - t.last_access > WATERFALL_TTL_SECONDS]
+    for key in stale:
+        _timelines.pop(key, None)
+
+
+@contextmanager
+def span(kind: str, name: str, agent: Optional[str] = None) -> Iterator[None]:
+    """Times a block inside the current invocation (no-op outside of one)."""
+    timeline = _current_timeline.get()
+    if timeline is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        timeline.add(kind, name, agent, timeline.offset_ms(start), timeline.offset_ms(), error)
+
+
+def record_callback(invocation_id: Optional[str], name: str, agent: Optional[str], start: float, end: float) -> None:
+    """Adds a callback span measured by `metrics.timed_callback` (perf_counter start/end)."""
+    timeline = _current_timeline.get()
+    if timeline is None or timeline.invocation_id != invocation_id:
+        # Only running invocations: a callback after the root finished must not open a new timeline
+        with _timelines_lock:
+            timeline = _timelines.get(invocation_id)
+    if timeline is not None:
+        timeline.add("callback", name, agent, timeline.offset_ms(start), timeline.offset_ms(end))
+
+
+def dump_waterfall(
+    timeline: Timeline,
+    directory: str = WATERFALL_DIR,
+    max_files: int = WATERFALL_MAX_FILES,
+    max_bytes: int = WATERFALL_MAX_BYTES
+) -> Optional[Path]:
+    """
+    Writes the timeline as JSON and as a text waterfall, then prunes the oldest
+    dumps beyond `max_files` dumps or `max_bytes`. Returns the JSON path.
+    """
+    try:
+        target = Path(directory)
+        target.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        base = target / f"waterfall_{(timeline.session_id or 'nosession')[:8]}_{timeline.invocation_id[-8:]}_{stamp}"
+
+        json_path = base.with_suffix(".json")
+        json_path.write_text(json.dumps(timeline.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        base.with_suffix(".txt").write_text(timeline.render_text(), encoding="utf-8")
+    except Exception as e:
+        logger.error(f"[Waterfall] Failed to write waterfall of {timeline.invocation_id}: {e}")
+        return None
+
+    try:
+        _prune_dumps(target, max_files, max_bytes)
+    except Exception as e:
+        logger.warning(f"[Waterfall] Failed to prune '{target}': {e}")
+    return json_path
+
+
+def _prune_dumps(directory: Path, max_files: int, max_bytes: int) -> None:
+    """Removes the oldest dumps (the .json and .txt of one invocation together) past either limit."""
+    dumps: Dict[str, List[Tuple[float, int, Path]]] = {}
+    for path in directory.glob("waterfall_*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        dumps.setdefault(path.stem, []).append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for files in dumps.values() for _, size, _ in files)
+    count = len(dumps)
+    for stem in sorted(dumps, key=lambda s: max(mtime for mtime, _, _ in dumps[s])):
+        if count <= max_files and total <= max_bytes:
+            break
+        for _, size, path in dumps[stem]:
+            path.unlink(missing_ok=True)
+            total -= size
+        count -= 1
+
+
+def _context_ids(callback_context: Any) -> Tuple[str, Optional[str], str]:
+    session = callback_context._invocation_context.session
+    return callback_context.invocation_id, session.id, callback_context.agent_name
+
+
+def _is_root_agent(callback_context: Any) -> bool:
+    agent = getattr(callback_context._invocation_context, "agent", None)
+    return agent is None or getattr(agent, "parent_agent", None) is None
+
+
+# --- Callbacks ---
+
+def waterfall_before_agent(callback_context: Any) -> None:
+    """Opens the agent span (BEFORE_AGENT)."""
+    try:
+        invocation_id, session_id, agent_name = _context_ids(callback_context)
+        timeline = get_timeline(invocation_id, session_id)
+        if timeline is not None:
+            timeline.open("agent", agent_name, agent_name, agent_name)
+    except Exception as e:
+        logger.debug(f"[Waterfall] before_agent failed: {e}")
+    return None
+
+
+def waterfall_after_agent(callback_context: Any) -> None:
+    """Closes the agent span (AFTER_AGENT); the root agent writes slow invocations to disk."""
+    try:
+        invocation_id, _, agent_name = _context_ids(callback_context)
+        timeline = get_timeline(invocation_id)
+        if timeline is None:
+            return None
+        timeline.close("agent", agent_name)
+
+        if _is_root_agent(callback_context):
+            release_timeline(invocation_id)
+            duration_ms = timeline.duration_ms()
+            if duration_ms >= WATERFALL_THRESHOLD_MS:
+                path = dump_waterfall(timeline)
+                logger.warning(
+                    f"[Waterfall] Slow invocation {invocation_id}: {duration_ms:.0f} ms "
+                    f"(threshold {WATERFALL_THRESHOLD_MS:.0f} ms). Waterfall: {path}"
+                )
+    except Exception as e:
+        logger.debug(f"[Waterfall] after_agent failed: {e}")
+    return None
+
+
+def waterfall_before_model(callback_context: Any, llm_request: Any) -> None:
+    try:
+        invocation_id, session_id, agent_name = _context_ids(callback_context)
+        timeline = get_timeline(invocation_id, session_id)
+        if timeline is not None:
+            timeline.open("model", agent_name, getattr(llm_request, "model", None) or "unknown_model", agent_name)
+    except Exception as e:
+        logger.debug(f"[Waterfall] before_model failed: {e}")
+    return None
+
+
+def waterfall_after_model(callback_context: Any, llm_response: Any) -> None:
+    # Streamed chunks arrive before the final response: the span closes on the final one
+    if getattr(llm_response, "partial", False):
+        return None
+    try:
+        invocation_id, _, agent_name = _context_ids(callback_context)
+        timeline = get_timeline(invocation_id)
+        if timeline is not None:
+            error = getattr(llm_response, "error_code", None)
+            timeline.close("model", agent_name, str(error) if error else None)
+    except Exception as e:
+        logger.debug(f"[Waterfall] after_model failed: {e}")
+    return None
+
+
+def _tool_key(tool: Any, tool_context: Any) -> str:
+    return getattr(tool_context, "function_call_id", None) or f"{tool_context.agent_name}:{tool.name}"
+
+
+def waterfall_before_tool(tool: Any, args: Dict[str, Any], tool_context: Any) -> None:
+    try:
+        timeline = get_timeline(tool_context.invocation_id)
+        if timeline is not None:
+            timeline.open("tool", _tool_key(tool, tool_context), tool.name, tool_context.agent_name)
+    except Exception as e:
+        logger.debug(f"[Waterfall] before_tool failed: {e}")
+    return None
+
+
+def waterfall_after_tool(tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> None:
+    try:
+        timeline = get_timeline(tool_context.invocation_id)
+        if timeline is not None:
+            timeline.close("tool", _tool_key(tool, tool_context))
+    except Exception as e:
+        logger.debug(f"[Waterfall] after_tool failed: {e}")
+    return None
+
+
+def waterfall_on_tool_error(tool: Any, args: Dict[str, Any], tool_context: Any, error: Exception) -> None:
+    try:
+        timeline = get_timeline(tool_context.invocation_id)
+        if timeline is not None:
+            timeline.close("tool", _tool_key(tool, tool_context), f"{type(error).__name__}: {error}")
+    except Exception as e:
+        logger.debug(f"[Waterfall] on_tool_error failed: {e}")
+    return None
@@ -1,60 +1,292 @@
 import logging
-import tempfile
-import asyncio
-from pathlib import Path
+import functools
+from typing import Any, Awaitable, Callable, List, Optional, Union
+
+from google.adk.tools import ToolContext
 
 from agents.container import services
+from catalog.tools.read_repo.clone import CloneOptions
+from catalog.tools.read_repo.context import pack_repo_context
+from catalog.tools.read_repo.errors import RepoPackError, RepoReadError
+from catalog.tools.read_repo.pages import read_repo_page as read_repo_page_from_source
+from catalog.tools.read_repo.search import get_index_store, read_indexed_file
+from catalog.tools.read_repo.search import search_repo as search_repo_from_source
 from agents.core.domain.email.entities import SendEmailInput
 
 logger = logging.getLogger(__name__)
 
 
-async def read_repo_context(repo_url: str, branch: str) -> str:
-    """Clona um repositório e retorna o contexto via repomix."""
+async def read_repo_context(
+    repo_url: str,
+    branch: str,
+    clone_mode: str = "",
+    sparse_paths: Optional[List[str]] = None
+) -> str:
+    """Clona um repositório e retorna o contexto em Markdown (layout do repomix).
 
-    config = services.setup_code_repo_auth
-    if not (config and config.username and config.token and config.provider):
-        return "Erro: configurações de autenticação incompletas (username, token ou provider)."
+    Args:
+        repo_url (str): URL do repositório Git.
+        branch (str): Branch a ser lida.
+        clone_mode (str): Opcional. "mirror", "full", "shallow" (só o último commit) ou "blobless".
+        sparse_paths (list[str]): Opcional. Padrões de caminho a incluir (ex.: "src/**"); prefixo "!" exclui.
+    """
+    return await _read_repo_context(repo_url, branch, None, clone_mode, sparse_paths)
 
-    base_repo = repo_url.removesuffix(".git").removeprefix("https://").removeprefix("http://")
 
-    if config.provider not in base_repo:
-        return f"Erro: URL '{repo_url}' não pertence ao provedor '{config.provider}'."
+def read_repo_context_with_params(params: Optional[dict[str, Any]]) -> Callable[..., Awaitable[str]]:
+    """read_repo_context com os defaults de `params` do YAML (clone_mode, sparse_paths)."""
+    if not params:
+        return read_repo_context
 
-    source_url = f"https://{config.username}:{config.token}@{base_repo}.git"
+    # Valida o YAML na montagem do agente, não na primeira chamada
+    CloneOptions.from_params(params)
 
+    @functools.wraps(read_repo_context)
+    async def wrapper(
+        repo_url: str,
+        branch: str,
+        clone_mode: str = "",
+        sparse_paths: Optional[List[str]] = None
+    ) -> str:
+        return await _read_repo_context(repo_url, branch, params, clone_mode, sparse_paths)
+    return wrapper
+
+
+async def _read_repo_context(
+    repo_url: str,
+    branch: str,
+    params: Optional[dict[str, Any]],
+    clone_mode: str,
+    sparse_paths: Optional[List[str]]
+) -> str:
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmp_path = Path(tmpdir)
+        options = CloneOptions.from_params(params, mode=clone_mode, sparse_paths=sparse_paths)
+    except RepoReadError as e:
+        return f"Erro: {e}"
 
-            clone = await asyncio.create_subprocess_exec(
-                "git", "clone", "-b", branch, source_url, str(tmp_path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT
-            )
-            clone_out, _ = await clone.communicate()
+    source = _repo_source(repo_url)
+    if isinstance(source, str):
+        return source
+    base_repo, source_url = source
+
+    try:
+        return await pack_repo_context(base_repo, source_url, branch, options, ("--style", "markdown"))
+    except RepoPackError as e:
+        logger.warning("Falha ao empacotar '%s': %s", repo_url, e)
+        return f"Erro: falha ao empacotar o repositório."
+    except RepoReadError as e:
+        logger.warning("Falha ao clonar '%s': %s", repo_url, e)
+        return f"Erro: falha ao clonar '{repo_url}'. Verifique se a URL e a branch estão corretas."
+    except Exception as e:
+        logger.exception("Erro ao ler repositório '%s'", repo_url)
+        return f"Erro inesperado ao ler repositório: {e}"
 
-            if clone.returncode != 0:
-                return f"Erro: falha ao clonar '{repo_url}'. Verifique se a URL e a branch estão corretas."
+async def read_repo_page(
+    repo_url: str,
+    branch: str,
+    cursor: str = "",
+    query: str = "",
+    token_budget: int = 0,
+    clone_mode: str = "",
+    sparse_paths: Optional[List[str]] = None
+) -> str:
+    """Lê um repositório em páginas de tamanho limitado, dos arquivos mais importantes aos demais.
 
-            repomix = await asyncio.create_subprocess_exec(
-                "npx", "-y", "repomix", "--stdout",
-                "--style", "markdown",
-                cwd=tmp_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await repomix.communicate()
+    A primeira página traz a árvore de diretórios, README, manifestos e pontos de
+    entrada; as seguintes, o resto por relevância à `query` (ou do menor para o
+    maior). Para continuar, chame de novo com o `cursor` indicado no fim da página.
 
-            if repomix.returncode != 0:
-                return f"Erro: falha ao executar repomix no repositório."
+    Args:
+        repo_url (str): URL do repositório Git.
+        branch (str): Branch a ser lida.
+        cursor (str): Opcional. Cursor devolvido pela página anterior; vazio começa do início.
+        query (str): Opcional. Termos para priorizar arquivos (só na primeira chamada; o cursor a mantém).
+        token_budget (int): Opcional. Máximo de tokens da página.
+        clone_mode (str): Opcional. "mirror", "full", "shallow" (só o último commit) ou "blobless".
+        sparse_paths (list[str]): Opcional. Padrões de caminho a incluir (ex.: "src/**"); prefixo "!" exclui.
+    """
+    return await _read_repo_page(repo_url, branch, None, cursor, query, token_budget, clone_mode, sparse_paths)
 
-            return stdout.decode().strip()
 
+def read_repo_page_with_params(params: Optional[dict[str, Any]]) -> Callable[..., Awaitable[str]]:
+    """read_repo_page com os defaults de `params` do YAML (clone_mode, sparse_paths, token_budget)."""
+    if not params:
+        return read_repo_page
+
+    CloneOptions.from_params(params)
+
+    @functools.wraps(read_repo_page)
+    async def wrapper(
+        repo_url: str,
+        branch: str,
+        cursor: str = "",
+        query: str = "",
+        token_budget: int = 0,
+        clone_mode: str = "",
+        sparse_paths: Optional[List[str]] = None
+    ) -> str:
+        return await _read_repo_page(repo_url, branch, params, cursor, query, token_budget, clone_mode, sparse_paths)
+    return wrapper
+
+
+async def _read_repo_page(
+    repo_url: str,
+    branch: str,
+    params: Optional[dict[str, Any]],
+    cursor: str,
+    query: str,
+    token_budget: int,
+    clone_mode: str,
+    sparse_paths: Optional[List[str]]
+) -> str:
+    try:
+        options = CloneOptions.from_params(params, mode=clone_mode, sparse_paths=sparse_paths)
+    except RepoReadError as e:
+        return f"Erro: {e}"
+
+    source = _repo_source(repo_url)
+    if isinstance(source, str):
+        return source
+    base_repo, source_url = source
+
+    budget = token_budget or (params or {}).get("token_budget") or 0
+    try:
+        page = await read_repo_page_from_source(base_repo, source_url, branch, budget, cursor, query, options)
+        return page.content
+    except RepoPackError as e:
+        logger.warning("Falha ao ler os arquivos de '%s': %s", repo_url, e)
+        return f"Erro: falha ao ler os arquivos do repositório."
+    except RepoReadError as e:
+        logger.warning("Falha ao paginar '%s': %s", repo_url, e)
+        return f"Erro: {e}" if cursor else f"Erro: falha ao clonar '{repo_url}'. Verifique se a URL e a branch estão corretas."
     except Exception as e:
         logger.exception("Erro ao ler repositório '%s'", repo_url)
         return f"Erro inesperado ao ler repositório: {e}"
 
+
+# Último índice consultado na sessão: read_file lê desse commit
+SEARCH_INDEX_STATE_KEY = "read_repo_search_index"
+
+
+async def search_repo(
+    repo_url: str,
+    branch: str,
+    query: str,
+    k: int = 10,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """Busca trechos de código e definições (funções, classes) em um repositório, sem ler o repositório inteiro.
+
+    Retorna os trechos mais relevantes com as linhas onde aparecem; use read_file
+    para ler um trecho ou arquivo completo.
+
+    Args:
+        repo_url (str): URL do repositório Git.
+        branch (str): Branch a ser pesquisada.
+        query (str): Termos da busca (identificadores, nomes de funções ou palavras).
+        k (int): Opcional. Número máximo de trechos retornados.
+    """
+    return await _search_repo(repo_url, branch, query, k, None, tool_context)
+
+
+def search_repo_with_params(params: Optional[dict[str, Any]]) -> Callable[..., Awaitable[str]]:
+    """search_repo com os defaults de `params` do YAML (clone_mode, sparse_paths)."""
+    if not params:
+        return search_repo
+
+    CloneOptions.from_params(params)
+
+    @functools.wraps(search_repo)
+    async def wrapper(
+        repo_url: str,
+        branch: str,
+        query: str,
+        k: int = 10,
+        tool_context: Optional[ToolContext] = None
+    ) -> str:
+        return await _search_repo(repo_url, branch, query, k, params, tool_context)
+    return wrapper
+
+
+async def _search_repo(
+    repo_url: str,
+    branch: str,
+    query: str,
+    k: int,
+    params: Optional[dict[str, Any]],
+    tool_context: Optional[ToolContext]
+) -> str:
+    try:
+        options = CloneOptions.from_params(params)
+    except RepoReadError as e:
+        return f"Erro: {e}"
+
+    source = _repo_source(repo_url)
+    if isinstance(source, str):
+        return source
+    base_repo, source_url = source
+
+    try:
+        index, results = await search_repo_from_source(base_repo, source_url, branch, query, k, options)
+    except RepoPackError as e:
+        logger.warning("Falha ao indexar '%s': %s", repo_url, e)
+        return f"Erro: falha ao indexar o repositório."
+    except RepoReadError as e:
+        logger.warning("Falha na busca em '%s': %s", repo_url, e)
+        if not query or not query.strip():
+            return f"Erro: {e}"
+        return f"Erro: falha ao clonar '{repo_url}'. Verifique se a URL e a branch estão corretas."
+    except Exception as e:
+        logger.exception("Erro ao pesquisar repositório '%s'", repo_url)
+        return f"Erro inesperado ao pesquisar repositório: {e}"
+
+    if tool_context is not None:
+        tool_context.state[SEARCH_INDEX_STATE_KEY] = {
+            "repo": base_repo,
+            "commit": index.commit,
+            "sparse_paths": list(options.sparse_paths),
+        }
+    return results
+
+
+async def read_file(path: str, start: int = 1, end: int = 0, tool_context: Optional[ToolContext] = None) -> str:
+    """Lê linhas de um arquivo do repositório pesquisado por último com search_repo.
+
+    Args:
+        path (str): Caminho do arquivo, como aparece nos resultados do search_repo.
+        start (int): Opcional. Primeira linha (a partir de 1).
+        end (int): Opcional. Última linha, inclusive; 0 lê até o fim do arquivo.
+    """
+    state = tool_context.state.get(SEARCH_INDEX_STATE_KEY) if tool_context is not None else None
+    if not state:
+        return "Erro: nenhum repositório pesquisado nesta sessão. Chame search_repo antes de read_file."
+
+    options = CloneOptions.from_params(sparse_paths=state.get("sparse_paths"))
+    try:
+        index = await get_index_store().load(state["repo"], state["commit"], options)
+        if index is None:
+            return "Erro: o índice do repositório não está mais disponível. Chame search_repo novamente."
+        return read_indexed_file(index, path, start, end)
+    except RepoReadError as e:
+        return f"Erro: {e}"
+    except Exception as e:
+        logger.exception("Erro ao ler '%s' de '%s'", path, state.get("repo"))
+        return f"Erro inesperado ao ler arquivo: {e}"
+
+
+def _repo_source(repo_url: str) -> Union[tuple[str, str], str]:
+    """(repositório sem esquema, URL com credenciais) ou a mensagem de erro."""
+    config = services.setup_code_repo_auth
+    if not (config and config.username and config.token and config.provider):
+        return "Erro: configurações de autenticação incompletas (username, token ou provider)."
+
+    base_repo = repo_url.removesuffix(".git").removeprefix("https://").removeprefix("http://")
+
+    if config.provider not in base_repo:
+        return f"Erro: URL '{repo_url}' não pertence ao provedor '{config.provider}'."
+
+    return base_repo, f"https://{config.username}:{config.token}@{base_repo}.git"
+
 def send_email_tool(to: str, subject: str, body: str) -> None:
     """Envia um email usando um serviço de email pré-configurado.  
     
@@ -8,7 +8,11 @@ from google.adk.agents.callback_context import CallbackContext
 from catalog.callbacks.finops_persistence import (
     FinopsReport,
     FinopsPersistenceService,
-    PersistenceFactory
+    PersistenceFactory,
+    get_invocation_accumulator,
+    get_report_sampler,
+    get_rollup_aggregator,
+    release_invocation_accumulator
 )
 
 logger = logging.getLogger(__name__)
@@ -47,27 +51,8 @@ def _generate_performance_report(reports: List[FinopsReport], session_id: str) -
     try:
         from catalog.skills.analyze_performance import get_performance_report_md
 
-        # Converter FinopsReport para dict se necessário
-        reports_data = []
-        for r in reports:
-            if hasattr(r, '__dict__'):
-                # É um dataclass/objeto
-                report_dict = {
-                    "session_id": getattr(r, 'session_id', session_id),
-                    "model_name": getattr(r, 'model_name', 'unknown'),
-                    "prompt_token_count": getattr(r, 'prompt_token_count', 0),
-                    "candidates_token_count": getattr(r, 'candidates_token_count', 0),
-                    "total_token_count": getattr(r, 'total_token_count', 0),
-                    "execution_time_ms": getattr(r, 'execution_time_ms', 0),
-                    "interaction_timestamp": getattr(r, 'interaction_timestamp', ''),
-                    "interaction_kind": getattr(r, 'interaction_kind', 'agent'),
-                }
-            else:
-                # Já é dict
-                report_dict = r
-            reports_data.append(report_dict)
-
-        return get_performance_report_md(reports=reports_data)
+        # A skill lê FinopsReport e dicts diretamente, em forma colunar
+        return get_performance_report_md(reports=reports)
 
     except ImportError as e:
         logger.warning(f"[FinOps] Skill analyze_performance não disponível: {e}")
@@ -102,6 +87,11 @@ def _save_performance_report(report_md: str, session_id: str) -> Optional[str]:
         return None
 
 
+def _is_root_agent(callback_context: CallbackContext) -> bool:
+    agent = getattr(callback_context._invocation_context, "agent", None)
+    return agent is None or getattr(agent, "parent_agent", None) is None
+
+
 def persist_finops_metrics(
     callback_context: CallbackContext,
     agent_response: Any = None
@@ -118,28 +108,35 @@ def persist_finops_metrics(
     - PERFORMANCE_REPORT_DIR: Diretório para salvar (default: .adk/performance_reports)
     """
     try:
-        state_dict = callback_context.state.to_dict()
-        buffer: List[FinopsReport] = state_dict.get("finops_reports_buffer", [])
+        # The root agent finishes last: only then is the invocation's accounting
+        # complete, so sub-agents leave their reports in the accumulator and the
+        # sampling decision is taken once for every row of the invocation
+        if not _is_root_agent(callback_context):
+            return None
+
+        invocation_id = callback_context.invocation_id
+        accumulator = get_invocation_accumulator(invocation_id)
+        buffer: List[FinopsReport] = accumulator.drain_reports()
+        contents = accumulator.contents.drain()
+        release_invocation_accumulator(invocation_id)
+
+        # Per-session rollups close with the invocation, even when no detailed row is kept
+        rollup = get_rollup_aggregator()
+        if rollup:
+            rollup.flush_session(callback_context._invocation_context.session.id)
 
         if not buffer:
             return None
 
         logger.info(f"[FinOps] Persisting batch of {len(buffer)} reports...")
 
-        # 1. Persistir no BigQuery (se configurado)
-        service = get_finops_service()
-        if service:
-            service.save_reports_batch(buffer)
-
-        # 2. Gerar relatório de performance (se habilitado)
+        # 1. Gerar relatório de performance (se habilitado)
+        # Antes da amostragem, que marca sample_rate nos relatórios mantidos
         if PERFORMANCE_REPORT_ENABLED:
-            session_id = state_dict.get("session_id", "unknown")
-
-            # Incluir side reports (traduções) se existirem
-            side_reports = state_dict.get("temp:finops_side_reports", [])
-            all_reports = list(buffer) + list(side_reports)
+            session_id = callback_context._invocation_context.session.id
 
-            report_md = _generate_performance_report(all_reports, session_id)
+            # O buffer já inclui os side reports (traduções) de cada chamada
+            report_md = _generate_performance_report(buffer, session_id)
 
             if report_md:
                 # Exibir no log
@@ -153,9 +150,14 @@ def persist_finops_metrics(
                 # Armazenar no state para acesso posterior
                 callback_context.state["last_performance_report"] = report_md
 
-        # 3. Limpar buffers
-        callback_context.state["finops_reports_buffer"] = []
-        callback_context.state["temp:finops_side_reports"] = []
+        # 2. Persistir no BigQuery (se configurado)
+        service = get_finops_service()
+        if service:
+            # Sampling only thins the detailed rows; rollups already counted every call
+            sampled = get_report_sampler().sample(
+                buffer, accumulator.had_error, accumulator.latency_ms(), accumulator.total_tokens
+            )
+            service.save_reports_batch(sampled, contents)
 
     except Exception as e:
         logger.error(f"[FinOps] Batch persistence failed: {e}", exc_info=True)
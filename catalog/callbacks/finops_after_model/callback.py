@@ -1,5 +1,4 @@
 import logging
-import json
 import os
 import time
 from datetime import datetime, timezone
@@ -7,21 +6,31 @@ from typing import Optional, List, Dict, Any
 from google.adk.models import LlmResponse
 from google.adk.agents.callback_context import CallbackContext
 
-from catalog.callbacks.finops_persistence import FinopsReport
+from catalog.callbacks.finops_persistence import (
+    FinopsReport,
+    get_invocation_accumulator,
+    get_rollup_aggregator,
+    get_rolling_percentiles
+)
+from catalog.callbacks.finops_persistence.accumulator import InvocationAccumulator, ModelCallFrame
+from catalog.callbacks.finops_persistence.content import ContentStore
 
 logger = logging.getLogger(__name__)
 
 
-def _get_base_context_data(callback_context: CallbackContext) -> Dict[str, Any]:
+def _get_base_context_data(
+    callback_context: CallbackContext,
+    frame: Optional[ModelCallFrame]
+) -> Dict[str, Any]:
     """Extracts common context data used for all reports."""
-    state_dict = callback_context.state.to_dict()
     end_time = time.time()
-    start_time = callback_context.state.get("temp:finops_start_time", end_time)
+    start_time = frame.start_time if frame else end_time
 
     return {
         "execution_time_ms": (end_time - start_time) * 1000.0,
-        "model_name": state_dict.get("temp:finops_model_name") or "unknown_model",
-        "user_prompt": state_dict.get("temp:finops_user_prompt", "N/A"),
+        "model_name": (frame.model_name if frame else None) or "unknown_model",
+        "user_prompt": frame.user_prompt if frame else "N/A",
+        "agent_name": callback_context.agent_name,
         "user_id": callback_context._invocation_context.session.user_id,
         "session_id": callback_context._invocation_context.session.id,
         "agent_app_name": os.getenv("AGENT_APP_NAME", "default_agent_app"),
@@ -57,7 +66,8 @@ def _extract_usage_metrics(llm_response: LlmResponse) -> Dict[str, int]:
 def _create_main_report(
     base_data: Dict[str, Any],
     usage: Dict[str, int],
-    llm_response: LlmResponse
+    llm_response: LlmResponse,
+    contents: ContentStore
 ) -> FinopsReport:
     """Creates the primary report for the model interaction."""
     agent_response_text = "N/A"
@@ -67,6 +77,10 @@ def _create_main_report(
             if hasattr(p, 'text') and p.text
         ])
 
+    # Full texts are kept once in the content store; the report carries previews
+    user_prompt_hash = contents.put(base_data["user_prompt"])
+    agent_response_hash = contents.put(agent_response_text)
+
     return FinopsReport(
         user_id=base_data["user_id"],
         agent_base_url=base_data["agent_base_url"],
@@ -75,6 +89,10 @@ def _create_main_report(
         invocation_id=base_data["invocation_id"],
         user_prompt=base_data["user_prompt"],
         agent_response=agent_response_text,
+        user_prompt_hash=user_prompt_hash,
+        user_prompt_chars=len(base_data["user_prompt"]) if user_prompt_hash else 0,
+        agent_response_hash=agent_response_hash,
+        agent_response_chars=len(agent_response_text) if agent_response_hash else 0,
         thoughts_token_count=usage["thoughts"],
         prompt_token_count=usage["prompt"],
         candidates_token_count=usage["candidates"],
@@ -83,23 +101,26 @@ def _create_main_report(
         interaction_timestamp=base_data["interaction_timestamp"],
         execution_time_ms=base_data["execution_time_ms"],
         model_name=base_data["model_name"],
-        interaction_kind="agent"
+        interaction_kind="agent",
+        agent_name=base_data["agent_name"]
     )
 
 
 def _process_side_channels(
-    callback_context: CallbackContext,
+    accumulator: InvocationAccumulator,
+    frame: Optional[ModelCallFrame],
     base_data: Dict[str, Any],
     main_report: FinopsReport,
     buffer: List[FinopsReport]
 ) -> None:
     """Handles explicit side-channel reports and calculates generic deltas."""
-    state_dict = callback_context.state.to_dict()
+    if frame is None:
+        return
+
     reported_side_usage: Dict[str, int] = {}
 
     # 1. Handle Explicit Side Reports (e.g., Translations)
-    side_reports: List[FinopsReport] = state_dict.get("temp:finops_side_reports", [])
-    for report in side_reports:
+    for report in frame.side_reports:
         if not report.user_id:
             report.user_id = base_data["user_id"]
         if not report.session_id:
@@ -110,11 +131,13 @@ def _process_side_channels(
             report.agent_app_name = base_data["agent_app_name"]
         if not report.agent_base_url:
             report.agent_base_url = base_data["agent_base_url"]
+        if not report.agent_name:
+            report.agent_name = base_data["agent_name"]
 
         if report.user_prompt == "N/A":
-            report.user_prompt = base_data["user_prompt"]
+            report.copy_prompt_from(main_report)
         if report.agent_response == "N/A":
-            report.agent_response = main_report.agent_response
+            report.copy_response_from(main_report)
 
         buffer.append(report)
         logger.debug(f"[FinOps] Buffered Side Report: {report.model_name} (Kind: {report.interaction_kind})")
@@ -123,19 +146,9 @@ def _process_side_channels(
         reported_side_usage[report.model_name] = current_reported + report.total_token_count
 
     # 2. Calculate Generic Delta (Unaccounted Usage)
-    pre_usage_str = state_dict.get("temp:finops_pre_usage", "{}")
-    pre_usage_snapshot = json.loads(pre_usage_str) if pre_usage_str else {}
-    current_usage_stats = state_dict.get("model_usage_stats", {})
-
-    for model_key, stats in current_usage_stats.items():
-        pre_stats = pre_usage_snapshot.get(model_key, {"prompt": 0, "candidates": 0, "total": 0})
-
-        delta_prompt = stats.get("prompt", 0) - pre_stats.get("prompt", 0)
-        delta_candidates = stats.get("candidates", 0) - pre_stats.get("candidates", 0)
-        delta_total = stats.get("total", 0) - pre_stats.get("total", 0)
-
-        if delta_total > 0:
-            remaining_delta = delta_total
+    for model_key, delta in accumulator.usage_delta(frame).items():
+        if delta.total > 0:
+            remaining_delta = delta.total
 
             if (main_report.total_token_count > 0 and
                 (base_data["model_name"] in model_key or model_key in base_data["model_name"])):
@@ -144,23 +157,25 @@ def _process_side_channels(
             remaining_delta -= reported_side_usage.get(model_key, 0)
 
             if remaining_delta > 0:
-                ratio = remaining_delta / delta_total
+                ratio = remaining_delta / delta.total
 
-                buffer.append(FinopsReport(
+                unaccounted = FinopsReport(
                     user_id=base_data["user_id"],
                     agent_base_url=base_data["agent_base_url"],
                     agent_app_name=base_data["agent_app_name"],
                     session_id=base_data["session_id"],
                     invocation_id=base_data["invocation_id"],
-                    user_prompt=base_data["user_prompt"],
-                    agent_response=main_report.agent_response,
                     total_token_count=remaining_delta,
-                    prompt_token_count=int(delta_prompt * ratio),
-                    candidates_token_count=int(delta_candidates * ratio),
+                    prompt_token_count=int(delta.prompt * ratio),
+                    candidates_token_count=int(delta.candidates * ratio),
                     interaction_timestamp=datetime.now(timezone.utc).isoformat(),
                     model_name=model_key,
-                    interaction_kind="unaccounted"
-                ))
+                    interaction_kind="unaccounted",
+                    agent_name=base_data["agent_name"]
+                )
+                unaccounted.copy_prompt_from(main_report)
+                unaccounted.copy_response_from(main_report)
+                buffer.append(unaccounted)
                 logger.debug(f"[FinOps] Buffered Generic Report: {model_key} (Unaccounted)")
 
 
@@ -171,35 +186,47 @@ def collect_finops_metrics(
     """
     Aggregates usage and buffers FinOps reports for batch persistence.
 
+    Reports are buffered in the invocation accumulator, not in session state.
+    Partial (streamed) chunks are skipped: usage arrives with the final response.
+
     Registrar como: after_model_callback
     """
+    if getattr(llm_response, "partial", False):
+        return None
+
     try:
+        accumulator = get_invocation_accumulator(callback_context.invocation_id)
+        frame = accumulator.end_model_call(callback_context.agent_name)
+
         # 1. Prepare Base Data
-        base_data = _get_base_context_data(callback_context)
+        base_data = _get_base_context_data(callback_context, frame)
         usage_metrics = _extract_usage_metrics(llm_response)
+        if getattr(llm_response, "error_code", None):
+            accumulator.mark_error()
 
         # 2. Main Report
-        main_report = _create_main_report(base_data, usage_metrics, llm_response)
-
-        # 3. Buffer Management
-        state_dict = callback_context.state.to_dict()
-        buffer: List[FinopsReport] = state_dict.get("finops_reports_buffer", [])
-        buffer.append(main_report)
+        main_report = _create_main_report(base_data, usage_metrics, llm_response, accumulator.contents)
+        buffer: List[FinopsReport] = [main_report]
         logger.debug(f"[FinOps] Buffered Main Report: {base_data['model_name']}")
 
-        # 4. Process Side Channels
+        # 3. Process Side Channels
         try:
-            _process_side_channels(callback_context, base_data, main_report, buffer)
+            _process_side_channels(accumulator, frame, base_data, main_report, buffer)
         except Exception as e:
             logger.warning(f"[FinOps] Side-channel processing failed: {e}", exc_info=True)
 
-        # 5. Save State & Cleanup
-        callback_context.state["finops_reports_buffer"] = buffer
-        callback_context.state["temp:finops_pre_usage"] = ""
-        callback_context.state["temp:finops_model_name"] = ""
-        callback_context.state["temp:finops_user_prompt"] = ""
-        callback_context.state["temp:finops_start_time"] = ""
-        callback_context.state["temp:finops_side_reports"] = []
+        # 4. Buffer for the after-agent persistence
+        accumulator.add_reports(buffer)
+
+        # Per-minute rollups count every call, whatever is kept as detailed rows
+        rollup = get_rollup_aggregator()
+        if rollup:
+            rollup.add(callback_context.agent_name, buffer)
+
+        # Process-wide percentiles across sessions (/finops/percentiles)
+        rolling = get_rolling_percentiles()
+        if rolling:
+            rolling.add(buffer)
 
     except Exception as e:
         logger.error(f"[FinOps] Metric collection failed: {e}", exc_info=True)
@@ -1,10 +1,10 @@
 import logging
-import json
-import time
 from typing import Optional
 from google.adk.models import LlmRequest
 from google.adk.agents.callback_context import CallbackContext
 
+from catalog.callbacks.finops_persistence import get_invocation_accumulator
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,22 +13,14 @@ def finops_before_model_callback(
     llm_request: LlmRequest
 ) -> Optional[LlmRequest]:
     """
-    Captures initial metrics and snapshots usage state before the model call.
+    Captures initial metrics and snapshots usage counters before the model call.
+
+    Everything is kept in the invocation accumulator; no session state is written.
 
     Registrar como: before_model_callback
     """
     try:
-        # 1. Capture Start Time for Latency Calculation
-        callback_context.state["temp:finops_start_time"] = time.time()
-
-        # 2. Snapshot current side-channel usage stats
-        state_dict = callback_context.state.to_dict()
-        current_stats = state_dict.get("model_usage_stats", {})
-
-        snapshot_json = json.dumps(current_stats)
-        callback_context.state["temp:finops_pre_usage"] = snapshot_json
-
-        # 3. Capture basic request metadata
+        # 1. Capture basic request metadata
         model_name = "unknown_model"
         full_input = "N/A"
 
@@ -44,8 +36,9 @@ def finops_before_model_callback(
                     if hasattr(p, 'text') and p.text
                 ])
 
-        callback_context.state["temp:finops_model_name"] = model_name
-        callback_context.state["temp:finops_user_prompt"] = full_input
+        # 2. Open the model call frame (start time + usage snapshot)
+        accumulator = get_invocation_accumulator(callback_context.invocation_id)
+        accumulator.begin_model_call(callback_context.agent_name, model_name, full_input)
 
     except Exception as e:
         logger.error(f"[FinOps] Before-callback failed: {e}", exc_info=True)
@@ -1,15 +1,55 @@
 from .callback import (
     FinopsReport,
+    FinopsPersistenceError,
     PersistenceProvider,
     BigQueryProvider,
     FinopsPersistenceService,
     PersistenceFactory
 )
+from .accumulator import InvocationAccumulator, get_invocation_accumulator, release_invocation_accumulator
+from .content import ContentStore, FinopsContent, content_hash, decode_content
+from .rollup import FinopsRollup, RollupAggregator, get_rollup_aggregator
+from .rolling import RollingPercentiles, get_rolling_percentiles, merge_exports
+from .sampling import ReportSampler, SamplingPolicy, get_report_sampler, register_sampling_policy
+from .sketch import LogHistogram
+from .fake_bigquery import FakeBigQueryClient
+from .providers import JsonlProvider, SqliteProvider, ParquetProvider, FanOutProvider
+from .spool import FinopsSpool, SpoolReplayer, get_finops_spool
+from .worker import FinopsPersistenceWorker, shutdown_all_workers
 
 __all__ = [
     "FinopsReport",
+    "FinopsPersistenceError",
     "PersistenceProvider",
     "BigQueryProvider",
+    "FakeBigQueryClient",
+    "JsonlProvider",
+    "SqliteProvider",
+    "ParquetProvider",
+    "FanOutProvider",
     "FinopsPersistenceService",
-    "PersistenceFactory"
+    "PersistenceFactory",
+    "FinopsSpool",
+    "SpoolReplayer",
+    "get_finops_spool",
+    "FinopsPersistenceWorker",
+    "shutdown_all_workers",
+    "InvocationAccumulator",
+    "get_invocation_accumulator",
+    "release_invocation_accumulator",
+    "ContentStore",
+    "FinopsContent",
+    "content_hash",
+    "decode_content",
+    "FinopsRollup",
+    "RollupAggregator",
+    "get_rollup_aggregator",
+    "RollingPercentiles",
+    "get_rolling_percentiles",
+    "merge_exports",
+    "LogHistogram",
+    "SamplingPolicy",
+    "ReportSampler",
+    "get_report_sampler",
+    "register_sampling_policy"
 ]
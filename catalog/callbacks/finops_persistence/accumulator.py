@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .callback import FinopsReport
+from .content import ContentStore
+
+logger = logging.getLogger(__name__)
+
+# Accumulators not closed by the root agent (errors, cancelled runs) are dropped after this
+FINOPS_ACCUMULATOR_TTL_SECONDS = float(os.getenv("FINOPS_ACCUMULATOR_TTL_SECONDS", "3600"))
+
+
+@dataclass
+class UsageCounters:
+    """Monotonic token counters for one model within an invocation."""
+    prompt: int = 0
+    candidates: int = 0
+    total: int = 0
+
+
+@dataclass
+class ModelCallFrame:
+    """Data captured by the before-model callback for the in-flight model call of one agent."""
+    start_time: float
+    model_name: str = "unknown_model"
+    user_prompt: str = "N/A"
+    pre_usage: Dict[str, UsageCounters] = field(default_factory=dict)
+    side_reports: List[FinopsReport] = field(default_factory=list)
+
+
+class InvocationAccumulator:
+    """
+    In-process FinOps accounting for a single invocation.
+
+    Replaces the `temp:finops_*`, `model_usage_stats` and `finops_reports_buffer`
+    session state keys: nothing here is written to the session, so a
+    database-backed session service persists no FinOps deltas.
+    """
+
+    def __init__(self, invocation_id: str):
+        self.invocation_id = invocation_id
+        self.usage: Dict[str, UsageCounters] = {}
+        self.reports: List[FinopsReport] = []
+        self.contents = ContentStore()
+        self.had_error = False
+        # Invocation totals for tail sampling, decided once by the root agent
+        self.started_at: Optional[float] = None
+        self.max_model_latency_ms = 0.0
+        self.total_tokens = 0
+        self.last_access = time.time()
+        self._frames: Dict[str, ModelCallFrame] = {}
+        self._tool_starts: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def begin_model_call(self, agent_name: str, model_name: str, user_prompt: str) -> None:
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+            pre_usage = {
+                model: UsageCounters(c.prompt, c.candidates, c.total)
+                for model, c in self.usage.items()
+            }
+            self._frames[agent_name] = ModelCallFrame(
+                start_time=time.time(),
+                model_name=model_name,
+                user_prompt=user_prompt,
+                pre_usage=pre_usage
+            )
+
+    def end_model_call(self, agent_name: str) -> Optional[ModelCallFrame]:
+        with self._lock:
+            return self._frames.pop(agent_name, None)
+
+    def begin_tool_call(self, call_id: str) -> None:
+        with self._lock:
+            self._tool_starts[call_id] = time.time()
+
+    def end_tool_call(self, call_id: str) -> Optional[float]:
+        """Returns the start time recorded by `begin_tool_call`, if any."""
+        with self._lock:
+            return self._tool_starts.pop(call_id, None)
+
+    def add_usage(self, model_name: str, prompt: int, candidates: int, total: int) -> None:
+        """Counts tokens spent by side channels (e.g. translations) for this invocation."""
+        with self._lock:
+            counters = self.usage.setdefault(model_name, UsageCounters())
+            counters.prompt += prompt or 0
+            counters.candidates += candidates or 0
+            counters.total += total or 0
+
+    def add_side_report(self, agent_name: str, report: FinopsReport) -> None:
+        """Attaches a side-channel report to the agent's in-flight model call."""
+        with self._lock:
+            frame = self._frames.get(agent_name)
+            if frame is not None:
+                frame.side_reports.append(report)
+            else:
+                self.reports.append(report)
+                self.total_tokens += report.total_token_count or 0
+
+    def usage_delta(self, frame: ModelCallFrame) -> Dict[str, UsageCounters]:
+        """Tokens counted since the frame started, per model (O(models))."""
+        with self._lock:
+            delta = {}
+            for model, current in self.usage.items():
+                pre = frame.pre_usage.get(model, UsageCounters())
+                delta[model] = UsageCounters(
+                    current.prompt - pre.prompt,
+                    current.candidates - pre.candidates,
+                    current.total - pre.total
+                )
+            return delta
+
+    def mark_error(self) -> None:
+        """Flags the invocation as failed (tail sampling keeps its reports)."""
+        self.had_error = True
+
+    def add_reports(self, reports: List[FinopsReport]) -> None:
+        with self._lock:
+            self.reports.extend(reports)
+            for report in reports:
+                self.total_tokens += report.total_token_count or 0
+                if report.interaction_kind == "agent":
+                    self.max_model_latency_ms = max(self.max_model_latency_ms, report.execution_time_ms or 0.0)
+
+    def latency_ms(self) -> float:
+        """Wall time since the first model call, or the slowest model call if larger."""
+        with self._lock:
+            wall_ms = (time.time() - self.started_at) * 1000.0 if self.started_at is not None else 0.0
+            return max(wall_ms, self.max_model_latency_ms)
+
+    def drain_reports(self) -> List[FinopsReport]:
+        with self._lock:
+            reports, self.reports = self.reports, []
+            return reports
+
+
+# --- Registry ---
+_accumulators: Dict[str, InvocationAccumulator] = {}
+_accumulators_lock = threading.Lock()
+
+
+def get_invocation_accumulator(invocation_id: str) -> InvocationAccumulator:
+    """Returns the accumulator of the invocation, creating it on first use."""
+    now = time.time()
+    with _accumulators_lock:
+        accumulator = _accumulators.get(invocation_id)
+        if accumulator is None:
+            _evict_stale(now)
+            accumulator = InvocationAccumulator(invocation_id)
+            _accumulators[invocation_id] = accumulator
+        accumulator.last_access = now
+        return accumulator
+
+
+def release_invocation_accumulator(invocation_id: str) -> None:
+    """Drops the accumulator once the invocation finished."""
+    with _accumulators_lock:
+        _accumulators.pop(invocation_id, None)
+
+
+def _evict_stale(now: float) -> None:
+    stale = [
+        key for key, acc in _accumulators.items()
+        if now - acc.last_access > FINOPS_ACCUMULATOR_TTL_SECONDS
+    ]
+    for key in stale:
+        accumulator = _accumulators.pop(key)
+        if accumulator.reports:
+            logger.warning(
+                f"[FinOps] Dropping {len(accumulator.reports)} unpersisted reports "
+                f"of stale invocation {key}"
+            )
@@ -1,17 +1,54 @@
+import io
+import json
 import logging
 import os
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, Optional, List, Tuple
 from dataclasses import dataclass, asdict
 from google.cloud import bigquery
 from google.api_core.exceptions import GoogleAPICallError
 
+from .content import FINOPS_CONTENT_STORAGE, FinopsContent, SeenContentCache, compact_text, encode_content
+from .rollup import FinopsRollup, get_rollup_aggregator
+from .spool import FinopsSpool, SpoolReplayer, get_finops_spool
+from .worker import FINOPS_SHUTDOWN_TIMEOUT_SECONDS, FinopsPersistenceWorker, register_for_shutdown, report_from_row
+
 logger = logging.getLogger(__name__)
 
+# sync: persist inside the callback | async: enqueue for the background worker
+FINOPS_PERSISTENCE_MODE = os.getenv("FINOPS_PERSISTENCE_MODE", "async").lower()
+# false: only rollups (and contents) are written, no row per model call
+FINOPS_DETAILED_REPORTS = os.getenv("FINOPS_DETAILED_REPORTS", "true").lower() == "true"
+
+# BigQuery ingestion: stream (insert_rows_json) | load (batched load jobs)
+FINOPS_BQ_WRITE_MODE = os.getenv("FINOPS_BQ_WRITE_MODE", "stream").lower()
+# parquet (columnar, requires pyarrow) | json (newline-delimited JSON)
+FINOPS_BQ_LOAD_FORMAT = os.getenv("FINOPS_BQ_LOAD_FORMAT", "parquet").lower()
+FINOPS_BQ_COMMIT_INTERVAL_SECONDS = float(os.getenv("FINOPS_BQ_COMMIT_INTERVAL_SECONDS", "60"))
+FINOPS_BQ_COMMIT_MAX_ROWS = int(os.getenv("FINOPS_BQ_COMMIT_MAX_ROWS", "50000"))
+# real | fake (records payloads locally instead of calling BigQuery)
+FINOPS_BQ_CLIENT = os.getenv("FINOPS_BQ_CLIENT", "real").lower()
+
+
+class FinopsPersistenceError(Exception):
+    """Raised by providers when a batch could not be stored (and may be retried)."""
+    pass
 
-@dataclass
+
+@dataclass(slots=True)
 class FinopsReport:
-    """Data Transfer Object for FinOps reporting."""
+    """
+    Data Transfer Object for FinOps reporting.
+
+    `user_prompt` and `agent_response` hold previews of at most
+    FINOPS_TEXT_PREVIEW_CHARS characters; the full texts are identified by
+    their content hash and length, so memory per report is bounded.
+    """
     user_id: Optional[str] = None
     agent_base_url: Optional[str] = None
     agent_app_name: Optional[str] = None
@@ -28,11 +65,96 @@ class FinopsReport:
     execution_time_ms: float = 0.0
     model_name: str = "unknown_model"
     interaction_kind: str = "agent"
+    user_prompt_hash: Optional[str] = None
+    user_prompt_chars: int = 0
+    agent_response_hash: Optional[str] = None
+    agent_response_chars: int = 0
+    agent_name: Optional[str] = None
+    # Probability this row had of being kept by sampling (re-weight with 1 / sample_rate)
+    sample_rate: float = 1.0
+    # Tool calls (interaction_kind="tool"): output size and error message, no model tokens
+    tool_name: Optional[str] = None
+    tool_output_bytes: int = 0
+    tool_output_tokens: int = 0
+    tool_error: Optional[str] = None
+
+    def __post_init__(self):
+        self.user_prompt, self.user_prompt_hash, self.user_prompt_chars = compact_text(
+            self.user_prompt, self.user_prompt_hash, self.user_prompt_chars
+        )
+        self.agent_response, self.agent_response_hash, self.agent_response_chars = compact_text(
+            self.agent_response, self.agent_response_hash, self.agent_response_chars
+        )
+
+    def copy_prompt_from(self, other: "FinopsReport") -> None:
+        self.user_prompt = other.user_prompt
+        self.user_prompt_hash = other.user_prompt_hash
+        self.user_prompt_chars = other.user_prompt_chars
+
+    def copy_response_from(self, other: "FinopsReport") -> None:
+        self.agent_response = other.agent_response
+        self.agent_response_hash = other.agent_response_hash
+        self.agent_response_chars = other.agent_response_chars
+
+
+def report_to_row(report: Any) -> Optional[Dict[str, Any]]:
+    """Converts a report (dataclass or dict) into a storage row."""
+    if isinstance(report, FinopsReport):
+        return asdict(report)
+    if isinstance(report, dict):
+        return report
+    logger.warning(f"[FinOps] Skipping invalid report format: {type(report)}")
+    return None
+
+
+_report_from_row = report_from_row(FinopsReport)
+_content_from_row = report_from_row(FinopsContent)
+_rollup_from_row = report_from_row(FinopsRollup)
+
+
+def item_from_row(row: Dict[str, Any]) -> Any:
+    """Rebuilds a report, content or rollup row read back from the spill file or spool."""
+    if "content_encoding" in row:
+        return _content_from_row(row)
+    if "window_seconds" in row:
+        return _rollup_from_row(row)
+    return _report_from_row(row)
+
+
+def persist_items(provider: "PersistenceProvider", items: List[Any]) -> None:
+    """Ships a mixed batch: contents first, then the reports that reference them, then rollups."""
+    contents, rollups, reports = [], [], []
+    for item in items:
+        if isinstance(item, FinopsContent):
+            contents.append(item)
+        elif isinstance(item, FinopsRollup):
+            rollups.append(item)
+        else:
+            reports.append(item)
+
+    if contents:
+        provider.persist_contents(contents)
+    if reports:
+        provider.persist_batch(reports)
+    if rollups:
+        provider.persist_rollups(rollups)
+
+
+def spool_items(spool: FinopsSpool, provider: "PersistenceProvider", items: List[Any]) -> None:
+    """Makes a worker batch durable in the spool; falls back to the provider if the disk fails."""
+    try:
+        spool.append(items)
+    except OSError as e:
+        logger.error(f"[FinOps] Spool write failed, persisting directly: {e}")
+        persist_items(provider, items)
 
 
 class PersistenceProvider(ABC):
     """Abstract Strategy for data persistence."""
 
+    # True when persist_batch may only buffer rows until flush() commits them
+    buffers_writes: bool = False
+
     @abstractmethod
     def persist(self, report: FinopsReport) -> None:
         """Persist the report object to the storage medium."""
@@ -40,22 +162,89 @@ class PersistenceProvider(ABC):
 
     @abstractmethod
     def persist_batch(self, reports: List[FinopsReport]) -> None:
-        """Persist a batch of report objects to the storage medium."""
+        """
+        Persist a batch of report objects to the storage medium.
+
+        Raises FinopsPersistenceError when the batch was not stored.
+        """
+        pass
+
+    def flush(self, force: bool = True) -> None:
+        """
+        Commits reports the provider buffers internally. Providers that write
+        each batch immediately have nothing to do. With force=False, only
+        commits if the provider's own commit interval has elapsed.
+        """
+        pass
+
+    def discard_pending(self) -> None:
+        """Drops buffered, uncommitted reports (when the caller keeps a durable copy)."""
+        pass
+
+    def persist_contents(self, contents: List[FinopsContent]) -> None:
+        """
+        Stores full prompt/response texts keyed by content hash, once per hash.
+        Providers without a content table ignore them (reports keep previews).
+        """
+        pass
+
+    def persist_rollups(self, rollups: List[FinopsRollup]) -> None:
+        """Stores pre-aggregated rollup rows. Providers without a rollup table ignore them."""
         pass
 
 
 class BigQueryProvider(PersistenceProvider):
-    """Concrete Strategy for Google BigQuery persistence."""
+    """
+    Concrete Strategy for Google BigQuery persistence.
+
+    In `stream` mode each batch goes through insert_rows_json. In `load` mode
+    batches are accumulated and committed through a single load job (from a local
+    Parquet or NDJSON file) once the commit interval or row limit is reached,
+    which avoids the per-row streaming insert cost.
+    """
 
-    def __init__(self, project_id: str, dataset_id: str, table_id: str):
+    def __init__(
+        self,
+        project_id: str,
+        dataset_id: str,
+        table_id: str,
+        client: Optional[Any] = None,
+        write_mode: str = FINOPS_BQ_WRITE_MODE,
+        load_format: str = FINOPS_BQ_LOAD_FORMAT,
+        commit_interval_seconds: float = FINOPS_BQ_COMMIT_INTERVAL_SECONDS,
+        commit_max_rows: int = FINOPS_BQ_COMMIT_MAX_ROWS,
+        content_table_id: Optional[str] = None,
+        rollup_table_id: Optional[str] = None
+    ):
         self.project_id = project_id
         self.dataset_id = dataset_id
         self.table_id = table_id
 
-        self.client = bigquery.Client(project=project_id)
+        self.client = client or bigquery.Client(project=project_id)
         self.table_ref = f"{project_id}.{dataset_id}.{table_id}"
+        self.content_table_ref = f"{project_id}.{dataset_id}.{content_table_id or table_id + '_contents'}"
+        self.rollup_table_ref = f"{project_id}.{dataset_id}.{rollup_table_id or table_id + '_rollups'}"
+
+        self.write_mode = write_mode
+        self.buffers_writes = write_mode == "load"
+        self.load_format = load_format
+        self.commit_interval_seconds = commit_interval_seconds
+        self.commit_max_rows = commit_max_rows
+
+        if self.load_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                logger.warning("[FinOps] pyarrow not installed, BigQuery load jobs will use NDJSON.")
+                self.load_format = "json"
 
-        logger.info(f"[FinOps] Initialized BigQuery Provider: {self.table_ref}")
+        self._pending: List[Dict[str, Any]] = []
+        # Content and rollup rows waiting for the next load, per destination table
+        self._pending_side: Dict[str, Tuple[type, List[Dict[str, Any]]]] = {}
+        self._pending_since = 0.0
+        self._lock = threading.Lock()
+
+        logger.info(f"[FinOps] Initialized BigQuery Provider: {self.table_ref} (mode={self.write_mode})")
 
     def persist(self, report: FinopsReport) -> None:
         self.persist_batch([report])
@@ -64,69 +253,408 @@ class BigQueryProvider(PersistenceProvider):
         if not reports:
             return
 
+        rows = [row for row in map(report_to_row, reports) if row is not None]
+        if not rows:
+            return
+
+        if self.write_mode == "load":
+            self._buffer_for_load(rows)
+            return
+
         try:
-            rows = []
-            for report in reports:
-                if isinstance(report, FinopsReport):
-                    rows.append(asdict(report))
-                elif isinstance(report, dict):
-                    rows.append(report)
-                else:
-                    logger.warning(f"[FinOps] Skipping invalid report format: {type(report)}")
-
-            if not rows:
+            errors = self.client.insert_rows_json(self.table_ref, rows)
+        except GoogleAPICallError as e:
+            raise FinopsPersistenceError(f"BigQuery API call failed: {e}") from e
+        except Exception as e:
+            raise FinopsPersistenceError(f"Unexpected error during BigQuery persistence: {e}") from e
+
+        if errors:
+            raise FinopsPersistenceError(f"BigQuery batch insert failed with errors: {errors}")
+
+        logger.info(f"[FinOps] Data inserted into table '{self.table_ref}'")
+        logger.debug(f"[FinOps] Successfully persisted {len(reports)} reports to BigQuery.")
+
+    def persist_contents(self, contents: List[FinopsContent]) -> None:
+        self._persist_side_rows(contents, FinopsContent, self.content_table_ref)
+
+    def persist_rollups(self, rollups: List[FinopsRollup]) -> None:
+        self._persist_side_rows(rollups, FinopsRollup, self.rollup_table_ref)
+
+    def _persist_side_rows(self, records: List[Any], record_cls: type, table_ref: str) -> None:
+        if not records:
+            return
+
+        rows = [asdict(r) for r in records]
+
+        if self.write_mode == "load":
+            # Committed with the next load, before the reports that reference them
+            with self._lock:
+                if not self._has_pending():
+                    self._pending_since = time.monotonic()
+                self._pending_side.setdefault(table_ref, (record_cls, []))[1].extend(rows)
+            return
+
+        try:
+            errors = self.client.insert_rows_json(table_ref, rows)
+        except GoogleAPICallError as e:
+            raise FinopsPersistenceError(f"BigQuery API call failed: {e}") from e
+        except Exception as e:
+            raise FinopsPersistenceError(f"Unexpected error during BigQuery persistence: {e}") from e
+
+        if errors:
+            raise FinopsPersistenceError(f"BigQuery insert into '{table_ref}' failed with errors: {errors}")
+
+        logger.debug(f"[FinOps] Successfully persisted {len(rows)} rows to '{table_ref}'.")
+
+    def flush(self, force: bool = True) -> None:
+        if self.write_mode != "load":
+            return
+
+        with self._lock:
+            if not self._has_pending() or not (force or self._commit_due()):
                 return
+            self._commit_side_rows()
+            if self._pending:
+                self._commit(self._pending)
+            self._pending = []
 
-            errors = self.client.insert_rows_json(self.table_ref, rows)
-            logger.info(f"[FinOps] Data inserted into table '{self.table_ref}'")
+    def discard_pending(self) -> None:
+        with self._lock:
+            self._pending = []
+            self._pending_side = {}
 
-            if errors:
-                logger.error(f"[FinOps] BigQuery batch insert failed with errors: {errors}")
-            else:
-                logger.debug(f"[FinOps] Successfully persisted {len(reports)} reports to BigQuery.")
+    def view_sql(self, view_id: Optional[str] = None) -> str:
+        """
+        DDL of a view that rejoins the reports with their full texts.
+
+        Compressed (zstd) contents cannot be decoded in SQL; the view exposes
+        them as NULL text and keeps the encoded value for client-side decoding.
+        """
+        view_ref = f"{self.project_id}.{self.dataset_id}.{view_id or self.table_id + '_full'}"
+        return f"""CREATE OR REPLACE VIEW `{view_ref}` AS
+WITH contents AS (
+  SELECT * FROM `{self.content_table_ref}`
+  QUALIFY ROW_NUMBER() OVER (PARTITION BY content_hash ORDER BY interaction_timestamp) = 1
+)
+SELECT
+  r.*,
+  IF(p.content_encoding = 'identity', p.content, NULL) AS user_prompt_full,
+  IF(a.content_encoding = 'identity', a.content, NULL) AS agent_response_full,
+  p.content_encoding AS user_prompt_encoding,
+  a.content_encoding AS agent_response_encoding
+FROM `{self.table_ref}` r
+LEFT JOIN contents p ON p.content_hash = r.user_prompt_hash
+LEFT JOIN contents a ON a.content_hash = r.agent_response_hash"""
+
+    def _buffer_for_load(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if not self._has_pending():
+                self._pending_since = time.monotonic()
+            candidate = self._pending + rows
+
+            if len(candidate) < self.commit_max_rows and not self._commit_due():
+                self._pending = candidate
+                return
+
+            # On failure the new rows are not kept: the caller retries this batch
+            self._commit_side_rows()
+            self._commit(candidate)
+            self._pending = []
 
+    def _has_pending(self) -> bool:
+        return bool(self._pending or self._pending_side)
+
+    def _commit_due(self) -> bool:
+        return self._has_pending() and time.monotonic() - self._pending_since >= self.commit_interval_seconds
+
+    def _commit_side_rows(self) -> None:
+        for table_ref in list(self._pending_side):
+            record_cls, rows = self._pending_side[table_ref]
+            self._commit(rows, record_cls, table_ref)
+            del self._pending_side[table_ref]
+
+    def _commit(self, rows: List[Dict[str, Any]], record_cls: Optional[type] = None, table_ref: Optional[str] = None) -> None:
+        record_cls = record_cls or FinopsReport
+        table_ref = table_ref or self.table_ref
+
+        if self.load_format == "parquet":
+            source_format = bigquery.SourceFormat.PARQUET
+        else:
+            source_format = bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+
+        job_config = bigquery.LoadJobConfig(
+            source_format=source_format,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND
+        )
+
+        try:
+            with tempfile.TemporaryFile() as f:
+                self._write_load_file(rows, f, record_cls)
+                f.seek(0)
+                job = self.client.load_table_from_file(f, table_ref, job_config=job_config)
+                job.result()
         except GoogleAPICallError as e:
-            logger.error(f"[FinOps] BigQuery API call failed: {e}")
+            raise FinopsPersistenceError(f"BigQuery load job failed: {e}") from e
         except Exception as e:
-            logger.error(f"[FinOps] Unexpected error during BigQuery persistence: {e}")
+            raise FinopsPersistenceError(f"Unexpected error during BigQuery load job: {e}") from e
+
+        logger.info(f"[FinOps] Loaded {len(rows)} rows into table '{table_ref}'")
+
+    def _write_load_file(self, rows: List[Dict[str, Any]], f: Any, record_cls: type) -> None:
+        if self.load_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            from .providers import rows_to_arrow_table
+
+            table = rows_to_arrow_table(rows, record_cls)
+            # Parquet STRING does not load into a TIMESTAMP column
+            index = table.schema.get_field_index("interaction_timestamp")
+            table = table.set_column(
+                index, "interaction_timestamp",
+                table.column(index).cast(pa.timestamp("us", tz="UTC"))
+            )
+            pq.write_table(table, f)
+        else:
+            writer = io.TextIOWrapper(f, encoding="utf-8", write_through=True)
+            for row in rows:
+                writer.write(json.dumps(row, default=str) + "\n")
+            writer.detach()
 
 
 class FinopsPersistenceService:
-    """Service context that delegates persistence to the injected provider."""
+    """
+    Service context that delegates persistence to the injected provider.
+
+    With a worker, saving only enqueues and the provider is called from the
+    worker thread. With a spool, the worker thread writes each batch to local
+    disk instead and a replayer ships it to the provider. Without a worker, the
+    provider is called inline.
 
-    def __init__(self, provider: PersistenceProvider):
+    With content storage enabled, full texts passed along with the reports are
+    sent once per hash (per process) as FinopsContent rows in the same batch.
+    Rollup rows take the same path; with detailed reports disabled only the
+    rollups (and no per-call rows) are written.
+    """
+
+    def __init__(
+        self,
+        provider: PersistenceProvider,
+        worker: Optional[FinopsPersistenceWorker] = None,
+        replayer: Optional[SpoolReplayer] = None,
+        store_contents: bool = FINOPS_CONTENT_STORAGE,
+        detailed_reports: bool = FINOPS_DETAILED_REPORTS
+    ):
         self.provider = provider
+        self.worker = worker
+        self.replayer = replayer
+        self.store_contents = store_contents
+        self.detailed_reports = detailed_reports
+        self._seen_contents = SeenContentCache()
+        self._content_lock = threading.Lock()
+        self._content_counters = {
+            "reports": 0,
+            "referenced_chars": 0,
+            "contents_written": 0,
+            "contents_deduplicated": 0,
+            "stored_bytes": 0
+        }
+
+    def save_report(self, report: FinopsReport, contents: Optional[Dict[str, str]] = None) -> None:
+        self.save_reports_batch([report], contents)
+
+    def save_reports_batch(self, reports: List[FinopsReport], contents: Optional[Dict[str, str]] = None) -> None:
+        """
+        Saves reports; `contents` maps content hash to full text for the
+        prompts/responses the reports reference (see ContentStore.drain).
+        """
+        if not reports or not self.detailed_reports:
+            return
+
+        items: List[Any] = list(reports)
+        if self.store_contents:
+            items = self._new_contents(reports, contents or {}) + items
+
+        self._submit(items)
+
+    def save_rollups(self, rollups: List[FinopsRollup]) -> None:
+        if rollups:
+            self._submit(list(rollups))
+
+    def _submit(self, items: List[Any]) -> None:
+        if self.worker:
+            self.worker.submit(items)
+            return
+
+        try:
+            persist_items(self.provider, items)
+        except FinopsPersistenceError as e:
+            logger.error(f"[FinOps] {e}")
+
+    def content_stats(self) -> Dict[str, Any]:
+        """
+        Measures content deduplication: `referenced_chars` is what the reports
+        would have stored inline with full texts, `stored_bytes` what the content
+        table actually received.
+        """
+        with self._content_lock:
+            stats: Dict[str, Any] = dict(self._content_counters)
+        stats["saved_bytes_estimate"] = max(0, stats["referenced_chars"] - stats["stored_bytes"])
+        return stats
+
+    def _new_contents(self, reports: List[Any], contents: Dict[str, str]) -> List[FinopsContent]:
+        referenced = 0
+        referenced_hashes = set()
+        for report in reports:
+            if isinstance(report, FinopsReport):
+                referenced += report.user_prompt_chars + report.agent_response_chars
+                referenced_hashes.update((report.user_prompt_hash, report.agent_response_hash))
+
+        # Only texts of reports that are actually persisted (e.g. after sampling)
+        contents = {h: text for h, text in contents.items() if h in referenced_hashes}
 
-    def save_report(self, report: FinopsReport) -> None:
-        self.provider.persist(report)
+        timestamp = datetime.now(timezone.utc).isoformat()
+        new_hashes = self._seen_contents.filter_new(contents)
+        rows = [encode_content(h, contents[h], timestamp=timestamp) for h in new_hashes]
 
-    def save_reports_batch(self, reports: List[FinopsReport]) -> None:
-        self.provider.persist_batch(reports)
+        with self._content_lock:
+            self._content_counters["reports"] += len(reports)
+            self._content_counters["referenced_chars"] += referenced
+            self._content_counters["contents_written"] += len(rows)
+            self._content_counters["contents_deduplicated"] += len(contents) - len(rows)
+            self._content_counters["stored_bytes"] += sum(row.stored_bytes for row in rows)
+        return rows
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every report saved so far reached the provider."""
+        if self.replayer:
+            # The worker first moves everything enqueued into the spool
+            if self.worker and not self.worker.flush(timeout):
+                return False
+            return self.replayer.replay_once()
+        if self.worker:
+            return self.worker.flush(timeout)
+        try:
+            self.provider.flush()
+            return True
+        except FinopsPersistenceError as e:
+            logger.error(f"[FinOps] {e}")
+            return False
+
+    def close(self, timeout: float = FINOPS_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Flushes pending reports and stops the background threads, if any."""
+        if self.worker:
+            self.worker.close(timeout)
+        if self.replayer:
+            self.replayer.close(timeout)
+        if not self.replayer and not self.worker:
+            self.flush()
 
 
 class PersistenceFactory:
     """Factory to create persistence services based on configuration."""
 
     @staticmethod
-    def create_service() -> Optional[FinopsPersistenceService]:
-        """Creates a service instance based on environment variables."""
-        provider_type = os.getenv("FINOPS_PROVIDER_TYPE", "").lower()
-        provider: Optional[PersistenceProvider] = None
-
-        if provider_type == "bigquery":
-            project = os.getenv("FINOPS_BQ_PROJECT_ID")
-            dataset = os.getenv("FINOPS_BQ_DATASET_ID")
-            table = os.getenv("FINOPS_BQ_TABLE_ID")
-
-            if project and dataset and table:
-                try:
-                    provider = BigQueryProvider(project, dataset, table)
-                except Exception as e:
-                    logger.error(f"[FinOps] Failed to create BigQuery provider: {e}")
-            else:
+    def create_provider(provider_type: str) -> Optional[PersistenceProvider]:
+        """Creates a single provider by type name, reading its settings from the environment."""
+        from .providers import JsonlProvider, ParquetProvider, SqliteProvider
+
+        try:
+            if provider_type == "bigquery":
+                project = os.getenv("FINOPS_BQ_PROJECT_ID")
+                dataset = os.getenv("FINOPS_BQ_DATASET_ID")
+                table = os.getenv("FINOPS_BQ_TABLE_ID")
+
+                if project and dataset and table:
+                    client = None
+                    if FINOPS_BQ_CLIENT == "fake":
+                        from .fake_bigquery import FakeBigQueryClient
+                        client = FakeBigQueryClient()
+                    return BigQueryProvider(
+                        project, dataset, table, client=client,
+                        content_table_id=os.getenv("FINOPS_BQ_CONTENT_TABLE_ID"),
+                        rollup_table_id=os.getenv("FINOPS_BQ_ROLLUP_TABLE_ID")
+                    )
                 logger.warning("[FinOps] BigQuery provider requested but configuration missing.")
 
-        if provider:
-            return FinopsPersistenceService(provider)
+            elif provider_type == "jsonl":
+                return JsonlProvider(os.getenv("FINOPS_JSONL_PATH", ".adk/finops/reports.jsonl"))
+
+            elif provider_type == "sqlite":
+                return SqliteProvider(
+                    os.getenv("FINOPS_SQLITE_PATH", ".adk/finops/finops.db"),
+                    os.getenv("FINOPS_SQLITE_TABLE", "finops_reports")
+                )
+
+            elif provider_type == "parquet":
+                return ParquetProvider(os.getenv("FINOPS_PARQUET_DIR", ".adk/finops/parquet"))
+
+            else:
+                logger.warning(f"[FinOps] Unknown provider type '{provider_type}'.")
+
+        except Exception as e:
+            logger.error(f"[FinOps] Failed to create {provider_type} provider: {e}")
 
         return None
+
+    @staticmethod
+    def create_service() -> Optional[FinopsPersistenceService]:
+        """
+        Creates a service instance based on environment variables.
+
+        FINOPS_PROVIDER_TYPE accepts a comma-separated list (e.g. "bigquery,jsonl");
+        more than one provider is wrapped in a FanOutProvider.
+        """
+        from .providers import FanOutProvider
+
+        provider_types = [
+            t.strip() for t in os.getenv("FINOPS_PROVIDER_TYPE", "").lower().split(",") if t.strip()
+        ]
+        providers = [
+            p for p in (PersistenceFactory.create_provider(t) for t in dict.fromkeys(provider_types)) if p
+        ]
+
+        if not providers:
+            return None
+
+        provider: PersistenceProvider = providers[0] if len(providers) == 1 else FanOutProvider(providers)
+
+        spool = get_finops_spool()
+        if spool:
+            # Created before the replayer so that, on shutdown, it drains into the spool first
+            worker = FinopsPersistenceWorker(
+                persist_batch=partial(spool_items, spool, provider),
+                report_factory=item_from_row,
+                evictable=lambda item: isinstance(item, FinopsReport)
+            )
+            replayer = SpoolReplayer(
+                spool=spool,
+                persist_batch=partial(persist_items, provider),
+                report_factory=item_from_row,
+                flush_provider=provider.flush if provider.buffers_writes else None,
+                discard_provider=provider.discard_pending
+            )
+            service = FinopsPersistenceService(provider, worker, replayer)
+            PersistenceFactory._attach_rollups(service)
+            return service
+
+        worker = None
+        if FINOPS_PERSISTENCE_MODE == "async":
+            worker = FinopsPersistenceWorker(
+                persist_batch=partial(persist_items, provider),
+                report_factory=item_from_row,
+                flush_provider=provider.flush,
+                # Content and rollup rows are few and not recoverable from other rows
+                evictable=lambda item: isinstance(item, FinopsReport)
+            )
+        service = FinopsPersistenceService(provider, worker)
+        if worker is None and provider.buffers_writes:
+            # Sync mode has no thread to commit the provider buffer on shutdown
+            register_for_shutdown(service)
+        PersistenceFactory._attach_rollups(service)
+        return service
+
+    @staticmethod
+    def _attach_rollups(service: FinopsPersistenceService) -> None:
+        rollup = get_rollup_aggregator()
+        if rollup:
+            rollup.attach(service.save_rollups)
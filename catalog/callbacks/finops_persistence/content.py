@@ -0,0 +1,185 @@
+import base64
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Characters of prompt/response kept inline in each report; full texts go to the content store
+FINOPS_TEXT_PREVIEW_CHARS = int(os.getenv("FINOPS_TEXT_PREVIEW_CHARS", "1024"))
+# Writes full texts once per hash into a separate content table/file
+FINOPS_CONTENT_STORAGE = os.getenv("FINOPS_CONTENT_STORAGE", "false").lower() == "true"
+# none | zstd
+FINOPS_CONTENT_COMPRESSION = os.getenv("FINOPS_CONTENT_COMPRESSION", "none").lower()
+FINOPS_CONTENT_SEEN_CACHE_SIZE = int(os.getenv("FINOPS_CONTENT_SEEN_CACHE_SIZE", "100000"))
+
+EMPTY_TEXT = "N/A"
+
+
+def content_hash(text: str) -> str:
+    """Content address (sha256 hex) of a prompt or response text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compact_text(
+    text: Optional[str],
+    text_hash: Optional[str] = None,
+    text_chars: int = 0,
+    preview_chars: int = FINOPS_TEXT_PREVIEW_CHARS
+) -> Tuple[str, Optional[str], int]:
+    """
+    Returns (preview, hash, full length) for a text.
+
+    Hash and length are only computed when not given, so a preview rebuilt from
+    a stored row keeps the address of the original text.
+    """
+    if not text or text == EMPTY_TEXT:
+        return text or EMPTY_TEXT, text_hash, text_chars
+
+    if text_hash is None:
+        text_hash = content_hash(text)
+        text_chars = len(text)
+
+    if len(text) > preview_chars:
+        text = text[:preview_chars]
+
+    return text, text_hash, text_chars
+
+
+class ContentStore:
+    """
+    Full prompt/response texts of one invocation, stored once per content hash.
+
+    Reports only carry previews and hashes, so the same multi-hundred-KB prompt
+    referenced by the main, side and unaccounted reports is held a single time.
+    """
+
+    def __init__(self):
+        self._texts: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def put(self, text: Optional[str]) -> Optional[str]:
+        """Stores a text (if new) and returns its hash."""
+        if not text or text == EMPTY_TEXT:
+            return None
+
+        text_hash = content_hash(text)
+        with self._lock:
+            self._texts.setdefault(text_hash, text)
+        return text_hash
+
+    def get(self, text_hash: str) -> Optional[str]:
+        with self._lock:
+            return self._texts.get(text_hash)
+
+    def drain(self) -> Dict[str, str]:
+        with self._lock:
+            texts, self._texts = self._texts, {}
+            return texts
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+
+@dataclass(slots=True)
+class FinopsContent:
+    """
+    One row of the content table: a full prompt/response text keyed by its hash.
+
+    With zstd compression `content` holds the base64 of the compressed bytes and
+    `content_encoding` is "zstd"; otherwise it is the text itself ("identity").
+    """
+    content_hash: str
+    content: str
+    content_encoding: str = "identity"
+    content_chars: int = 0
+    stored_bytes: int = 0
+    interaction_timestamp: Optional[str] = None
+
+
+def encode_content(
+    text_hash: str,
+    text: str,
+    compression: str = FINOPS_CONTENT_COMPRESSION,
+    timestamp: Optional[str] = None
+) -> FinopsContent:
+    """Builds the content row for a text, compressing it if configured."""
+    raw = text.encode("utf-8")
+
+    if compression == "zstd":
+        compressor = _zstd_compressor()
+        if compressor is not None:
+            compressed = compressor.compress(raw)
+            if len(compressed) < len(raw):
+                return FinopsContent(
+                    content_hash=text_hash,
+                    content=base64.b64encode(compressed).decode("ascii"),
+                    content_encoding="zstd",
+                    content_chars=len(text),
+                    stored_bytes=len(compressed),
+                    interaction_timestamp=timestamp
+                )
+
+    return FinopsContent(
+        content_hash=text_hash,
+        content=text,
+        content_chars=len(text),
+        stored_bytes=len(raw),
+        interaction_timestamp=timestamp
+    )
+
+
+def decode_content(content: FinopsContent) -> str:
+    """Returns the original text of a content row."""
+    if content.content_encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(base64.b64decode(content.content)).decode("utf-8")
+    return content.content
+
+
+_zstd_warned = False
+
+
+def _zstd_compressor():
+    global _zstd_warned
+    try:
+        import zstandard
+    except ImportError:
+        if not _zstd_warned:
+            logger.warning("[FinOps] zstandard not installed, content rows will not be compressed.")
+            _zstd_warned = True
+        return None
+    return zstandard.ZstdCompressor(level=3)
+
+
+class SeenContentCache:
+    """
+    Bounded LRU of content hashes already sent to the sinks by this process.
+
+    Only avoids re-sending within a process; sinks still deduplicate by hash
+    (primary key or view) across processes and restarts.
+    """
+
+    def __init__(self, max_size: int = FINOPS_CONTENT_SEEN_CACHE_SIZE):
+        self.max_size = max(0, max_size)
+        self._hashes: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter_new(self, hashes: Iterable[str]) -> List[str]:
+        """Returns the hashes not seen before and marks them as seen."""
+        new = []
+        with self._lock:
+            for text_hash in hashes:
+                if text_hash in self._hashes:
+                    self._hashes.move_to_end(text_hash)
+                    continue
+                new.append(text_hash)
+                if self.max_size:
+                    self._hashes[text_hash] = None
+                    if len(self._hashes) > self.max_size:
+                        self._hashes.popitem(last=False)
+        return new
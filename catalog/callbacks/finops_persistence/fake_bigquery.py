@@ -0,0 +1,79 @@
+import io
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeLoadJob:
+    def __init__(self, error: Optional[Exception] = None):
+        self._error = error
+
+    def result(self, *args, **kwargs) -> "_FakeLoadJob":
+        if self._error:
+            raise self._error
+        return self
+
+
+class FakeBigQueryClient:
+    """
+    Local stand-in for `bigquery.Client` that records what would be sent.
+
+    Covers the two calls used by BigQueryProvider: `insert_rows_json` (stream
+    mode) and `load_table_from_file` (load mode). Load payloads are decoded back
+    into rows, so both modes can be compared. Set `fail_next` to make the next
+    call fail and exercise retries.
+    """
+
+    def __init__(self):
+        self.inserted_rows: List[Dict[str, Any]] = []
+        self.insert_calls = 0
+        self.load_jobs: List[Dict[str, Any]] = []
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        logger.debug("FakeBigQueryClient initialized.")
+
+    def insert_rows_json(self, table: str, rows: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._consume_failure():
+                return [{"index": 0, "errors": [{"reason": "fake_failure"}]}]
+            self.insert_calls += 1
+            self.inserted_rows.extend(rows)
+        logger.info(f"--- FAKE BIGQUERY INSERT: {len(rows)} rows into {table} ---")
+        return []
+
+    def load_table_from_file(self, file_obj: Any, destination: str, job_config: Any = None, **kwargs) -> _FakeLoadJob:
+        payload = file_obj.read()
+        source_format = getattr(job_config, "source_format", None)
+
+        with self._lock:
+            if self._consume_failure():
+                return _FakeLoadJob(RuntimeError("fake load job failure"))
+            rows = self._decode(payload, source_format)
+            self.load_jobs.append({
+                "destination": destination,
+                "source_format": source_format,
+                "payload_bytes": len(payload),
+                "rows": rows
+            })
+        logger.info(f"--- FAKE BIGQUERY LOAD JOB: {len(rows)} rows ({source_format}) into {destination} ---")
+        return _FakeLoadJob()
+
+    @property
+    def loaded_rows(self) -> List[Dict[str, Any]]:
+        return [row for job in self.load_jobs for row in job["rows"]]
+
+    def _consume_failure(self) -> bool:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return True
+        return False
+
+    @staticmethod
+    def _decode(payload: bytes, source_format: Optional[str]) -> List[Dict[str, Any]]:
+        if source_format == "PARQUET":
+            import pyarrow.parquet as pq
+            return pq.read_table(io.BytesIO(payload)).to_pylist()
+        return [json.loads(line) for line in payload.decode("utf-8").splitlines() if line.strip()]
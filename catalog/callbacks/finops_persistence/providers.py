@@ -0,0 +1,359 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, fields
+from typing import Any, Dict, List
+
+from .callback import FinopsPersistenceError, FinopsReport, PersistenceProvider, report_to_row
+from .content import FinopsContent
+from .rollup import FinopsRollup
+
+logger = logging.getLogger(__name__)
+
+_SQLITE_TYPES = {int: "INTEGER", float: "REAL"}
+
+
+def _report_columns(record_cls: type = FinopsReport) -> List[str]:
+    return [f.name for f in fields(record_cls)]
+
+
+def _sqlite_column_defs(record_cls: type) -> List[str]:
+    return [
+        f"{f.name} {_SQLITE_TYPES.get(f.type, 'TEXT') if isinstance(f.type, type) else 'TEXT'}"
+        for f in fields(record_cls)
+    ]
+
+
+def _arrow_schema(pa: Any, record_cls: type = FinopsReport) -> Any:
+    arrow_types = {int: pa.int64(), float: pa.float64()}
+    return pa.schema([
+        (f.name, arrow_types.get(f.type, pa.string()) if isinstance(f.type, type) else pa.string())
+        for f in fields(record_cls)
+    ])
+
+
+def rows_to_arrow_table(rows: List[Dict[str, Any]], record_cls: type = FinopsReport) -> Any:
+    """Builds a columnar (pyarrow) table with the schema of `record_cls` from storage rows."""
+    import pyarrow as pa
+
+    columns = {column: [row.get(column) for row in rows] for column in _report_columns(record_cls)}
+    return pa.Table.from_pydict(columns, schema=_arrow_schema(pa, record_cls))
+
+
+def _rows(reports: List[Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for report in reports:
+        row = report_to_row(report)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+class JsonlProvider(PersistenceProvider):
+    """
+    Appends reports as JSON lines to a local file, one write per batch.
+
+    Contents and rollups go to sibling files (`reports.contents.jsonl` and
+    `reports.rollups.jsonl` for `reports.jsonl`).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.contents_path = f"{os.path.splitext(path)[0]}.contents.jsonl"
+        self.rollups_path = f"{os.path.splitext(path)[0]}.rollups.jsonl"
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        logger.info(f"[FinOps] Initialized JSONL Provider: {self.path}")
+
+    def persist(self, report: FinopsReport) -> None:
+        self.persist_batch([report])
+
+    def persist_batch(self, reports: List[FinopsReport]) -> None:
+        rows = _rows(reports)
+        if not rows:
+            return
+
+        self._append(self.path, rows)
+        logger.debug(f"[FinOps] Successfully persisted {len(rows)} reports to JSONL.")
+
+    def persist_contents(self, contents: List[FinopsContent]) -> None:
+        if not contents:
+            return
+
+        self._append(self.contents_path, [asdict(c) for c in contents])
+        logger.debug(f"[FinOps] Successfully persisted {len(contents)} contents to JSONL.")
+
+    def persist_rollups(self, rollups: List[FinopsRollup]) -> None:
+        if not rollups:
+            return
+
+        self._append(self.rollups_path, [asdict(r) for r in rollups])
+        logger.debug(f"[FinOps] Successfully persisted {len(rollups)} rollups to JSONL.")
+
+    def _append(self, path: str, rows: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        try:
+            with self._lock, open(path, "a", encoding="utf-8") as f:
+                f.write(data)
+        except OSError as e:
+            raise FinopsPersistenceError(f"JSONL write to '{path}' failed: {e}") from e
+
+
+class SqliteProvider(PersistenceProvider):
+    """
+    Stores reports in a local SQLite table, one executemany transaction per batch.
+
+    Contents go to `<table>_contents` (one row per hash) and the `<table>_full`
+    view joins them back to the reports. Rollups go to `<table>_rollups`.
+    """
+
+    def __init__(self, path: str, table: str = "finops_reports"):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid SQLite table name: {table}")
+
+        self.path = path
+        self.table = table
+        self.contents_table = f"{table}_contents"
+        self.rollups_table = f"{table}_rollups"
+        self.columns = _report_columns()
+        self.content_columns = _report_columns(FinopsContent)
+        self.rollup_columns = _report_columns(FinopsRollup)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        column_defs = ", ".join(_sqlite_column_defs(FinopsReport))
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})")
+        self._add_missing_columns(table, FinopsReport)
+
+        content_defs = ", ".join(_sqlite_column_defs(FinopsContent))
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.contents_table} ({content_defs}, PRIMARY KEY (content_hash))"
+        )
+        rollup_defs = ", ".join(_sqlite_column_defs(FinopsRollup))
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {self.rollups_table} ({rollup_defs})")
+        self._add_missing_columns(self.rollups_table, FinopsRollup)
+        self._conn.execute(f"""
+            CREATE VIEW IF NOT EXISTS {table}_full AS
+            SELECT r.*,
+                   CASE WHEN p.content_encoding = 'identity' THEN p.content END AS user_prompt_full,
+                   CASE WHEN a.content_encoding = 'identity' THEN a.content END AS agent_response_full
+            FROM {table} r
+            LEFT JOIN {self.contents_table} p ON p.content_hash = r.user_prompt_hash
+            LEFT JOIN {self.contents_table} a ON a.content_hash = r.agent_response_hash
+        """)
+        self._conn.commit()
+
+        self._insert_sql = (
+            f"INSERT INTO {table} ({', '.join(self.columns)}) "
+            f"VALUES ({', '.join('?' for _ in self.columns)})"
+        )
+        self._insert_content_sql = (
+            f"INSERT OR IGNORE INTO {self.contents_table} ({', '.join(self.content_columns)}) "
+            f"VALUES ({', '.join('?' for _ in self.content_columns)})"
+        )
+        self._insert_rollup_sql = (
+            f"INSERT INTO {self.rollups_table} ({', '.join(self.rollup_columns)}) "
+            f"VALUES ({', '.join('?' for _ in self.rollup_columns)})"
+        )
+
+        logger.info(f"[FinOps] Initialized SQLite Provider: {self.path} ({self.table})")
+
+    def _add_missing_columns(self, table: str, record_cls: type) -> None:
+        """Adds columns introduced after the table was created (older local databases)."""
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        for column_def in _sqlite_column_defs(record_cls):
+            name = column_def.split(" ", 1)[0]
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column_def}")
+                logger.info(f"[FinOps] Added column '{name}' to SQLite table {table}")
+
+    def persist(self, report: FinopsReport) -> None:
+        self.persist_batch([report])
+
+    def persist_batch(self, reports: List[FinopsReport]) -> None:
+        rows = _rows(reports)
+        if not rows:
+            return
+
+        values = [tuple(row.get(column) for column in self.columns) for row in rows]
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(self._insert_sql, values)
+        except sqlite3.Error as e:
+            raise FinopsPersistenceError(f"SQLite insert into '{self.path}' failed: {e}") from e
+
+        logger.debug(f"[FinOps] Successfully persisted {len(rows)} reports to SQLite.")
+
+    def persist_contents(self, contents: List[FinopsContent]) -> None:
+        if not contents:
+            return
+
+        values = [tuple(getattr(c, column) for column in self.content_columns) for c in contents]
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(self._insert_content_sql, values)
+        except sqlite3.Error as e:
+            raise FinopsPersistenceError(f"SQLite content insert into '{self.path}' failed: {e}") from e
+
+        logger.debug(f"[FinOps] Successfully persisted {len(contents)} contents to SQLite.")
+
+    def persist_rollups(self, rollups: List[FinopsRollup]) -> None:
+        if not rollups:
+            return
+
+        values = [tuple(getattr(r, column) for column in self.rollup_columns) for r in rollups]
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(self._insert_rollup_sql, values)
+        except sqlite3.Error as e:
+            raise FinopsPersistenceError(f"SQLite rollup insert into '{self.path}' failed: {e}") from e
+
+        logger.debug(f"[FinOps] Successfully persisted {len(rollups)} rollups to SQLite.")
+
+
+class ParquetProvider(PersistenceProvider):
+    """
+    Writes reports as Parquet files partitioned by day (`dt=YYYY-MM-DD`).
+
+    Each batch becomes one file (a single row group) per partition it touches.
+    Contents and rollups are written the same way to the sibling directories
+    `<directory>_contents` and `<directory>_rollups`. Requires the optional
+    `pyarrow` dependency.
+    """
+
+    def __init__(self, directory: str):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet provider requires 'pyarrow' (pip install pyarrow)") from e
+
+        self._pq = pq
+        self.directory = directory
+        self.contents_directory = f"{directory.rstrip(os.sep)}_contents"
+        self.rollups_directory = f"{directory.rstrip(os.sep)}_rollups"
+
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"[FinOps] Initialized Parquet Provider: {self.directory}")
+
+    def persist(self, report: FinopsReport) -> None:
+        self.persist_batch([report])
+
+    def persist_batch(self, reports: List[FinopsReport]) -> None:
+        rows = _rows(reports)
+        if not rows:
+            return
+
+        self._write_partitioned(rows, FinopsReport, self.directory)
+        logger.debug(f"[FinOps] Successfully persisted {len(rows)} reports to Parquet.")
+
+    def persist_contents(self, contents: List[FinopsContent]) -> None:
+        if not contents:
+            return
+
+        self._write_partitioned([asdict(c) for c in contents], FinopsContent, self.contents_directory)
+        logger.debug(f"[FinOps] Successfully persisted {len(contents)} contents to Parquet.")
+
+    def persist_rollups(self, rollups: List[FinopsRollup]) -> None:
+        if not rollups:
+            return
+
+        self._write_partitioned([asdict(r) for r in rollups], FinopsRollup, self.rollups_directory)
+        logger.debug(f"[FinOps] Successfully persisted {len(rollups)} rollups to Parquet.")
+
+    def _write_partitioned(self, rows: List[Dict[str, Any]], record_cls: type, directory: str) -> None:
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            day = str(row.get("interaction_timestamp") or "")[:10] or "unknown"
+            partitions.setdefault(day, []).append(row)
+
+        try:
+            for day, partition_rows in partitions.items():
+                table = rows_to_arrow_table(partition_rows, record_cls)
+
+                partition_dir = os.path.join(directory, f"dt={day}")
+                os.makedirs(partition_dir, exist_ok=True)
+                self._pq.write_table(table, os.path.join(partition_dir, f"part-{uuid.uuid4().hex}.parquet"))
+        except Exception as e:
+            raise FinopsPersistenceError(f"Parquet write to '{directory}' failed: {e}") from e
+
+
+class FanOutProvider(PersistenceProvider):
+    """
+    Writes each batch to several providers concurrently.
+
+    Fails if any sink fails; a retried batch is written again to every sink, so
+    sinks that succeeded the first time may receive duplicates.
+    """
+
+    def __init__(self, providers: List[PersistenceProvider]):
+        self.providers = providers
+        self.buffers_writes = any(p.buffers_writes for p in providers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(providers)),
+            thread_name_prefix="finops-fanout"
+        )
+        logger.info(f"[FinOps] Initialized Fan-out Provider: {[type(p).__name__ for p in providers]}")
+
+    def persist(self, report: FinopsReport) -> None:
+        self.persist_batch([report])
+
+    def persist_batch(self, reports: List[FinopsReport]) -> None:
+        if not reports:
+            return
+        self._fan_out("persist_batch", reports)
+
+    def persist_contents(self, contents: List[FinopsContent]) -> None:
+        if not contents:
+            return
+        self._fan_out("persist_contents", contents)
+
+    def persist_rollups(self, rollups: List[FinopsRollup]) -> None:
+        if not rollups:
+            return
+        self._fan_out("persist_rollups", rollups)
+
+    def _fan_out(self, method: str, items: List[Any]) -> None:
+        futures = [
+            (provider, self._executor.submit(getattr(provider, method), items))
+            for provider in self.providers
+        ]
+
+        failures = []
+        for provider, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failures.append(f"{type(provider).__name__}: {e}")
+
+        if failures:
+            raise FinopsPersistenceError(f"Fan-out persistence failed for {len(failures)} sink(s): {failures}")
+
+    def flush(self, force: bool = True) -> None:
+        failures = []
+        for provider in self.providers:
+            try:
+                provider.flush(force)
+            except Exception as e:
+                failures.append(f"{type(provider).__name__}: {e}")
+
+        if failures:
+            raise FinopsPersistenceError(f"Fan-out commit failed for {len(failures)} sink(s): {failures}")
+
+    def discard_pending(self) -> None:
+        for provider in self.providers:
+            provider.discard_pending()
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .sketch import LogHistogram
+
+logger = logging.getLogger(__name__)
+
+# Process-wide rolling percentiles over the last minutes of traffic
+FINOPS_ROLLING_ENABLED = os.getenv("FINOPS_ROLLING_ENABLED", "true").lower() == "true"
+FINOPS_ROLLING_WINDOWS_MINUTES = [
+    int(w) for w in os.getenv("FINOPS_ROLLING_WINDOWS_MINUTES", "1,5,60").split(",") if w.strip()
+]
+FINOPS_ROLLING_SKETCH_ACCURACY = float(os.getenv("FINOPS_ROLLING_SKETCH_ACCURACY", "0.01"))
+# Models beyond this limit are counted under "other", so memory does not grow with model names
+FINOPS_ROLLING_MAX_MODELS = int(os.getenv("FINOPS_ROLLING_MAX_MODELS", "32"))
+
+ROLLING_METRICS = (
+    "execution_time_ms",
+    "prompt_token_count",
+    "candidates_token_count",
+    "total_token_count",
+)
+ROLLING_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+# Side reports without a model call of their own: tokens count, latency does not
+UNTIMED_KINDS = frozenset({"unaccounted", "translation_cache_hit", "translation_skipped_language"})
+ALL_MODELS = "__all__"
+OTHER_MODELS = "other"
+
+SLOT_SECONDS = 60
+
+# model_name -> metric -> sketch
+SlotSketches = Dict[str, Dict[str, LogHistogram]]
+
+
+class RollingPercentiles:
+    """
+    Rolling latency and token percentiles across every session of the process.
+
+    Reports are added to one-minute slots of LogHistogram sketches, kept in a
+    ring as long as the largest window. A window is answered by merging its
+    slots, so memory depends on the number of slots, models and metrics, never
+    on the number of reports. Exported sketches of several workers merge into
+    the same percentiles with `merge_exports`.
+    """
+
+    def __init__(
+        self,
+        windows_minutes: Iterable[int] = FINOPS_ROLLING_WINDOWS_MINUTES,
+        sketch_accuracy: float = FINOPS_ROLLING_SKETCH_ACCURACY,
+        max_models: int = FINOPS_ROLLING_MAX_MODELS
+    ):
+        self.windows_minutes = sorted({max(1, w) for w in windows_minutes}) or [1]
+        self.sketch_accuracy = sketch_accuracy
+        self.max_models = max(1, max_models)
+
+        self._ring_size = self.windows_minutes[-1]
+        # Each ring position holds (minute, sketches) for the minute it was last written
+        self._ring: List[Tuple[int, SlotSketches]] = [(-1, {}) for _ in range(self._ring_size)]
+        self._models: set = set()
+        self._lock = threading.Lock()
+
+    def add(self, reports: Iterable[Any], now: Optional[float] = None) -> None:
+        """Adds FinOps reports (FinopsReport objects) to the current minute."""
+        minute = int((now or time.time()) // SLOT_SECONDS)
+
+        with self._lock:
+            sketches = self._slot(minute)
+            if sketches is None:
+                return
+            for report in reports:
+                model = self._model_key(report.model_name or "unknown_model")
+                for model_key in (model, ALL_MODELS):
+                    per_metric = sketches.get(model_key)
+                    if per_metric is None:
+                        per_metric = sketches[model_key] = {
+                            metric: LogHistogram(self.sketch_accuracy) for metric in ROLLING_METRICS
+                        }
+                    for metric in ROLLING_METRICS:
+                        if metric == "execution_time_ms" and not _is_timed(report):
+                            continue
+                        per_metric[metric].add(getattr(report, metric, 0) or 0)
+
+    def export(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Serialized sketches per window and model, for merging across workers.
+
+        {"windows": {"5": {"gemini-2.5-flash": {"execution_time_ms": {...}}}}}
+        """
+        return {
+            "windows": {
+                str(window): {
+                    model: {metric: sketch.to_dict() for metric, sketch in per_metric.items()}
+                    for model, per_metric in self._merged(window, now).items()
+                }
+                for window in self.windows_minutes
+            }
+        }
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Percentiles per window and model (count, mean and p50/p90/p95/p99 of each metric).
+
+        `count` is the number of timed model calls; token metrics also include
+        side reports (unaccounted usage, translation cache hits).
+        """
+        return {
+            "windows": {
+                str(window): _summarize(self._merged(window, now))
+                for window in self.windows_minutes
+            }
+        }
+
+    def _slot(self, minute: int) -> Optional[SlotSketches]:
+        position = minute % self._ring_size
+        slot_minute, sketches = self._ring[position]
+        if slot_minute > minute:
+            # Late report for a minute that already left every window
+            return None
+        if slot_minute != minute:
+            # The position held an older minute, which just left the largest window
+            sketches = {}
+            self._ring[position] = (minute, sketches)
+        return sketches
+
+    def _model_key(self, model_name: str) -> str:
+        if model_name in self._models:
+            return model_name
+        if len(self._models) >= self.max_models:
+            return OTHER_MODELS
+        self._models.add(model_name)
+        return model_name
+
+    def _merged(self, window: int, now: Optional[float]) -> SlotSketches:
+        current = int((now or time.time()) // SLOT_SECONDS)
+        merged: SlotSketches = {}
+
+        with self._lock:
+            for slot_minute, sketches in self._ring:
+                if not current - window < slot_minute <= current:
+                    continue
+                for model, per_metric in sketches.items():
+                    target = merged.get(model)
+                    if target is None:
+                        target = merged[model] = {
+                            metric: LogHistogram(self.sketch_accuracy) for metric in ROLLING_METRICS
+                        }
+                    for metric, sketch in per_metric.items():
+                        target[metric].merge(sketch)
+        return merged
+
+
+def _is_timed(report: Any) -> bool:
+    """Whether the report is a model call with a measured latency (0 ms is the unset default)."""
+    return getattr(report, "interaction_kind", None) not in UNTIMED_KINDS and (report.execution_time_ms or 0) > 0
+
+
+def _summarize(sketches: SlotSketches) -> Dict[str, Any]:
+    summary = {}
+    for model, per_metric in sketches.items():
+        summary[model] = {
+            "count": per_metric["execution_time_ms"].count,
+            **{
+                metric: {
+                    "mean": sketch.sum / sketch.count if sketch.count else None,
+                    **{f"p{int(q * 100)}": sketch.quantile(q) for q in ROLLING_QUANTILES}
+                }
+                for metric, sketch in per_metric.items()
+            }
+        }
+    return summary
+
+
+def merge_exports(exports: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merges `RollingPercentiles.export()` payloads of several workers into one snapshot."""
+    merged: Dict[str, SlotSketches] = {}
+    for payload in exports:
+        for window, models in payload.get("windows", {}).items():
+            window_sketches = merged.setdefault(window, {})
+            for model, per_metric in models.items():
+                target = window_sketches.setdefault(model, {})
+                for metric, data in per_metric.items():
+                    sketch = LogHistogram.from_dict(data)
+                    if metric in target:
+                        target[metric].merge(sketch)
+                    else:
+                        target[metric] = sketch
+
+    return {"windows": {window: _summarize(sketches) for window, sketches in merged.items()}}
+
+
+# --- Singleton Factory ---
+_rolling_instance: Optional[RollingPercentiles] = None
+_rolling_lock = threading.Lock()
+
+
+def get_rolling_percentiles() -> Optional[RollingPercentiles]:
+    """Lazy singleton factory for the RollingPercentiles. Returns None when disabled."""
+    global _rolling_instance
+    if not FINOPS_ROLLING_ENABLED:
+        return None
+    if _rolling_instance:
+        return _rolling_instance
+
+    with _rolling_lock:
+        if _rolling_instance is None:
+            _rolling_instance = RollingPercentiles()
+            logger.info(f"[FinOps] Rolling percentiles enabled (windows={_rolling_instance.windows_minutes} min)")
+
+    return _rolling_instance
@@ -0,0 +1,308 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .sketch import LogHistogram
+from .worker import FINOPS_SHUTDOWN_TIMEOUT_SECONDS, register_for_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Pre-aggregated rollups per (app, agent, model, kind, window)
+FINOPS_ROLLUP_ENABLED = os.getenv("FINOPS_ROLLUP_ENABLED", "false").lower() == "true"
+FINOPS_ROLLUP_WINDOW_SECONDS = int(os.getenv("FINOPS_ROLLUP_WINDOW_SECONDS", "60"))
+FINOPS_ROLLUP_FLUSH_INTERVAL_SECONDS = float(os.getenv("FINOPS_ROLLUP_FLUSH_INTERVAL_SECONDS", "15"))
+FINOPS_ROLLUP_SKETCH_ACCURACY = float(os.getenv("FINOPS_ROLLUP_SKETCH_ACCURACY", "0.01"))
+# Per-session totals, flushed at the end of each invocation or after the session goes idle
+FINOPS_ROLLUP_SESSIONS = os.getenv("FINOPS_ROLLUP_SESSIONS", "true").lower() == "true"
+FINOPS_ROLLUP_SESSION_IDLE_SECONDS = float(os.getenv("FINOPS_ROLLUP_SESSION_IDLE_SECONDS", "300"))
+
+RollupKey = Tuple[int, str, str, str, str]
+SessionRollupKey = Tuple[str, str, str, str]
+
+
+@dataclass(slots=True)
+class FinopsRollup:
+    """
+    Aggregated FinOps counters of one (app, agent, model, kind) in one time window.
+
+    `interaction_timestamp` is the start of the window. `latency_sketch` is the
+    serialized LogHistogram of execution times, so windows can be merged later
+    (e.g. minutes into hours) without losing the percentiles.
+
+    Per-session rows have `session_id` set and cover the calls of that session
+    since its previous per-session row (usually one invocation); the window then
+    spans from its first to its last call. Per-window rows leave it empty.
+    """
+    interaction_timestamp: str
+    window_seconds: int
+    agent_app_name: Optional[str] = None
+    agent_name: Optional[str] = None
+    model_name: str = "unknown_model"
+    interaction_kind: str = "agent"
+    session_id: Optional[str] = None
+    call_count: int = 0
+    session_count: int = 0
+    prompt_token_count: int = 0
+    candidates_token_count: int = 0
+    thoughts_token_count: int = 0
+    cached_content_token_count: int = 0
+    total_token_count: int = 0
+    execution_time_ms_sum: float = 0.0
+    execution_time_ms_min: float = 0.0
+    execution_time_ms_max: float = 0.0
+    execution_time_ms_p50: float = 0.0
+    execution_time_ms_p90: float = 0.0
+    execution_time_ms_p99: float = 0.0
+    latency_sketch: str = "{}"
+
+
+class _RollupBucket:
+    __slots__ = ("calls", "sessions", "prompt", "candidates", "thoughts", "cached", "total", "latency")
+
+    def __init__(self, accuracy: float):
+        self.calls = 0
+        self.sessions: Set[str] = set()
+        self.prompt = 0
+        self.candidates = 0
+        self.thoughts = 0
+        self.cached = 0
+        self.total = 0
+        self.latency = LogHistogram(accuracy)
+
+    def add(self, report: Any) -> None:
+        self.calls += 1
+        if report.session_id:
+            self.sessions.add(report.session_id)
+        self.prompt += report.prompt_token_count or 0
+        self.candidates += report.candidates_token_count or 0
+        self.thoughts += report.thoughts_token_count or 0
+        self.cached += report.cached_content_token_count or 0
+        self.total += report.total_token_count or 0
+        self.latency.add(report.execution_time_ms or 0.0)
+
+
+class _SessionRollup:
+    __slots__ = ("first_seen", "last_seen", "buckets")
+
+    def __init__(self, now: float):
+        self.first_seen = now
+        self.last_seen = now
+        self.buckets: Dict[SessionRollupKey, _RollupBucket] = {}
+
+
+class RollupAggregator:
+    """
+    In-process aggregator fed by the FinOps callbacks.
+
+    Keeps counters and a latency sketch per (app, agent, model, kind, window) and
+    hands one FinopsRollup row per key to the sink once its window closed, so the
+    number of rows written depends on traffic shape, not on traffic volume.
+
+    With `per_session`, it also keeps the same counters per (session, app, agent,
+    model, kind); `flush_session` sends them when an invocation ends, and
+    sessions idle for `session_idle_seconds` are sent by the flush thread.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[Callable[[List[FinopsRollup]], None]] = None,
+        window_seconds: int = FINOPS_ROLLUP_WINDOW_SECONDS,
+        flush_interval_seconds: float = FINOPS_ROLLUP_FLUSH_INTERVAL_SECONDS,
+        sketch_accuracy: float = FINOPS_ROLLUP_SKETCH_ACCURACY,
+        per_session: bool = FINOPS_ROLLUP_SESSIONS,
+        session_idle_seconds: float = FINOPS_ROLLUP_SESSION_IDLE_SECONDS
+    ):
+        self.sink = sink
+        self.window_seconds = max(1, window_seconds)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.sketch_accuracy = sketch_accuracy
+        self.per_session = per_session
+        self.session_idle_seconds = session_idle_seconds
+
+        self._buckets: Dict[RollupKey, _RollupBucket] = {}
+        self._sessions: Dict[str, _SessionRollup] = {}
+        self._lock = threading.Lock()
+        self._counters = {"reports": 0, "rollups": 0, "dropped_rollups": 0}
+        self._stopping = threading.Event()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="finops-rollup", daemon=True)
+        self._thread.start()
+        # Producers stop before the persistence workers, so their last rows are still shipped
+        register_for_shutdown(self, first=True)
+
+        logger.info(f"[FinOps] Rollup aggregator started (window={self.window_seconds}s)")
+
+    def attach(self, sink: Callable[[List[FinopsRollup]], None]) -> None:
+        """Sets where closed windows are sent (the persistence service)."""
+        self.sink = sink
+
+    def add(self, agent_name: Optional[str], reports: List[Any], now: Optional[float] = None) -> None:
+        """Adds the reports of one model call (main and side-channel reports)."""
+        now = now or time.time()
+        window = int(now // self.window_seconds) * self.window_seconds
+
+        with self._lock:
+            for report in reports:
+                dimensions = (
+                    report.agent_app_name or "",
+                    agent_name or "",
+                    report.model_name or "unknown_model",
+                    report.interaction_kind or "agent"
+                )
+                key = (window,) + dimensions
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = _RollupBucket(self.sketch_accuracy)
+                bucket.add(report)
+
+                if self.per_session and report.session_id:
+                    session = self._sessions.get(report.session_id)
+                    if session is None:
+                        session = self._sessions[report.session_id] = _SessionRollup(now)
+                    session.last_seen = max(session.last_seen, now)
+                    session_bucket = session.buckets.get(dimensions)
+                    if session_bucket is None:
+                        session_bucket = session.buckets[dimensions] = _RollupBucket(self.sketch_accuracy)
+                    session_bucket.add(report)
+
+            self._counters["reports"] += len(reports)
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Sends closed windows and idle sessions (everything with force=True).
+        Returns the rows sent.
+        """
+        now = time.time()
+        current_window = int(now // self.window_seconds) * self.window_seconds
+
+        with self._lock:
+            closed = [key for key in self._buckets if force or key[0] < current_window]
+            buckets = [(key, self._buckets.pop(key)) for key in closed]
+            idle = [
+                session_id for session_id, session in self._sessions.items()
+                if force or now - session.last_seen >= self.session_idle_seconds
+            ]
+            sessions = [(session_id, self._sessions.pop(session_id)) for session_id in idle]
+
+        rows = [self._to_rollup(key, bucket) for key, bucket in buckets]
+        for session_id, session in sessions:
+            rows.extend(self._session_rows(session_id, session))
+        return self._send(rows)
+
+    def flush_session(self, session_id: Optional[str]) -> int:
+        """Sends the per-session rows of a session whose invocation just ended."""
+        if not session_id:
+            return 0
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return 0
+        return self._send(self._session_rows(session_id, session))
+
+    def _send(self, rows: List[FinopsRollup]) -> int:
+        if not rows:
+            return 0
+
+        if self.sink is None:
+            logger.warning(f"[FinOps] No persistence service for rollups, {len(rows)} rollup rows dropped.")
+            self._counters["dropped_rollups"] += len(rows)
+            return 0
+
+        try:
+            self.sink(rows)
+        except Exception as e:
+            logger.error(f"[FinOps] Failed to hand over {len(rows)} rollup rows: {e}")
+            self._counters["dropped_rollups"] += len(rows)
+            return 0
+
+        self._counters["rollups"] += len(rows)
+        logger.debug(f"[FinOps] Flushed {len(rows)} rollup rows")
+        return len(rows)
+
+    def close(self, timeout: float = FINOPS_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Stops the flush thread and sends every open window."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.set()
+        self._thread.join(timeout)
+        self.flush(force=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["open_keys"] = len(self._buckets)
+            stats["open_sessions"] = len(self._sessions)
+        return stats
+
+    def _session_rows(self, session_id: str, session: _SessionRollup) -> List[FinopsRollup]:
+        span = int(round(session.last_seen - session.first_seen))
+        return [
+            self._to_rollup((int(session.first_seen),) + dimensions, bucket, span, session_id)
+            for dimensions, bucket in session.buckets.items()
+        ]
+
+    def _to_rollup(
+        self,
+        key: RollupKey,
+        bucket: _RollupBucket,
+        window_seconds: Optional[int] = None,
+        session_id: Optional[str] = None
+    ) -> FinopsRollup:
+        window, app_name, agent_name, model_name, kind = key
+        latency = bucket.latency
+        return FinopsRollup(
+            interaction_timestamp=datetime.fromtimestamp(window, timezone.utc).isoformat(),
+            window_seconds=self.window_seconds if window_seconds is None else window_seconds,
+            agent_app_name=app_name or None,
+            agent_name=agent_name or None,
+            model_name=model_name,
+            interaction_kind=kind,
+            session_id=session_id,
+            call_count=bucket.calls,
+            session_count=len(bucket.sessions),
+            prompt_token_count=bucket.prompt,
+            candidates_token_count=bucket.candidates,
+            thoughts_token_count=bucket.thoughts,
+            cached_content_token_count=bucket.cached,
+            total_token_count=bucket.total,
+            execution_time_ms_sum=latency.sum,
+            execution_time_ms_min=latency.min,
+            execution_time_ms_max=latency.max,
+            execution_time_ms_p50=latency.quantile(0.5),
+            execution_time_ms_p90=latency.quantile(0.9),
+            execution_time_ms_p99=latency.quantile(0.99),
+            latency_sketch=latency.to_json()
+        )
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[FinOps] Rollup flush failed: {e}", exc_info=True)
+
+
+# --- Singleton Factory ---
+_rollup_instance: Optional[RollupAggregator] = None
+_rollup_lock = threading.Lock()
+
+
+def get_rollup_aggregator() -> Optional[RollupAggregator]:
+    """Lazy singleton factory for the RollupAggregator. Returns None when disabled."""
+    global _rollup_instance
+    if not FINOPS_ROLLUP_ENABLED:
+        return None
+    if _rollup_instance:
+        return _rollup_instance
+
+    with _rollup_lock:
+        if _rollup_instance is None:
+            _rollup_instance = RollupAggregator()
+
+    return _rollup_instance
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults for agents without a `finops.sampling` block in the YAML config
+FINOPS_SAMPLE_RATE = float(os.getenv("FINOPS_SAMPLE_RATE", "1.0"))
+# Tail rules keep every report of an invocation over these limits (0 disables)
+FINOPS_TAIL_LATENCY_MS = float(os.getenv("FINOPS_TAIL_LATENCY_MS", "0"))
+FINOPS_TAIL_TOTAL_TOKENS = int(os.getenv("FINOPS_TAIL_TOTAL_TOKENS", "0"))
+FINOPS_TAIL_KEEP_ERRORS = os.getenv("FINOPS_TAIL_KEEP_ERRORS", "true").lower() == "true"
+
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    """
+    Which detailed reports of an agent are persisted.
+
+    Head sampling keeps a `head_rate` fraction of sessions, decided by a hash of
+    the session id, so a kept session has all its rows. Tail rules keep the
+    reports of slow, expensive or failed invocations regardless of the head
+    decision.
+    """
+    head_rate: float = FINOPS_SAMPLE_RATE
+    tail_latency_ms: float = FINOPS_TAIL_LATENCY_MS
+    tail_total_tokens: int = FINOPS_TAIL_TOTAL_TOKENS
+    keep_errors: bool = FINOPS_TAIL_KEEP_ERRORS
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "SamplingPolicy":
+        """Builds a policy from the `finops.sampling` block of an agent config."""
+        if not config:
+            return cls()
+
+        tail = config.get("tail") or {}
+        return cls(
+            head_rate=min(1.0, max(0.0, float(config.get("head_rate", FINOPS_SAMPLE_RATE)))),
+            tail_latency_ms=float(tail.get("latency_ms", FINOPS_TAIL_LATENCY_MS)),
+            tail_total_tokens=int(tail.get("total_tokens", FINOPS_TAIL_TOTAL_TOKENS)),
+            keep_errors=bool(tail.get("errors", FINOPS_TAIL_KEEP_ERRORS))
+        )
+
+    def keeps_session(self, session_id: Optional[str]) -> bool:
+        if self.head_rate >= 1.0:
+            return True
+        if self.head_rate <= 0.0:
+            return False
+        bucket = zlib.crc32((session_id or "").encode("utf-8")) / 0xFFFFFFFF
+        return bucket < self.head_rate
+
+    def is_tail(self, latency_ms: float, total_tokens: int, had_error: bool) -> bool:
+        return (
+            (self.keep_errors and had_error)
+            or (self.tail_latency_ms > 0 and latency_ms >= self.tail_latency_ms)
+            or (self.tail_total_tokens > 0 and total_tokens >= self.tail_total_tokens)
+        )
+
+
+class ReportSampler:
+    """
+    Applies the per-agent sampling policies to the detailed reports of an invocation.
+
+    Each kept report records the probability it had of being kept in
+    `sample_rate` (1.0 when a tail rule matched, the head rate otherwise), so
+    totals can be re-weighted as sum(value / sample_rate).
+    """
+
+    def __init__(self):
+        self._policies: Dict[str, SamplingPolicy] = {}
+        self._default = SamplingPolicy()
+        self._lock = threading.Lock()
+        self._counters = {"kept": 0, "kept_by_tail": 0, "dropped": 0}
+
+    def register(self, agent_name: str, config: Optional[Dict[str, Any]]) -> SamplingPolicy:
+        policy = SamplingPolicy.from_config(config)
+        with self._lock:
+            self._policies[agent_name] = policy
+        if policy != self._default:
+            logger.info(f"[FinOps] Sampling policy for agent '{agent_name}': {policy}")
+        return policy
+
+    def policy_for(self, agent_name: Optional[str]) -> SamplingPolicy:
+        with self._lock:
+            return self._policies.get(agent_name or "", self._default)
+
+    def sample(
+        self,
+        reports: List[Any],
+        had_error: bool = False,
+        latency_ms: Optional[float] = None,
+        total_tokens: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Returns the reports to persist, with `sample_rate` set.
+
+        `reports` should be every row of one invocation, and `latency_ms` /
+        `total_tokens` its totals (InvocationAccumulator.latency_ms() and
+        .total_tokens), so the tail decision is the same for all of them.
+        Without totals, the slowest report and the token sum are used.
+        """
+        if not reports:
+            return reports
+
+        if latency_ms is None:
+            latency_ms = max(r.execution_time_ms or 0.0 for r in reports)
+        if total_tokens is None:
+            total_tokens = sum(r.total_token_count or 0 for r in reports)
+
+        kept = []
+        kept_by_tail = 0
+        for report in reports:
+            policy = self.policy_for(report.agent_name)
+
+            if policy.head_rate >= 1.0:
+                report.sample_rate = 1.0
+            elif policy.is_tail(latency_ms, total_tokens, had_error):
+                report.sample_rate = 1.0
+                kept_by_tail += 1
+            elif policy.keeps_session(report.session_id):
+                report.sample_rate = policy.head_rate
+            else:
+                continue
+            kept.append(report)
+
+        with self._lock:
+            self._counters["kept"] += len(kept)
+            self._counters["kept_by_tail"] += kept_by_tail
+            self._counters["dropped"] += len(reports) - len(kept)
+        return kept
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+# --- Singleton Factory ---
+_sampler_instance: Optional[ReportSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_report_sampler() -> ReportSampler:
+    """Lazy singleton factory for the ReportSampler."""
+    global _sampler_instance
+    if _sampler_instance:
+        return _sampler_instance
+
+    with _sampler_lock:
+        if _sampler_instance is None:
+            _sampler_instance = ReportSampler()
+
+    return _sampler_instance
+
+
+def register_sampling_policy(agent_name: str, config: Optional[Dict[str, Any]]) -> SamplingPolicy:
+    """Registers the `finops.sampling` block of an agent config (used by the agent builder)."""
+    return get_report_sampler().register(agent_name, config)
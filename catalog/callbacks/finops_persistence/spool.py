@@ -0,0 +1,317 @@
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .worker import FINOPS_BATCH_MAX_ROWS, register_for_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Write-ahead spool configuration
+FINOPS_SPOOL_ENABLED = os.getenv("FINOPS_SPOOL_ENABLED", "false").lower() == "true"
+FINOPS_SPOOL_DIR = os.getenv("FINOPS_SPOOL_DIR", ".adk/finops_spool")
+FINOPS_SPOOL_SEGMENT_MAX_BYTES = int(os.getenv("FINOPS_SPOOL_SEGMENT_MAX_BYTES", str(4 * 1024 * 1024)))
+FINOPS_SPOOL_REPLAY_INTERVAL_SECONDS = float(os.getenv("FINOPS_SPOOL_REPLAY_INTERVAL_SECONDS", "5"))
+FINOPS_SPOOL_MAX_BACKOFF_SECONDS = float(os.getenv("FINOPS_SPOOL_MAX_BACKOFF_SECONDS", "300"))
+
+_SEGMENT_PATTERN = re.compile(r"^segment-(\d{12})\.jsonl$")
+
+
+def _to_row(report: Any) -> Dict[str, Any]:
+    return report if isinstance(report, dict) else asdict(report)
+
+
+class FinopsSpool:
+    """
+    Append-only, segmented write-ahead log for FinOps reports.
+
+    Each batch is one JSON line in the active segment, made durable with a single
+    fsync. Acknowledged lines are tracked in a `.ack` sidecar per segment, so a
+    restart resumes right after the last shipped batch; fully acknowledged
+    segments are deleted.
+    """
+
+    def __init__(self, directory: str = FINOPS_SPOOL_DIR, segment_max_bytes: int = FINOPS_SPOOL_SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        sequences = self._sequences()
+        # Never append to a segment left by a previous process: it may end in a torn write
+        self._active_sequence = (sequences[-1] + 1) if sequences else 0
+        self._active_file = None
+
+        if sequences:
+            logger.info(f"[FinOps] Spool '{directory}' has {len(sequences)} pending segment(s) to replay")
+
+    def append(self, reports: List[Any]) -> None:
+        """Durably appends one batch. Returns only after the batch reached the disk."""
+        if not reports:
+            return
+
+        line = json.dumps({"rows": [_to_row(r) for r in reports]}, default=str) + "\n"
+        data = line.encode("utf-8")
+
+        with self._lock:
+            if self._active_file is None:
+                self._open_active_segment()
+            self._active_file.write(data)
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+
+            if self._active_file.tell() >= self.segment_max_bytes:
+                self._rotate()
+
+    def seal(self) -> None:
+        """Closes the active segment (if it has data) so it can be replayed."""
+        with self._lock:
+            if self._active_file is not None and self._active_file.tell() > 0:
+                self._rotate()
+
+    def sealed_segments(self) -> List[str]:
+        with self._lock:
+            active = self._active_sequence
+        return [self._segment_path(seq) for seq in self._sequences() if seq < active]
+
+    def read_segment(self, path: str) -> Tuple[List[List[Dict[str, Any]]], int]:
+        """Returns the batches of a segment and how many of them were already acknowledged."""
+        batches: List[List[Dict[str, Any]]] = []
+        with open(path, "rb") as f:
+            for raw in f:
+                try:
+                    batches.append(json.loads(raw)["rows"])
+                except (ValueError, KeyError):
+                    # A torn trailing write from a crash: nothing after it was acknowledged to callers
+                    logger.warning(f"[FinOps] Skipping corrupt record in spool segment '{path}'")
+        return batches, self._read_ack(path)
+
+    def ack(self, path: str, acked_batches: int, total_batches: int) -> None:
+        """Records shipped batches; deletes the segment once all of them are shipped."""
+        if acked_batches >= total_batches:
+            os.remove(path)
+            if os.path.exists(path + ".ack"):
+                os.remove(path + ".ack")
+            return
+
+        tmp = path + ".ack.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(acked_batches))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path + ".ack")
+
+    def pending_segments(self) -> int:
+        return len(self._sequences())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active_file is not None:
+                self._active_file.close()
+                self._active_file = None
+
+    def _open_active_segment(self) -> None:
+        self._active_file = open(self._segment_path(self._active_sequence), "ab")
+        # Make the new directory entry durable too, not only the file contents
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _rotate(self) -> None:
+        self._active_file.close()
+        self._active_file = None
+        self._active_sequence += 1
+
+    def _read_ack(self, path: str) -> int:
+        try:
+            with open(path + ".ack") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _segment_path(self, sequence: int) -> str:
+        return os.path.join(self.directory, f"segment-{sequence:012d}.jsonl")
+
+    def _sequences(self) -> List[int]:
+        sequences = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                sequences.append(int(match.group(1)))
+        return sorted(sequences)
+
+
+class SpoolReplayer:
+    """
+    Background thread that ships spooled batches to the provider.
+
+    Segments are replayed in order; a failure stops the round and the next one
+    waits with exponential backoff, so nothing is skipped or dropped.
+    Unacknowledged spooled batches are combined into provider calls of up to
+    `batch_max_rows` rows (a single larger spooled batch is sent whole).
+    """
+
+    def __init__(
+        self,
+        spool: FinopsSpool,
+        persist_batch: Callable[[List[Any]], None],
+        report_factory: Callable[[Dict[str, Any]], Any],
+        flush_provider: Optional[Callable[[bool], None]] = None,
+        discard_provider: Optional[Callable[[], None]] = None,
+        replay_interval_seconds: float = FINOPS_SPOOL_REPLAY_INTERVAL_SECONDS,
+        max_backoff_seconds: float = FINOPS_SPOOL_MAX_BACKOFF_SECONDS,
+        batch_max_rows: int = FINOPS_BATCH_MAX_ROWS
+    ):
+        self.spool = spool
+        self.persist_batch = persist_batch
+        self.report_factory = report_factory
+        self.flush_provider = flush_provider
+        self.discard_provider = discard_provider
+        self.replay_interval_seconds = replay_interval_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.batch_max_rows = max(1, batch_max_rows)
+
+        self._stopping = threading.Event()
+        self._round_lock = threading.Lock()
+        self._failures = 0
+        self._counters = {"shipped_batches": 0, "shipped_rows": 0, "failed_rounds": 0}
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="finops-spool-replayer", daemon=True)
+        self._thread.start()
+        register_for_shutdown(self)
+
+    def replay_once(self) -> bool:
+        """
+        Ships every sealed segment. Returns False if the provider failed.
+
+        Providers that buffer writes are committed once per round, and only then
+        are the shipped segments acknowledged.
+        """
+        with self._round_lock:
+            self.spool.seal()
+            awaiting_commit: List[Tuple[str, int]] = []
+            rows: List[Dict[str, Any]] = []
+            # (segment, batches acknowledged once `rows` is shipped, total batches)
+            marks: List[Tuple[str, int, int]] = []
+
+            for path in self.spool.sealed_segments():
+                try:
+                    batches, acked = self.spool.read_segment(path)
+                except OSError as e:
+                    logger.error(f"[FinOps] Could not read spool segment '{path}': {e}")
+                    return False
+
+                if acked >= len(batches):
+                    # Empty or already fully shipped segment left behind by a crash
+                    self.spool.ack(path, len(batches), len(batches))
+                    continue
+
+                for index in range(acked, len(batches)):
+                    if rows and len(rows) + len(batches[index]) > self.batch_max_rows:
+                        if not self._ship(rows, marks):
+                            return False
+                        rows, marks = [], []
+                    rows.extend(batches[index])
+                    marks.append((path, index + 1, len(batches)))
+
+                if self.flush_provider is not None:
+                    awaiting_commit.append((path, len(batches)))
+
+            if rows and not self._ship(rows, marks):
+                return False
+
+            if awaiting_commit:
+                try:
+                    self.flush_provider(True)
+                except Exception as e:
+                    logger.warning(f"[FinOps] Spool replay commit failed, will retry: {e}")
+                    self._abort_round()
+                    return False
+                for path, total in awaiting_commit:
+                    self.spool.ack(path, total, total)
+            return True
+
+    def _ship(self, rows: List[Dict[str, Any]], marks: List[Tuple[str, int, int]]) -> bool:
+        """Sends one combined batch; without a buffering provider, acknowledges it right away."""
+        try:
+            self.persist_batch([self.report_factory(row) for row in rows])
+        except Exception as e:
+            logger.warning(f"[FinOps] Spool replay failed, will retry: {e}")
+            self._abort_round()
+            return False
+
+        if self.flush_provider is None:
+            # One ack per segment: the last mark holds its furthest shipped batch
+            last = {path: (acked, total) for path, acked, total in marks}
+            for path, (acked, total) in last.items():
+                self.spool.ack(path, acked, total)
+        self._counters["shipped_batches"] += 1
+        self._counters["shipped_rows"] += len(rows)
+        return True
+
+    def _abort_round(self) -> None:
+        self._counters["failed_rounds"] += 1
+        # The spool still holds these rows; keeping them buffered would duplicate them on retry
+        if self.discard_provider is not None:
+            self.discard_provider()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stops the thread after a last replay attempt."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.set()
+        self._thread.join(timeout)
+        self.spool.close()
+        if self.spool.pending_segments():
+            logger.warning(
+                f"[FinOps] {self.spool.pending_segments()} spool segment(s) left on disk; "
+                f"they will be replayed on the next start."
+            )
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self._counters)
+        stats["pending_segments"] = self.spool.pending_segments()
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            ok = self.replay_once()
+            if self._stopping.is_set():
+                break
+
+            if ok:
+                self._failures = 0
+                wait = self.replay_interval_seconds
+            else:
+                self._failures += 1
+                wait = min(self.max_backoff_seconds, self.replay_interval_seconds * (2 ** self._failures))
+
+            self._stopping.wait(wait)
+
+
+# --- Singleton Factory ---
+_spool_instance: Optional[FinopsSpool] = None
+_spool_lock = threading.Lock()
+
+
+def get_finops_spool() -> Optional[FinopsSpool]:
+    """Lazy singleton factory for the FinopsSpool. Returns None when disabled."""
+    global _spool_instance
+    if not FINOPS_SPOOL_ENABLED:
+        return None
+    if _spool_instance:
+        return _spool_instance
+
+    with _spool_lock:
+        if _spool_instance is None:
+            _spool_instance = FinopsSpool()
+
+    return _spool_instance
@@ -0,0 +1,393 @@
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, fields
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Async persistence configuration
+FINOPS_QUEUE_MAX_SIZE = int(os.getenv("FINOPS_QUEUE_MAX_SIZE", "10000"))
+FINOPS_BATCH_MAX_ROWS = int(os.getenv("FINOPS_BATCH_MAX_ROWS", "500"))
+FINOPS_BATCH_MAX_LATENCY_SECONDS = float(os.getenv("FINOPS_BATCH_MAX_LATENCY_SECONDS", "5"))
+# drop_oldest | block | spill
+FINOPS_BACKPRESSURE_POLICY = os.getenv("FINOPS_BACKPRESSURE_POLICY", "drop_oldest").lower()
+FINOPS_QUEUE_BLOCK_TIMEOUT_SECONDS = float(os.getenv("FINOPS_QUEUE_BLOCK_TIMEOUT_SECONDS", "1"))
+FINOPS_SPILL_DIR = os.getenv("FINOPS_SPILL_DIR", ".adk/finops_spill")
+FINOPS_SPILL_REPLAY_INTERVAL_SECONDS = float(os.getenv("FINOPS_SPILL_REPLAY_INTERVAL_SECONDS", "30"))
+FINOPS_RETRY_MAX_ATTEMPTS = int(os.getenv("FINOPS_RETRY_MAX_ATTEMPTS", "5"))
+FINOPS_RETRY_BASE_DELAY_SECONDS = float(os.getenv("FINOPS_RETRY_BASE_DELAY_SECONDS", "0.5"))
+FINOPS_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("FINOPS_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+BACKPRESSURE_POLICIES = ("drop_oldest", "block", "spill")
+
+_STOP = object()
+
+
+class _FlushRequest:
+    """Control marker that forces everything enqueued so far out."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class FinopsPersistenceWorker:
+    """
+    Background worker that drains a bounded in-process queue of reports.
+
+    Reports are shipped in batches when either `batch_max_rows` is reached or the
+    oldest pending report has waited `batch_max_latency_seconds`. Failed batches
+    are retried with exponential backoff; what still fails is spilled to disk when
+    the backpressure policy is `spill`, otherwise dropped.
+
+    Control markers (flush, stop) travel on a separate unbounded queue, so a full
+    data queue can neither delay nor evict them. `drop_oldest` only evicts items
+    accepted by `evictable` (by default, any item).
+    """
+
+    def __init__(
+        self,
+        persist_batch: Callable[[List[Any]], None],
+        report_factory: Callable[[Dict[str, Any]], Any],
+        flush_provider: Optional[Callable[[bool], None]] = None,
+        evictable: Optional[Callable[[Any], bool]] = None,
+        max_queue_size: int = FINOPS_QUEUE_MAX_SIZE,
+        batch_max_rows: int = FINOPS_BATCH_MAX_ROWS,
+        batch_max_latency_seconds: float = FINOPS_BATCH_MAX_LATENCY_SECONDS,
+        backpressure_policy: str = FINOPS_BACKPRESSURE_POLICY,
+        block_timeout_seconds: float = FINOPS_QUEUE_BLOCK_TIMEOUT_SECONDS,
+        spill_dir: str = FINOPS_SPILL_DIR,
+        spill_replay_interval_seconds: float = FINOPS_SPILL_REPLAY_INTERVAL_SECONDS,
+        retry_max_attempts: int = FINOPS_RETRY_MAX_ATTEMPTS,
+        retry_base_delay_seconds: float = FINOPS_RETRY_BASE_DELAY_SECONDS
+    ):
+        if backpressure_policy not in BACKPRESSURE_POLICIES:
+            logger.warning(
+                f"[FinOps] Unknown backpressure policy '{backpressure_policy}', using 'drop_oldest'."
+            )
+            backpressure_policy = "drop_oldest"
+
+        self.persist_batch = persist_batch
+        self.report_factory = report_factory
+        self.flush_provider = flush_provider
+        self.evictable = evictable or (lambda item: True)
+        self.max_queue_size = max(1, max_queue_size)
+        self.batch_max_rows = max(1, batch_max_rows)
+        self.batch_max_latency_seconds = batch_max_latency_seconds
+        self.backpressure_policy = backpressure_policy
+        self.block_timeout_seconds = block_timeout_seconds
+        self.spill_dir = spill_dir
+        self.spill_replay_interval_seconds = spill_replay_interval_seconds
+        self.retry_max_attempts = max(1, retry_max_attempts)
+        self.retry_base_delay_seconds = retry_base_delay_seconds
+
+        self._items: Deque[Any] = deque()
+        self._control: Deque[Any] = deque()
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "enqueued": 0,
+            "persisted": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "persist_calls": 0,
+            "persist_seconds": 0.0
+        }
+        self._last_replay = 0.0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="finops-persistence", daemon=True)
+        self._thread.start()
+        register_for_shutdown(self)
+
+        logger.info(
+            f"[FinOps] Async persistence worker started "
+            f"(batch={self.batch_max_rows} rows/{self.batch_max_latency_seconds}s, "
+            f"policy={self.backpressure_policy})"
+        )
+
+    # --- Producer side ---
+
+    def submit(self, reports: List[Any]) -> None:
+        """Enqueues reports without waiting for the storage round trip."""
+        for report in reports:
+            self._enqueue(report)
+
+    def _enqueue(self, report: Any) -> None:
+        if self._closed:
+            logger.warning("[FinOps] Worker already closed, report dropped.")
+            self._count("dropped")
+            return
+
+        with self._cond:
+            if len(self._items) >= self.max_queue_size:
+                if self.backpressure_policy == "block":
+                    self._cond.wait_for(
+                        lambda: len(self._items) < self.max_queue_size, self.block_timeout_seconds
+                    )
+                elif self.backpressure_policy == "drop_oldest":
+                    self._evict_oldest()
+
+            if len(self._items) < self.max_queue_size:
+                self._items.append(report)
+                self._cond.notify_all()
+                self._count("enqueued")
+                return
+
+        if self.backpressure_policy == "spill":
+            self._spill([report])
+        else:
+            if self.backpressure_policy == "block":
+                logger.warning("[FinOps] Queue still full after blocking, report dropped.")
+            self._count("dropped")
+
+    def _evict_oldest(self) -> None:
+        """drop_oldest: makes room by discarding the oldest evictable item. Caller holds the lock."""
+        for index, item in enumerate(self._items):
+            if self.evictable(item):
+                del self._items[index]
+                self._count("dropped")
+                return
+
+    def _signal(self, marker: Any) -> None:
+        with self._cond:
+            self._control.append(marker)
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything enqueued so far was shipped (or timeout)."""
+        if self._closed or not self._thread.is_alive():
+            return False
+        request = _FlushRequest()
+        self._signal(request)
+        return request.done.wait(timeout)
+
+    def close(self, timeout: float = FINOPS_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Flushes pending reports and stops the worker thread."""
+        if self._closed:
+            return
+        self._closed = True
+
+        self._signal(_STOP)
+        self._thread.join(timeout)
+
+        if self._thread.is_alive():
+            logger.error(f"[FinOps] Worker did not finish within {timeout}s; pending reports may be lost.")
+        else:
+            logger.info(f"[FinOps] Async persistence worker stopped. Stats: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._counters)
+        with self._cond:
+            stats["queued"] = len(self._items)
+        return stats
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._counters[counter] += amount
+
+    def _count_persist_call(self, seconds: float) -> None:
+        with self._stats_lock:
+            self._counters["persist_calls"] += 1
+            self._counters["persist_seconds"] += seconds
+
+    # --- Consumer side ---
+
+    def _next(self, timeout: float) -> Tuple[Any, List[Any]]:
+        """
+        Waits for the next item. A control marker comes with every data item
+        still queued, which was necessarily enqueued before the marker was read.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._control, timeout)
+            if self._control:
+                pending = list(self._items)
+                self._items.clear()
+                self._cond.notify_all()
+                return self._control.popleft(), pending
+            if self._items:
+                item = self._items.popleft()
+                self._cond.notify_all()
+                return item, []
+            return None, []
+
+    def _run(self) -> None:
+        batch: List[Any] = []
+        deadline = 0.0
+
+        while True:
+            if batch:
+                timeout = max(0.0, deadline - time.monotonic())
+            else:
+                timeout = self.spill_replay_interval_seconds
+
+            item, pending = self._next(timeout)
+            if item is None and not batch:
+                # Idle: let buffering providers commit once their interval is due
+                self._flush_provider(force=False)
+
+            if item is _STOP or isinstance(item, _FlushRequest):
+                batch.extend(pending)
+                for start in range(0, len(batch), self.batch_max_rows):
+                    self._ship(batch[start:start + self.batch_max_rows])
+                batch = []
+                self._flush_provider(force=True)
+                if item is _STOP:
+                    break
+                item.done.set()
+                continue
+
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.batch_max_latency_seconds
+                batch.append(item)
+
+            if batch and (len(batch) >= self.batch_max_rows or time.monotonic() >= deadline):
+                self._ship(batch)
+                batch = []
+
+            if not batch and not self._items:
+                self._replay_spill()
+
+    def _flush_provider(self, force: bool) -> None:
+        if self.flush_provider is None:
+            return
+        try:
+            self.flush_provider(force)
+        except Exception as e:
+            logger.error(f"[FinOps] Provider commit failed, rows stay buffered for the next attempt: {e}")
+
+    def _ship(self, batch: List[Any]) -> None:
+        if not batch:
+            return
+
+        for attempt in range(1, self.retry_max_attempts + 1):
+            start = time.perf_counter()
+            try:
+                self.persist_batch(batch)
+                self._count_persist_call(time.perf_counter() - start)
+                self._count("persisted", len(batch))
+                return
+            except Exception as e:
+                self._count_persist_call(time.perf_counter() - start)
+                if attempt == self.retry_max_attempts:
+                    logger.error(f"[FinOps] Batch of {len(batch)} reports failed after {attempt} attempts: {e}")
+                    break
+                delay = self.retry_base_delay_seconds * (2 ** (attempt - 1))
+                delay += random.uniform(0, delay)
+                logger.warning(f"[FinOps] Batch persistence failed (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+                self._count("retries")
+                time.sleep(delay)
+
+        self._count("failed_batches")
+        if self.backpressure_policy == "spill":
+            self._spill(batch)
+        else:
+            self._count("dropped", len(batch))
+
+    # --- Disk spill ---
+
+    def _spill(self, reports: List[Any]) -> None:
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"finops-spill-{os.getpid()}.jsonl")
+            with self._spill_lock, open(path, "a", encoding="utf-8") as f:
+                for report in reports:
+                    row = report if isinstance(report, dict) else asdict(report)
+                    f.write(json.dumps(row, default=str) + "\n")
+            self._count("spilled", len(reports))
+        except Exception as e:
+            logger.error(f"[FinOps] Failed to spill {len(reports)} reports to disk: {e}")
+            self._count("dropped", len(reports))
+
+    def _replay_spill(self) -> None:
+        """Ships reports spilled to disk once the worker is idle again."""
+        now = time.monotonic()
+        if self.backpressure_policy != "spill" or now - self._last_replay < self.spill_replay_interval_seconds:
+            return
+        self._last_replay = now
+
+        if not os.path.isdir(self.spill_dir):
+            return
+
+        for name in sorted(os.listdir(self.spill_dir)):
+            if not name.endswith(".jsonl"):
+                continue
+
+            # Claim the file so concurrent spills go to a fresh one
+            path = os.path.join(self.spill_dir, name)
+            claimed = f"{path}.replay"
+            with self._spill_lock:
+                try:
+                    os.replace(path, claimed)
+                except OSError:
+                    continue
+
+            try:
+                with open(claimed, encoding="utf-8") as f:
+                    reports = [self.report_factory(json.loads(line)) for line in f if line.strip()]
+            except Exception as e:
+                logger.error(f"[FinOps] Discarding unreadable spill file '{claimed}': {e}")
+                os.remove(claimed)
+                continue
+
+            os.remove(claimed)
+            logger.info(f"[FinOps] Replaying {len(reports)} spilled reports from '{name}'")
+            self._count("replayed", len(reports))
+            for start in range(0, len(reports), self.batch_max_rows):
+                self._ship(reports[start:start + self.batch_max_rows])
+
+
+def report_from_row(report_cls: type) -> Callable[[Dict[str, Any]], Any]:
+    """Builds a factory that rebuilds a dataclass report from a spilled row, ignoring unknown keys."""
+    names = {f.name for f in fields(report_cls)}
+
+    def factory(row: Dict[str, Any]) -> Any:
+        return report_cls(**{k: v for k, v in row.items() if k in names})
+
+    return factory
+
+
+# --- Shutdown Registry ---
+_workers: List[Any] = []
+_workers_lock = threading.Lock()
+_atexit_registered = False
+
+
+def register_for_shutdown(worker: Any, first: bool = False) -> None:
+    """
+    Registers a background component exposing `close(timeout)` to be stopped on
+    shutdown. Components that still produce reports register with first=True.
+    """
+    global _atexit_registered
+    with _workers_lock:
+        if first:
+            _workers.insert(0, worker)
+        else:
+            _workers.append(worker)
+        if not _atexit_registered:
+            atexit.register(shutdown_all_workers)
+            _atexit_registered = True
+
+
+def shutdown_all_workers(timeout: float = FINOPS_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+    """Flushes and stops every worker started by this process. Safe to call more than once."""
+    with _workers_lock:
+        workers = list(_workers)
+        _workers.clear()
+
+    for worker in workers:
+        try:
+            worker.close(timeout)
+        except Exception as e:
+            logger.error(f"[FinOps] Failed to stop persistence worker: {e}")
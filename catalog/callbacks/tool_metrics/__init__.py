@@ -0,0 +1,15 @@
+from .callback import (
+    ToolCallStats,
+    before_tool_metrics_callback,
+    after_tool_metrics_callback,
+    on_tool_error_metrics_callback,
+    register_tool_observer
+)
+
+__all__ = [
+    "ToolCallStats",
+    "before_tool_metrics_callback",
+    "after_tool_metrics_callback",
+    "on_tool_error_metrics_callback",
+    "register_tool_observer"
+]
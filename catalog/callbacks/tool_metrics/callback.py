@@ -0,0 +1,176 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from google.adk.tools import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from catalog.callbacks.finops_persistence import FinopsReport, get_invocation_accumulator, get_rollup_aggregator
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio used to estimate how many tokens a tool output adds to the next prompt
+TOOL_METRICS_CHARS_PER_TOKEN = float(os.getenv("TOOL_METRICS_CHARS_PER_TOKEN", "4"))
+TOOL_METRICS_REPORTS = os.getenv("TOOL_METRICS_REPORTS", "true").lower() == "true"
+TOOL_ERROR_MAX_CHARS = 256
+
+
+@dataclass(slots=True)
+class ToolCallStats:
+    """Measurements of one finished tool call, handed to the registered observers."""
+    agent_name: str
+    tool_name: str
+    duration_ms: float
+    output_bytes: int = 0
+    output_tokens: int = 0
+    error: Optional[str] = None
+
+
+ToolObserver = Callable[[ToolCallStats], None]
+
+_observers: List[ToolObserver] = []
+_observers_lock = threading.Lock()
+
+
+def register_tool_observer(observer: ToolObserver) -> None:
+    """Registers a function called with the stats of every tool call (e.g. to update metrics)."""
+    with _observers_lock:
+        _observers.append(observer)
+
+
+def _call_id(tool: BaseTool, tool_context: ToolContext) -> str:
+    return getattr(tool_context, "function_call_id", None) or f"{tool_context.agent_name}:{tool.name}"
+
+
+def _output_size(tool_response: Any) -> int:
+    if tool_response is None:
+        return 0
+    if isinstance(tool_response, str):
+        return len(tool_response.encode("utf-8"))
+    try:
+        return len(json.dumps(tool_response, default=str, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(tool_response).encode("utf-8"))
+
+
+def _response_error(tool_response: Any) -> Optional[str]:
+    """Tools that catch their own errors usually return {"error": ...} or {"status": "error"}."""
+    if not isinstance(tool_response, dict):
+        return None
+    if tool_response.get("error"):
+        return str(tool_response["error"])
+    if str(tool_response.get("status", "")).lower() == "error":
+        return str(tool_response.get("message") or tool_response.get("error_message") or "error")
+    return None
+
+
+def _finish_tool_call(
+    tool: BaseTool,
+    tool_context: ToolContext,
+    tool_response: Any,
+    error: Optional[str]
+) -> None:
+    accumulator = get_invocation_accumulator(tool_context.invocation_id)
+    start_time = accumulator.end_tool_call(_call_id(tool, tool_context))
+    if start_time is None:
+        return
+
+    output_bytes = _output_size(tool_response)
+    stats = ToolCallStats(
+        agent_name=tool_context.agent_name,
+        tool_name=tool.name,
+        duration_ms=(time.time() - start_time) * 1000.0,
+        output_bytes=output_bytes,
+        output_tokens=math.ceil(output_bytes / TOOL_METRICS_CHARS_PER_TOKEN),
+        error=error[:TOOL_ERROR_MAX_CHARS] if error else None
+    )
+
+    with _observers_lock:
+        observers = list(_observers)
+    for observer in observers:
+        try:
+            observer(stats)
+        except Exception as e:
+            logger.warning(f"[FinOps] Tool observer failed: {e}")
+
+    if stats.error:
+        accumulator.mark_error()
+    if TOOL_METRICS_REPORTS:
+        report = _create_tool_report(tool_context, stats)
+        accumulator.add_reports([report])
+        rollup = get_rollup_aggregator()
+        if rollup:
+            rollup.add(stats.agent_name, [report])
+
+    logger.debug(
+        f"[FinOps] Tool '{stats.tool_name}' took {stats.duration_ms:.0f} ms "
+        f"({stats.output_bytes} bytes, ~{stats.output_tokens} tokens{', error' if stats.error else ''})"
+    )
+
+
+def _create_tool_report(tool_context: ToolContext, stats: ToolCallStats) -> FinopsReport:
+    session = tool_context._invocation_context.session
+    return FinopsReport(
+        user_id=session.user_id,
+        agent_base_url=os.getenv("AGENT_BASE_URL", "http://localhost"),
+        agent_app_name=os.getenv("AGENT_APP_NAME", "default_agent_app"),
+        session_id=session.id,
+        invocation_id=tool_context.invocation_id,
+        interaction_timestamp=datetime.now(timezone.utc).isoformat(),
+        execution_time_ms=stats.duration_ms,
+        model_name=f"tool:{stats.tool_name}",
+        interaction_kind="tool",
+        agent_name=stats.agent_name,
+        tool_name=stats.tool_name,
+        tool_output_bytes=stats.output_bytes,
+        tool_output_tokens=stats.output_tokens,
+        tool_error=stats.error
+    )
+
+
+def before_tool_metrics_callback(
+    tool: BaseTool,
+    args: Dict[str, Any],
+    tool_context: ToolContext
+) -> Optional[Dict]:
+    """Records the start of the tool call. Registered as a BEFORE_TOOL callback."""
+    try:
+        get_invocation_accumulator(tool_context.invocation_id).begin_tool_call(_call_id(tool, tool_context))
+    except Exception as e:
+        logger.error(f"[FinOps] Tool before-callback failed: {e}", exc_info=True)
+    return None
+
+
+def after_tool_metrics_callback(
+    tool: BaseTool,
+    args: Dict[str, Any],
+    tool_context: ToolContext,
+    tool_response: Any
+) -> Optional[Dict]:
+    """Measures wall time, output size and error status. Registered as an AFTER_TOOL callback."""
+    try:
+        _finish_tool_call(tool, tool_context, tool_response, _response_error(tool_response))
+    except Exception as e:
+        logger.error(f"[FinOps] Tool after-callback failed: {e}", exc_info=True)
+    return None
+
+
+def on_tool_error_metrics_callback(
+    tool: BaseTool,
+    args: Dict[str, Any],
+    tool_context: ToolContext,
+    error: Exception
+) -> Optional[Dict]:
+    """Closes the measurement of a tool that raised. Registered as an ON_TOOL_ERROR callback."""
+    try:
+        _finish_tool_call(tool, tool_context, None, f"{type(error).__name__}: {error}")
+    except Exception as e:
+        logger.error(f"[FinOps] Tool error-callback failed: {e}", exc_info=True)
+    # None keeps ADK's default handling (the error is raised)
+    return None
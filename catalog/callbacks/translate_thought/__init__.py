@@ -1,3 +1,22 @@
-from .callback import translate_thought, inject_log_before_tool_callback
+from .callback import translate_thought
+from .cache import TranslationCache, get_translation_cache
+from .language import LanguageDetector, get_language_detector
+from .streaming import ThoughtStreamAggregator, get_stream_aggregator
+from .thought_store import StoredThought, ThoughtStore, get_thought_store, translation_mode
+from .translator import TranslationResult, translate_texts
 
-__all__ = ["translate_thought", "inject_log_before_tool_callback"]
+__all__ = [
+    "translate_thought",
+    "TranslationCache",
+    "get_translation_cache",
+    "LanguageDetector",
+    "get_language_detector",
+    "ThoughtStreamAggregator",
+    "get_stream_aggregator",
+    "StoredThought",
+    "ThoughtStore",
+    "get_thought_store",
+    "translation_mode",
+    "TranslationResult",
+    "translate_texts"
+]
@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configurações do cache de traduções
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "true").lower() == "true"
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "2048"))
+TRANSLATION_CACHE_TTL_SECONDS = float(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", "86400"))
+TRANSLATION_CACHE_DB_PATH = os.getenv("TRANSLATION_CACHE_DB_PATH", "")
+TRANSLATION_CACHE_DB_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_DB_MAX_ENTRIES", "100000"))
+
+
+def make_cache_key(text: str, target_language: str, model: str) -> str:
+    """Gera a chave de conteúdo (sha256) para o trio texto, idioma e modelo."""
+    digest = hashlib.sha256()
+    for value in (model, target_language, text):
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class _SqliteTier:
+    """
+    Camada persistente do cache, compartilhável entre réplicas no mesmo volume.
+
+    Faz I/O de disco: chamadores assíncronos devem usá-la fora do event loop.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_translations_created_at ON translations (created_at)"
+        )
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation, created_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            translation, created_at = row
+            if time.time() - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                return None
+            return translation, created_at
+
+    def set(self, key: str, translation: str, created_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, translation, created_at) VALUES (?, ?, ?)",
+                (key, translation, created_at)
+            )
+            self._writes += 1
+            # A limpeza é amortizada para não pagar um DELETE por escrita
+            if self._writes % 256 == 0:
+                self._evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        self._conn.execute(
+            "DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        self._conn.execute(
+            "DELETE FROM translations WHERE key IN ("
+            " SELECT key FROM translations ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+
+class TranslationCache:
+    """
+    Cache endereçado por conteúdo para traduções de pensamentos.
+
+    Possui uma camada LRU em memória e uma camada opcional em SQLite,
+    ambas com expiração por TTL e limite de tamanho. No event loop use
+    `aget`/`aset`: a memória é consultada na hora e o SQLite roda em uma
+    thread, sem bloquear o loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = TRANSLATION_CACHE_TTL_SECONDS,
+        db_path: str = "",
+        db_max_entries: int = TRANSLATION_CACHE_DB_MAX_ENTRIES
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[_SqliteTier] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if db_path:
+            try:
+                self._disk = _SqliteTier(db_path, ttl_seconds, db_max_entries)
+                logger.info(f"Cache de traduções em disco habilitado: {db_path}")
+            except Exception as e:
+                logger.warning(f"Falha ao abrir cache de traduções em disco '{db_path}': {e}")
+
+    def get(self, text: str, target_language: str, model: str) -> Optional[str]:
+        key = make_cache_key(text, target_language, model)
+        hit, translation = self._get_memory(key)
+        if hit:
+            return translation
+        return self._get_disk(key)
+
+    async def aget(self, text: str, target_language: str, model: str) -> Optional[str]:
+        """Versão para o event loop: só a consulta ao SQLite sai do loop."""
+        key = make_cache_key(text, target_language, model)
+        hit, translation = self._get_memory(key)
+        if hit:
+            return translation
+        if self._disk is None:
+            return self._get_disk(key)
+        return await asyncio.to_thread(self._get_disk, key)
+
+    def set(self, text: str, target_language: str, model: str, translation: str) -> None:
+        key = make_cache_key(text, target_language, model)
+        created_at = time.time()
+        with self._lock:
+            self._store(key, translation, created_at)
+        self._set_disk(key, translation, created_at)
+
+    async def aset(self, text: str, target_language: str, model: str, translation: str) -> None:
+        """Versão para o event loop: grava a memória na hora e o SQLite em uma thread."""
+        key = make_cache_key(text, target_language, model)
+        created_at = time.time()
+        with self._lock:
+            self._store(key, translation, created_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._set_disk, key, translation, created_at)
+
+    def _get_memory(self, key: str) -> Tuple[bool, Optional[str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            translation, created_at = entry
+            if now - created_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return True, translation
+            del self._entries[key]
+            return False, None
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        """Consulta o SQLite (quando houver) e conta o miss; bloqueia na leitura de disco."""
+        disk_entry = None
+        if self._disk is not None:
+            try:
+                disk_entry = self._disk.get(key)
+            except Exception as e:
+                logger.warning(f"Falha ao consultar cache de traduções em disco: {e}")
+
+        with self._lock:
+            if disk_entry is not None:
+                self._store(key, disk_entry[0], disk_entry[1])
+                self._counters["disk_hits"] += 1
+                return disk_entry[0]
+            self._counters["misses"] += 1
+            return None
+
+    def _set_disk(self, key: str, translation: str, created_at: float) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.set(key, translation, created_at)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de traduções em disco: {e}")
+
+    def _store(self, key: str, translation: str, created_at: float) -> None:
+        self._entries[key] = (translation, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            stats["entries"] = len(self._entries)
+            return stats
+
+
+# --- Singleton Factory ---
+_translation_cache_instance: Optional[TranslationCache] = None
+_translation_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> Optional[TranslationCache]:
+    """
+    Lazy singleton factory for the TranslationCache.
+    Returns None when TRANSLATION_CACHE_ENABLED is false.
+    """
+    global _translation_cache_instance
+    if not TRANSLATION_CACHE_ENABLED:
+        return None
+    if _translation_cache_instance:
+        return _translation_cache_instance
+
+    with _translation_cache_lock:
+        if _translation_cache_instance is None:
+            _translation_cache_instance = TranslationCache(db_path=TRANSLATION_CACHE_DB_PATH)
+
+    return _translation_cache_instance
@@ -1,52 +1,30 @@
 import logging
-import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
-from google.adk.tools import BaseTool
-from google.adk.tools.tool_context import ToolContext
+from typing import Any, Dict, List, Optional
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmResponse
 from google.genai import types
-import google.genai as genai
+
+from .streaming import is_partial_response, translate_final_thoughts, translate_partial_thoughts
+from .thought_store import get_thought_store, translation_mode
+from .translator import TranslationResult
 
 logger = logging.getLogger(__name__)
 
 # Configurações
 TRANSLATION_MODEL = "gemini-2.5-flash-lite"
-MIN_TEXT_LENGTH = 10
-
-def _translate_to_ptbr(text: str) -> Tuple[str, Optional[types.GenerateContentResponseUsageMetadata], float]:
-    """Traduz texto do inglês para português usando Gemini."""
-    if not text or len(text.strip()) < MIN_TEXT_LENGTH:
-        return text, None, 0.0
-
-    try:
-        logger.info(f"Iniciando tradução ({len(text)} chars)")
-        client = genai.Client(vertexai=True)
-
-        start_time = time.time()
-        response = client.models.generate_content(
-            model=TRANSLATION_MODEL,
-            contents=f"Traduza o seguinte texto para português do Brasil. Retorne APENAS a tradução, sem explicações:\n\n{text}"
-        )
-        duration_ms = (time.time() - start_time) * 1000.0
-
-        logger.info("Tradução concluída")
-        return response.text.strip(), response.usage_metadata, duration_ms
-    except Exception as e:
-        logger.error(f"Erro ao traduzir: {e}")
-        return text, None, 0.0
-
+THOUGHT_HANDLES_METADATA_KEY = "thought_translation_handles"
 
 def _create_finops_report(
     original_text: str,
     translated_text: str,
     usage_meta: Any,
-    duration_ms: float
+    duration_ms: float,
+    interaction_kind: str = "translation"
 ) -> Optional[Dict]:
     """Cria relatório FinOps para a tradução."""
     try:
-        from agents.helpers.finops_persistence import FinopsReport
+        from catalog.callbacks.finops_persistence import FinopsReport
 
         p_count = getattr(usage_meta, "prompt_token_count", 0)
         c_count = getattr(usage_meta, "candidates_token_count", 0)
@@ -61,70 +39,123 @@ def _create_finops_report(
             total_token_count=t_count,
             execution_time_ms=duration_ms,
             interaction_timestamp=datetime.now(timezone.utc).isoformat(),
-            interaction_kind="translation"
+            interaction_kind=interaction_kind
         )
     except ImportError:
         logger.debug("FinOps não disponível, pulando relatório")
         return None
 
 
-def translate_thought(
-    callback_context: CallbackContext,
-    llm_response: LlmResponse
-) -> Optional[LlmResponse]:
-    """
-    Intercepta o pensamento REAL do Gemini e traduz para português.
+def _register_translation(callback_context: CallbackContext, result: TranslationResult) -> None:
+    """Contabiliza uma tradução (cache hit ou texto já em pt-br) no acumulador FinOps da invocação."""
+    try:
+        from catalog.callbacks.finops_persistence import get_invocation_accumulator
+    except ImportError:
+        logger.debug("FinOps não disponível, pulando contabilização")
+        return
 
-    Uso: Registrar como after_model_callback no agente.
-    """
-    if not llm_response.content or not llm_response.content.parts:
-        return llm_response
+    try:
+        accumulator = get_invocation_accumulator(callback_context.invocation_id)
+
+        if result.cache_hit or result.skipped_language:
+            # Cache hit ou texto já em pt-br: sem chamada ao modelo, registra relatório com zero tokens
+            report = _create_finops_report(
+                result.original_text, result.translated_text, None, result.duration_ms,
+                interaction_kind=f"translation_{result.outcome}"
+            )
+            logger.debug(f"Tradução sem chamada ao modelo ({result.outcome})")
+        else:
+            usage_meta = result.usage_metadata
 
-    new_parts = []
-    modified = False
+            # 1. Update Invocation Usage Counters
+            p_count = getattr(usage_meta, "prompt_token_count", 0) or 0
+            c_count = getattr(usage_meta, "candidates_token_count", 0) or 0
+            t_count = getattr(usage_meta, "total_token_count", 0) or 0
 
-    for part in llm_response.content.parts:
-        if hasattr(part, 'thought') and part.thought and part.text:
-            translated_text, usage_meta, duration_ms = _translate_to_ptbr(part.text)
+            accumulator.add_usage(TRANSLATION_MODEL, p_count, c_count, t_count)
+            logger.info(f"Tradução para pt-br contabilizada: +{t_count} tokens ({TRANSLATION_MODEL})")
 
-            if usage_meta:
-                try:
-                    # 1. Update Global Usage Stats
-                    state_data = callback_context.state.to_dict()
-                    usage_stats = state_data.get("model_usage_stats", {})
+            # 2. Create FinOps Report
+            report = _create_finops_report(
+                result.original_text, result.translated_text, usage_meta, result.duration_ms
+            )
 
-                    if TRANSLATION_MODEL not in usage_stats:
-                        usage_stats[TRANSLATION_MODEL] = {"prompt": 0, "candidates": 0, "total": 0}
+        if report:
+            # Textos completos ficam no content store; o relatório guarda prévia e hash
+            accumulator.contents.put(result.original_text)
+            accumulator.contents.put(result.translated_text)
+            accumulator.add_side_report(callback_context.agent_name, report)
 
-                    p_count = getattr(usage_meta, "prompt_token_count", 0)
-                    c_count = getattr(usage_meta, "candidates_token_count", 0)
-                    t_count = getattr(usage_meta, "total_token_count", 0)
+    except Exception as e:
+        logger.warning(f"Falha ao registrar uso de tradução no FinOps: {e}")
 
-                    usage_stats[TRANSLATION_MODEL]["prompt"] += p_count
-                    usage_stats[TRANSLATION_MODEL]["candidates"] += c_count
-                    usage_stats[TRANSLATION_MODEL]["total"] += t_count
 
-                    callback_context.state["model_usage_stats"] = usage_stats
-                    logger.info(f"Tradução para pt-br contabilizada: +{t_count} tokens ({TRANSLATION_MODEL})")
+def _store_thoughts_for_lazy_translation(
+    callback_context: CallbackContext,
+    llm_response: LlmResponse,
+    thought_indexes: List[int]
+) -> None:
+    """Guarda os pensamentos originais e anexa os handles ao custom_metadata da resposta."""
+    store = get_thought_store()
+    session = callback_context._invocation_context.session
+
+    handles = []
+    for index in thought_indexes:
+        handle = store.put(
+            text=llm_response.content.parts[index].text,
+            model=TRANSLATION_MODEL,
+            user_id=session.user_id,
+            session_id=session.id,
+            invocation_id=callback_context.invocation_id
+        )
+        handles.append({"part_index": index, "handle": handle})
 
-                    # 2. Create FinOps Report
-                    report = _create_finops_report(part.text, translated_text, usage_meta, duration_ms)
-                    if report:
-                        side_reports = state_data.get("temp:finops_side_reports", [])
-                        side_reports.append(report)
-                        callback_context.state["temp:finops_side_reports"] = side_reports
+    metadata = dict(llm_response.custom_metadata or {})
+    metadata[THOUGHT_HANDLES_METADATA_KEY] = handles
+    llm_response.custom_metadata = metadata
+    logger.debug(f"{len(handles)} pensamento(s) guardado(s) para tradução sob demanda")
 
-                except Exception as e:
-                    logger.warning(f"Falha ao registrar uso de tradução no state: {e}")
 
-            new_parts.append(types.Part(thought=True, text=translated_text))
-            modified = True
-        else:
-            new_parts.append(part)
+async def translate_thought(
+    callback_context: CallbackContext,
+    llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """
+    Intercepta o pensamento REAL do Gemini e traduz para português.
 
-    if modified:
-        if hasattr(llm_response, 'content'):
-            llm_response.content.parts = new_parts
+    Todas as partes de pensamento da resposta são traduzidas concorrentemente,
+    sem bloquear o event loop. Em streaming, fragmentos parciais são acumulados
+    e traduzidos uma vez por pensamento (ou por frase, conforme o flush).
+    Com TRANSLATION_MODE=lazy, apenas guarda os pensamentos e publica handles
+    para tradução sob demanda.
+
+    Uso: Registrar como after_model_callback no agente.
+    """
+    # Sem conteúdo (ex.: resposta de erro) não há o que traduzir. Retornar a resposta
+    # encerraria a cadeia de after_model e o FinOps não veria o erro
+    if not llm_response.content or not llm_response.content.parts:
+        return None
+
+    parts = llm_response.content.parts
+    thought_indexes = [
+        i for i, part in enumerate(parts)
+        if hasattr(part, 'thought') and part.thought and part.text
+    ]
+    if not thought_indexes:
+        return None
+
+    if translation_mode() == "lazy":
+        # Em streaming, só a resposta final agregada gera handles
+        if not is_partial_response(llm_response):
+            _store_thoughts_for_lazy_translation(callback_context, llm_response, thought_indexes)
         return None
 
+    stream_key = f"{callback_context.invocation_id}:{callback_context.agent_name}"
+    on_translation = lambda result: _register_translation(callback_context, result)
+
+    if is_partial_response(llm_response):
+        await translate_partial_thoughts(llm_response, stream_key, TRANSLATION_MODEL, on_translation)
+    else:
+        await translate_final_thoughts(llm_response, thought_indexes, stream_key, TRANSLATION_MODEL, on_translation)
+
     return None
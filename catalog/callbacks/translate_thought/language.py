@@ -0,0 +1,130 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configurações da detecção de idioma
+TRANSLATION_LANGUAGE_DETECTION = os.getenv("TRANSLATION_LANGUAGE_DETECTION", "true").lower() == "true"
+TRANSLATION_DETECTION_MIN_MARGIN = float(os.getenv("TRANSLATION_DETECTION_MIN_MARGIN", "0.5"))
+TRANSLATION_DETECTION_MIN_HITS = int(os.getenv("TRANSLATION_DETECTION_MIN_HITS", "3"))
+
+_WORD_PATTERN = re.compile(r"[a-zà-öø-ÿ]+")
+_PT_DIACRITICS = re.compile(r"[ãõç]|ções|ção")
+
+# Palavras funcionais comuns a português e espanhol: contam para os dois e se
+# anulam na margem, então não puxam um texto para o idioma errado
+_PT_ES_SHARED = frozenset("""
+    de a que se para como no por sobre entre me te está esta este ser vamos
+""".split())
+
+# Palavras funcionais frequentes e próprias de cada idioma
+_STOPWORDS: Dict[str, frozenset] = {
+    "pt": _PT_ES_SHARED | frozenset("""
+        o os um uma uns umas e em do da dos das na nas nos ao aos à às pelo pela
+        pelos pelas não é são estão estou foi ter tem têm isso isto esse essa
+        também mas ou já vou vai preciso agora então depois antes quando onde
+        mais muito seu sua seus suas você eu ele ela eles elas meu minha há
+        hoje ainda só cada qual porque pois sem até com
+        arquivo usuário pergunta resposta ferramenta função configuração
+    """.split()),
+    "en": frozenset("""
+        the and of to in is are was were be been it this that these those with for
+        on at by from as an or but not have has had will would should can could
+        i we you he she they my our your their me us them what which who when
+        where how then now first next need let check file user code question answer
+    """.split()),
+    "es": _PT_ES_SHARED | frozenset("""
+        el los las del al y en es son están fue tiene esto eso esa también pero
+        ya voy necesito ahora entonces después cuando donde más muy su sus usted
+        yo él ella ellos una lo le hay hoy con sin porque cada cual
+        archivo usuario pregunta respuesta herramienta función configuración
+    """.split()),
+}
+
+
+class LanguageDetector:
+    """
+    Detector de idioma local, sem rede, baseado em palavras funcionais.
+
+    Conta quantas palavras do texto pertencem ao vocabulário funcional de cada
+    idioma. A confiança é a margem do idioma vencedor sobre o segundo colocado,
+    relativa aos acertos do vencedor: palavras comuns a dois idiomas próximos
+    (português e espanhol) não contam a favor de nenhum deles. Textos com
+    poucos acertos não têm idioma definido e seguem para tradução.
+    """
+
+    def __init__(
+        self,
+        min_margin: float = TRANSLATION_DETECTION_MIN_MARGIN,
+        min_hits: int = TRANSLATION_DETECTION_MIN_HITS
+    ):
+        self.min_margin = min_margin
+        self.min_hits = min_hits
+        self._lock = threading.Lock()
+        self._counters = {"checked": 0, "skipped": 0, "skipped_chars": 0}
+
+    def detect(self, text: str) -> Tuple[Optional[str], float]:
+        """Retorna o idioma provável (código ISO 639-1) e a margem sobre o segundo colocado, entre 0 e 1."""
+        lowered = text.lower()
+        scores = {language: 0 for language in _STOPWORDS}
+
+        for word in _WORD_PATTERN.findall(lowered):
+            for language, stopwords in _STOPWORDS.items():
+                if word in stopwords:
+                    scores[language] += 1
+
+        # Marcas ortográficas típicas do português desempatam contra o espanhol
+        scores["pt"] += len(_PT_DIACRITICS.findall(lowered))
+
+        ranked = sorted(scores.values(), reverse=True)
+        best, runner_up = ranked[0], ranked[1]
+        if best < self.min_hits:
+            return None, 0.0
+
+        language = max(scores, key=scores.get)
+        return language, (best - runner_up) / best
+
+    def is_language(self, text: str, target_language: str) -> bool:
+        """Indica, com confiança mínima, se o texto já está no idioma de destino."""
+        language, margin = self.detect(text)
+        matched = (
+            language == target_language.split("-")[0].lower()
+            and margin >= self.min_margin
+        )
+
+        with self._lock:
+            self._counters["checked"] += 1
+            if matched:
+                self._counters["skipped"] += 1
+                self._counters["skipped_chars"] += len(text)
+
+        if matched:
+            logger.debug(f"Texto já em {target_language} (margem {margin:.2f}), tradução evitada")
+        return matched
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+# --- Singleton Factory ---
+_language_detector_instance: Optional[LanguageDetector] = None
+_language_detector_lock = threading.Lock()
+
+
+def get_language_detector() -> Optional[LanguageDetector]:
+    """Lazy singleton factory for the LanguageDetector. Returns None when disabled."""
+    global _language_detector_instance
+    if not TRANSLATION_LANGUAGE_DETECTION:
+        return None
+    if _language_detector_instance:
+        return _language_detector_instance
+
+    with _language_detector_lock:
+        if _language_detector_instance is None:
+            _language_detector_instance = LanguageDetector()
+
+    return _language_detector_instance
@@ -0,0 +1,181 @@
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from .translator import TranslationResult, translate_texts
+
+logger = logging.getLogger(__name__)
+
+# Configurações de tradução em streaming (SSE)
+# 0 = traduz uma única vez, quando o pensamento completo chega
+TRANSLATION_STREAM_FLUSH_CHARS = int(os.getenv("TRANSLATION_STREAM_FLUSH_CHARS", "0"))
+TRANSLATION_STREAM_TTL_SECONDS = float(os.getenv("TRANSLATION_STREAM_TTL_SECONDS", "600"))
+
+_SENTENCE_BOUNDARY = re.compile(r"[.!?:;]\s+|\n+")
+
+
+@dataclass
+class _StreamState:
+    pending: str = ""
+    translated_source: str = ""
+    translated_segments: List[str] = field(default_factory=list)
+    updated_at: float = 0.0
+
+
+class ThoughtStreamAggregator:
+    """
+    Acumula fragmentos de pensamento de respostas parciais por chamada de modelo.
+
+    Fragmentos só são liberados para tradução em fronteiras de frase depois de
+    atingir o tamanho de flush; na resposta final agregada apenas o trecho
+    ainda não traduzido vai para o modelo.
+    """
+
+    def __init__(
+        self,
+        flush_chars: int = TRANSLATION_STREAM_FLUSH_CHARS,
+        ttl_seconds: float = TRANSLATION_STREAM_TTL_SECONDS
+    ):
+        self.flush_chars = flush_chars
+        self.ttl_seconds = ttl_seconds
+        self._states: Dict[str, _StreamState] = {}
+        self._lock = threading.Lock()
+
+    def feed(self, key: str, text: str) -> Optional[str]:
+        """Acumula um fragmento e retorna o segmento pronto para tradução, se houver."""
+        now = time.time()
+        with self._lock:
+            self._evict_stale(now)
+            state = self._states.setdefault(key, _StreamState())
+            state.pending += text
+            state.updated_at = now
+
+            if self.flush_chars <= 0 or len(state.pending) < self.flush_chars:
+                return None
+
+            boundaries = list(_SENTENCE_BOUNDARY.finditer(state.pending))
+            if not boundaries:
+                return None
+
+            cut = boundaries[-1].end()
+            segment, state.pending = state.pending[:cut], state.pending[cut:]
+            return segment
+
+    def record_translation(self, key: str, source: str, translation: str) -> str:
+        """Registra a tradução de um segmento e retorna o texto a ser emitido no stream."""
+        # Preserva o espaço em branco entre segmentos, que a tradução descarta
+        rendered = translation + source[len(source.rstrip()):]
+        with self._lock:
+            state = self._states.setdefault(key, _StreamState())
+            state.translated_source += source
+            state.translated_segments.append(rendered)
+        return rendered
+
+    def complete(self, key: str, final_text: str) -> Tuple[str, str]:
+        """
+        Encerra o stream da chave.
+
+        Retorna a tradução já emitida para o prefixo do texto final e o restante
+        que ainda precisa ser traduzido.
+        """
+        with self._lock:
+            state = self._states.pop(key, None)
+
+        if state and state.translated_source and final_text.startswith(state.translated_source):
+            return "".join(state.translated_segments), final_text[len(state.translated_source):]
+        return "", final_text
+
+    def _evict_stale(self, now: float) -> None:
+        stale = [k for k, s in self._states.items() if now - s.updated_at > self.ttl_seconds]
+        for key in stale:
+            del self._states[key]
+
+
+# --- Singleton Factory ---
+_aggregator_instance: Optional[ThoughtStreamAggregator] = None
+
+
+def get_stream_aggregator() -> ThoughtStreamAggregator:
+    """Lazy singleton factory for the ThoughtStreamAggregator."""
+    global _aggregator_instance
+    if _aggregator_instance is None:
+        _aggregator_instance = ThoughtStreamAggregator()
+    return _aggregator_instance
+
+
+def is_partial_response(llm_response: LlmResponse) -> bool:
+    return bool(getattr(llm_response, "partial", False))
+
+
+async def translate_partial_thoughts(
+    llm_response: LlmResponse,
+    stream_key: str,
+    model: str,
+    on_translation: Callable[[TranslationResult], None]
+) -> None:
+    """
+    Processa um chunk parcial: segura os fragmentos de pensamento e emite, no
+    lugar deles, apenas segmentos já traduzidos. Partes que não são pensamento
+    seguem na mesma ordem.
+    """
+    aggregator = get_stream_aggregator()
+    new_parts = []
+
+    for part in llm_response.content.parts:
+        if not (getattr(part, "thought", False) and part.text):
+            new_parts.append(part)
+            continue
+
+        segment = aggregator.feed(stream_key, part.text)
+        if segment is None:
+            continue
+
+        result = (await translate_texts([segment], model))[0]
+        if result.accounted:
+            on_translation(result)
+        rendered = aggregator.record_translation(stream_key, segment, result.translated_text)
+        new_parts.append(types.Part(thought=True, text=rendered))
+
+    llm_response.content.parts = new_parts
+
+
+async def translate_final_thoughts(
+    llm_response: LlmResponse,
+    thought_indexes: List[int],
+    stream_key: str,
+    model: str,
+    on_translation: Callable[[TranslationResult], None]
+) -> None:
+    """
+    Traduz as partes de pensamento de uma resposta completa, reaproveitando o
+    que já foi traduzido durante o streaming.
+    """
+    aggregator = get_stream_aggregator()
+    parts = llm_response.content.parts
+
+    prefixes: List[str] = []
+    sources: List[str] = []
+    for position, index in enumerate(thought_indexes):
+        # A resposta agregada do ADK concentra o pensamento na primeira parte
+        if position == 0:
+            prefix, remainder = aggregator.complete(stream_key, parts[index].text)
+        else:
+            prefix, remainder = "", parts[index].text
+        prefixes.append(prefix)
+        sources.append(remainder)
+
+    results = await translate_texts(sources, model)
+
+    new_parts = list(parts)
+    for index, prefix, result in zip(thought_indexes, prefixes, results):
+        if result.accounted:
+            on_translation(result)
+        new_parts[index] = types.Part(thought=True, text=prefix + result.translated_text)
+
+    llm_response.content.parts = new_parts
@@ -0,0 +1,121 @@
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Configurações do modo de tradução sob demanda
+THOUGHT_STORE_MAX_ENTRIES = int(os.getenv("THOUGHT_STORE_MAX_ENTRIES", "10000"))
+THOUGHT_STORE_TTL_SECONDS = float(os.getenv("THOUGHT_STORE_TTL_SECONDS", "3600"))
+
+
+def translation_mode() -> str:
+    """
+    Modo de tradução dos pensamentos: `inline` (traduz antes de liberar a resposta)
+    ou `lazy` (guarda o original e traduz sob demanda).
+
+    Lido de TRANSLATION_MODE a cada chamada, para que todos os callbacks de
+    tradução vejam o mesmo valor.
+    """
+    return os.getenv("TRANSLATION_MODE", "inline").lower()
+
+
+@dataclass
+class StoredThought:
+    """Pensamento original guardado para tradução sob demanda."""
+    handle: str
+    text: str
+    model: str
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+    invocation_id: Optional[str] = None
+    created_at: float = 0.0
+    translated_text: Optional[str] = None
+
+
+class ThoughtStore:
+    """
+    Armazena pensamentos originais em memória, identificados por um handle opaco.
+
+    A tradução só acontece quando um cliente pede pelo handle e o resultado
+    fica memorizado na própria entrada. Entradas expiram por TTL e por LRU.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = THOUGHT_STORE_MAX_ENTRIES,
+        ttl_seconds: float = THOUGHT_STORE_TTL_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, StoredThought]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        text: str,
+        model: str,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        invocation_id: Optional[str] = None
+    ) -> str:
+        handle = secrets.token_urlsafe(16)
+        entry = StoredThought(
+            handle=handle,
+            text=text,
+            model=model,
+            user_id=user_id,
+            session_id=session_id,
+            invocation_id=invocation_id,
+            created_at=time.time()
+        )
+
+        with self._lock:
+            self._entries[handle] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return handle
+
+    def get(self, handle: str) -> Optional[StoredThought]:
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return None
+            if time.time() - entry.created_at > self.ttl_seconds:
+                del self._entries[handle]
+                return None
+            self._entries.move_to_end(handle)
+            return entry
+
+    def set_translation(self, handle: str, translated_text: str) -> None:
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None:
+                entry.translated_text = translated_text
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# --- Singleton Factory ---
+_thought_store_instance: Optional[ThoughtStore] = None
+_thought_store_lock = threading.Lock()
+
+
+def get_thought_store() -> ThoughtStore:
+    """Lazy singleton factory for the ThoughtStore."""
+    global _thought_store_instance
+    if _thought_store_instance:
+        return _thought_store_instance
+
+    with _thought_store_lock:
+        if _thought_store_instance is None:
+            _thought_store_instance = ThoughtStore()
+
+    return _thought_store_instance
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from google.genai import types
+import google.genai as genai
+
+from .cache import get_translation_cache
+from .language import get_language_detector
+
+logger = logging.getLogger(__name__)
+
+# Configurações
+MIN_TEXT_LENGTH = 10
+TARGET_LANGUAGE = "pt-BR"
+TRANSLATION_MAX_CONCURRENCY = int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "4"))
+TRANSLATION_TIMEOUT_SECONDS = float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", "15"))
+TRANSLATION_PROMPT = "Traduza o seguinte texto para português do Brasil. Retorne APENAS a tradução, sem explicações:\n\n{text}"
+
+
+@dataclass
+class TranslationResult:
+    """Resultado da tradução de um único texto."""
+    original_text: str
+    translated_text: str
+    usage_metadata: Optional[types.GenerateContentResponseUsageMetadata] = None
+    duration_ms: float = 0.0
+    cache_hit: bool = False
+    skipped_language: bool = False
+
+    @property
+    def outcome(self) -> str:
+        """Rótulo do resultado: `translated`, `cache_hit` ou `skipped_language`."""
+        if self.skipped_language:
+            return "skipped_language"
+        return "cache_hit" if self.cache_hit else "translated"
+
+    @property
+    def accounted(self) -> bool:
+        """Indica se o resultado gera relatório FinOps (chamada ao modelo, cache hit ou texto já no idioma)."""
+        return bool(self.usage_metadata or self.cache_hit or self.skipped_language)
+
+
+_client: Optional[genai.Client] = None
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_client() -> genai.Client:
+    """Reutiliza um único client do genai (e seu pool de conexões) por processo."""
+    global _client
+    if _client is None:
+        _client = genai.Client(vertexai=True)
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Semáforo por event loop que limita as traduções simultâneas do processo."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(TRANSLATION_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+async def translate_to_ptbr(
+    text: str,
+    model: str
+) -> Tuple[str, Optional[types.GenerateContentResponseUsageMetadata], float]:
+    """Traduz texto do inglês para português usando o client assíncrono do Gemini."""
+    if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+        return text, None, 0.0
+
+    try:
+        async with _get_semaphore():
+            logger.info(f"Iniciando tradução ({len(text)} chars)")
+            start_time = time.time()
+            response = await asyncio.wait_for(
+                _get_client().aio.models.generate_content(
+                    model=model,
+                    contents=TRANSLATION_PROMPT.format(text=text)
+                ),
+                timeout=TRANSLATION_TIMEOUT_SECONDS
+            )
+            duration_ms = (time.time() - start_time) * 1000.0
+
+        logger.info("Tradução concluída")
+        return response.text.strip(), response.usage_metadata, duration_ms
+    except asyncio.TimeoutError:
+        logger.warning(f"Tradução excedeu {TRANSLATION_TIMEOUT_SECONDS}s, mantendo texto original")
+        return text, None, 0.0
+    except Exception as e:
+        logger.error(f"Erro ao traduzir: {e}")
+        return text, None, 0.0
+
+
+async def translate_texts(texts: List[str], model: str) -> List[TranslationResult]:
+    """
+    Traduz uma lista de textos concorrentemente, preservando a ordem.
+
+    Textos já no idioma de destino não são traduzidos. Consulta o cache antes
+    de chamar o modelo e grava apenas traduções bem-sucedidas.
+    """
+    cache = get_translation_cache()
+    detector = get_language_detector()
+    results: List[Optional[TranslationResult]] = [None] * len(texts)
+    pending: List[int] = []
+
+    for index, text in enumerate(texts):
+        if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+            results[index] = TranslationResult(original_text=text, translated_text=text)
+            continue
+
+        lookup_start = time.time()
+        if detector and detector.is_language(text, TARGET_LANGUAGE):
+            results[index] = TranslationResult(
+                original_text=text,
+                translated_text=text,
+                duration_ms=(time.time() - lookup_start) * 1000.0,
+                skipped_language=True
+            )
+            continue
+
+        cached_text = await cache.aget(text, TARGET_LANGUAGE, model) if cache else None
+        if cached_text is not None:
+            results[index] = TranslationResult(
+                original_text=text,
+                translated_text=cached_text,
+                duration_ms=(time.time() - lookup_start) * 1000.0,
+                cache_hit=True
+            )
+        else:
+            pending.append(index)
+
+    if pending:
+        translations = await asyncio.gather(*(translate_to_ptbr(texts[i], model) for i in pending))
+        for index, (translated_text, usage_meta, duration_ms) in zip(pending, translations):
+            if usage_meta and cache:
+                await cache.aset(texts[index], TARGET_LANGUAGE, model, translated_text)
+            results[index] = TranslationResult(
+                original_text=texts[index],
+                translated_text=translated_text,
+                usage_metadata=usage_meta,
+                duration_ms=duration_ms
+            )
+
+    return results
@@ -0,0 +1,13 @@
+from .skill import (
+    analyze_performance,
+    get_performance_report_json,
+    get_performance_report_md,
+    to_columns,
+)
+
+__all__ = [
+    "analyze_performance",
+    "get_performance_report_json",
+    "get_performance_report_md",
+    "to_columns",
+]
@@ -0,0 +1,64 @@
+"""
+Benchmark da skill analyze_performance.
+
+Uso:
+    python -m catalog.skills.analyze_performance.benchmark --reports 100000
+"""
+import argparse
+import random
+import time
+
+from .skill import analyze_performance, get_performance_report_md, to_columns
+
+MODELS = ("gemini-2.5-flash", "gemini-2.5-pro", "gemini-2.0-flash-lite")
+KINDS = ("agent", "agent", "agent", "translation", "translation_cache_hit", "translation_skipped_language", "unaccounted")
+
+
+def _synthetic_reports(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    reports = []
+    for i in range(n):
+        prompt = rng.randint(200, 20000)
+        candidates = rng.randint(10, 2000)
+        reports.append({
+            "session_id": f"sess-{i % 5000}",
+            "model_name": rng.choice(MODELS),
+            "interaction_kind": rng.choice(KINDS),
+            "prompt_token_count": prompt,
+            "candidates_token_count": candidates,
+            "thoughts_token_count": rng.randint(0, 500),
+            "cached_content_token_count": rng.randint(0, prompt),
+            "total_token_count": prompt + candidates,
+            "execution_time_ms": rng.lognormvariate(7.0, 0.8),
+            "sample_rate": 1.0,
+        })
+    return reports
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark da skill analyze_performance")
+    parser.add_argument("--reports", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    reports = _synthetic_reports(args.reports)
+    columns = to_columns(reports)
+
+    print(f"Relatórios: {args.reports:,}")
+    print(f"to_columns (lista de dicts):   {_timed(lambda: to_columns(reports), args.repeat):8.1f} ms")
+    print(f"analyze_performance (colunas): {_timed(lambda: analyze_performance(columns), args.repeat):8.1f} ms")
+    print(f"analyze_performance (dicts):   {_timed(lambda: analyze_performance(reports), args.repeat):8.1f} ms")
+    print(f"get_performance_report_md:     {_timed(lambda: get_performance_report_md(reports=columns), args.repeat):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Limites usados nas recomendações
+SLOW_P95_MS = 15000.0
+LOW_CACHE_HIT_RATIO = 0.10
+HIGH_TRANSLATION_OVERHEAD = 0.20
+
+_NUMERIC_COLUMNS = (
+    "prompt_token_count",
+    "candidates_token_count",
+    "thoughts_token_count",
+    "cached_content_token_count",
+    "total_token_count",
+    "execution_time_ms",
+    "sample_rate",
+)
+_LABEL_COLUMNS = ("model_name", "interaction_kind", "session_id")
+_DEFAULTS: Dict[str, Any] = {
+    "model_name": "unknown_model",
+    "interaction_kind": "agent",
+    "session_id": "",
+    "sample_rate": 1.0,
+}
+
+Reports = Union[Sequence[Any], Mapping[str, Sequence[Any]]]
+
+
+def to_columns(reports: Reports) -> Dict[str, np.ndarray]:
+    """
+    Converte relatórios FinOps em colunas NumPy.
+
+    Aceita uma lista de FinopsReport (ou qualquer objeto com os mesmos
+    atributos), uma lista de dicts, ou colunas já prontas (dict de sequências).
+    Colunas de texto viram códigos inteiros em `<coluna>` e os valores
+    distintos ficam em `<coluna>_labels`, para agrupar sem comparar strings.
+    """
+    if isinstance(reports, Mapping):
+        if "model_name_labels" in reports:
+            return dict(reports)
+        n = len(next(iter(reports.values()), []))
+
+        def getter(name: str, default: Any):
+            return reports[name] if name in reports else (default for _ in range(n))
+    else:
+        n = len(reports)
+        if n and isinstance(reports[0], Mapping):
+            def getter(name: str, default: Any):
+                return (r.get(name, default) for r in reports)
+        else:
+            def getter(name: str, default: Any):
+                return (getattr(r, name, default) for r in reports)
+
+    columns: Dict[str, np.ndarray] = {}
+    for name in _NUMERIC_COLUMNS:
+        default = _DEFAULTS.get(name, 0)
+        columns[name] = np.fromiter(
+            (default if v is None else v for v in getter(name, default)), dtype=np.float64, count=n
+        )
+    for name in _LABEL_COLUMNS:
+        default = _DEFAULTS[name]
+        columns[name], columns[f"{name}_labels"] = _factorize(
+            (default if v is None else v for v in getter(name, default)), n
+        )
+    return columns
+
+
+def _factorize(values: Iterable[Any], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Códigos inteiros na ordem de primeira ocorrência (um dict, sem ordenar strings)."""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=n)
+    return codes, np.array([str(label) for label in index], dtype=object)
+
+
+def _grouped_percentiles(groups: np.ndarray, order: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Percentis por grupo (interpolação linear). Shape: (n_groups, len(PERCENTILES)).
+
+    `order` é o argsort global de `values` (ou parte dele, para considerar só
+    algumas linhas); um argsort estável dos códigos de grupo nessa ordem deixa
+    cada grupo contíguo e já ordenado.
+    """
+    order = order[np.argsort(groups[order], kind="stable")]
+    sorted_values = values[order]
+    counts = np.bincount(groups[order], minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    last = starts + counts - 1
+    # Grupos vazios (fora de `order`) ficam com valores sem sentido e são ignorados
+    top = max(0, sorted_values.size - 1)
+
+    result = np.zeros((n_groups, len(PERCENTILES)))
+    for column, p in enumerate(PERCENTILES):
+        position = starts + (counts - 1) * (p / 100.0)
+        lower = np.clip(np.floor(position).astype(np.int64), 0, top)
+        upper = np.clip(np.minimum(lower + 1, last), 0, top)
+        fraction = position - lower
+        result[:, column] = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    return result
+
+
+def _safe_ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator > 0)
+
+
+def _group_stats(
+    columns: Dict[str, np.ndarray],
+    key: str,
+    weights: np.ndarray,
+    latency_order: np.ndarray,
+    mask: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """Estatísticas por valor de `key`; com `mask`, só das linhas selecionadas."""
+    groups = columns[key]
+    labels = columns[f"{key}_labels"]
+    n_groups = len(labels)
+    if mask is not None:
+        if not mask.any():
+            return []
+        weights = weights * mask
+        latency_order = latency_order[mask[latency_order]]
+    if n_groups == 0:
+        return []
+
+    def weighted_sum(name: str) -> np.ndarray:
+        return np.bincount(groups, weights=columns[name] * weights, minlength=n_groups)
+
+    selected = np.ones(groups.size) if mask is None else mask.astype(np.float64)
+    calls = np.bincount(groups, weights=selected, minlength=n_groups).astype(np.int64)
+    estimated_calls = np.bincount(groups, weights=weights, minlength=n_groups)
+    prompt = weighted_sum("prompt_token_count")
+    candidates = weighted_sum("candidates_token_count")
+    thoughts = weighted_sum("thoughts_token_count")
+    cached = weighted_sum("cached_content_token_count")
+    total = weighted_sum("total_token_count")
+    latency_ms = weighted_sum("execution_time_ms")
+
+    latency_percentiles = _grouped_percentiles(groups, latency_order, columns["execution_time_ms"], n_groups)
+    tokens_per_sec = _safe_ratio(candidates + thoughts, latency_ms / 1000.0)
+    cache_hit_ratio = _safe_ratio(cached, prompt)
+    mean_latency = _safe_ratio(latency_ms, estimated_calls)
+
+    stats = []
+    for i, label in enumerate(labels):
+        if calls[i] == 0:
+            continue
+        entry = {
+            key: str(label),
+            "calls": int(calls[i]),
+            "estimated_calls": round(float(estimated_calls[i]), 2),
+            "prompt_tokens": int(round(prompt[i])),
+            "candidates_tokens": int(round(candidates[i])),
+            "thoughts_tokens": int(round(thoughts[i])),
+            "cached_tokens": int(round(cached[i])),
+            "total_tokens": int(round(total[i])),
+            "latency_ms_mean": round(float(mean_latency[i]), 2),
+            "tokens_per_sec": round(float(tokens_per_sec[i]), 2),
+            "cache_hit_ratio": round(float(cache_hit_ratio[i]), 4),
+        }
+        for column, p in enumerate(PERCENTILES):
+            entry[f"latency_ms_p{p}"] = round(float(latency_percentiles[i, column]), 2)
+        stats.append(entry)
+
+    stats.sort(key=lambda e: e["total_tokens"], reverse=True)
+    return stats
+
+
+def analyze_performance(reports: Reports) -> Dict[str, Any]:
+    """
+    Agrega um lote de relatórios FinOps em forma vetorizada.
+
+    Retorna um dict serializável em JSON com o resumo, estatísticas por modelo
+    e por tipo de interação, overhead de tradução e recomendações.
+    """
+    columns = to_columns(reports)
+    n = int(columns["total_token_count"].size)
+
+    # Linhas amostradas valem 1 / sample_rate nas somas
+    weights = _safe_ratio(np.ones_like(columns["sample_rate"]), columns["sample_rate"])
+    latency_order = np.argsort(columns["execution_time_ms"])
+
+    kind_labels = columns["interaction_kind_labels"]
+    kinds = columns["interaction_kind"]
+    # Textos já em pt-br não são traduzidos: contam à parte, não como chamadas
+    translation_codes = [
+        i for i, label in enumerate(kind_labels)
+        if label.startswith("translation") and label != "translation_skipped_language"
+    ]
+    cache_hit_codes = [i for i, label in enumerate(kind_labels) if label == "translation_cache_hit"]
+    skipped_codes = [i for i, label in enumerate(kind_labels) if label == "translation_skipped_language"]
+    agent_codes = [i for i, label in enumerate(kind_labels) if label == "agent"]
+    is_translation = np.isin(kinds, translation_codes)
+    is_agent = np.isin(kinds, agent_codes)
+    # Relatórios de tool (tool_metrics) medem tempo de tool, não de modelo
+    is_model = ~np.isin(kinds, [i for i, label in enumerate(kind_labels) if label == "tool"])
+
+    total_tokens = float(np.dot(columns["total_token_count"], weights))
+    translation_tokens = float(np.dot(columns["total_token_count"][is_translation], weights[is_translation]))
+    agent_tokens = float(np.dot(columns["total_token_count"][is_agent], weights[is_agent]))
+    translation_latency = float(np.dot(columns["execution_time_ms"][is_translation], weights[is_translation]))
+    total_latency = float(np.dot(columns["execution_time_ms"][is_model], weights[is_model]))
+    translation_calls = int(is_translation.sum())
+    translation_cache_hits = int(np.isin(kinds, cache_hit_codes).sum())
+    translation_skipped = int(np.isin(kinds, skipped_codes).sum())
+
+    summary = {
+        "reports": n,
+        "sessions": len(columns["session_id_labels"]),
+        "total_tokens": int(round(total_tokens)),
+        "prompt_tokens": int(round(float(np.dot(columns["prompt_token_count"], weights)))),
+        "candidates_tokens": int(round(float(np.dot(columns["candidates_token_count"], weights)))),
+        "cached_tokens": int(round(float(np.dot(columns["cached_content_token_count"], weights)))),
+        "total_latency_ms": round(total_latency, 2),
+        "sampled": bool(n and np.any(columns["sample_rate"] < 1.0)),
+    }
+
+    translation = {
+        "calls": translation_calls,
+        "cache_hits": translation_cache_hits,
+        "cache_hit_ratio": round(translation_cache_hits / translation_calls, 4) if translation_calls else 0.0,
+        "skipped_language": translation_skipped,
+        "tokens": int(round(translation_tokens)),
+        "token_overhead": round(translation_tokens / agent_tokens, 4) if agent_tokens else 0.0,
+        "latency_share": round(translation_latency / total_latency, 4) if total_latency else 0.0,
+    }
+
+    # Tools (model_name "tool:<nome>") têm sua própria seção, sem tokens nem cache
+    per_model = _group_stats(columns, "model_name", weights, latency_order, mask=is_model)
+    per_tool = _group_stats(columns, "model_name", weights, latency_order, mask=~is_model)
+    result = {
+        "summary": summary,
+        "per_model": per_model,
+        "per_tool": per_tool,
+        "per_kind": _group_stats(columns, "interaction_kind", weights, latency_order),
+        "translation": translation,
+    }
+    result["recommendations"] = _recommendations(per_model, per_tool, translation)
+    return result
+
+
+def _recommendations(
+    per_model: List[Dict[str, Any]],
+    per_tool: List[Dict[str, Any]],
+    translation: Dict[str, Any]
+) -> List[str]:
+    recommendations = []
+    for model in per_model:
+        if model["latency_ms_p95"] >= SLOW_P95_MS:
+            recommendations.append(
+                f"`{model['model_name']}` tem p95 de {model['latency_ms_p95'] / 1000:.1f}s: "
+                f"considere reduzir o contexto ou usar um modelo mais rápido."
+            )
+        if model["prompt_tokens"] > 10000 and model["cache_hit_ratio"] < LOW_CACHE_HIT_RATIO:
+            recommendations.append(
+                f"`{model['model_name']}` aproveita só {model['cache_hit_ratio']:.0%} do prompt em cache: "
+                f"mantenha o início do prompt estável para habilitar context caching."
+            )
+    for tool in per_tool:
+        if tool["latency_ms_p95"] >= SLOW_P95_MS:
+            recommendations.append(
+                f"A tool `{_tool_name(tool['model_name'])}` tem p95 de {tool['latency_ms_p95'] / 1000:.1f}s: "
+                f"considere cache, paginação ou um timeout menor."
+            )
+    if translation["token_overhead"] >= HIGH_TRANSLATION_OVERHEAD:
+        recommendations.append(
+            f"Traduções consomem {translation['token_overhead']:.0%} dos tokens do agente: "
+            f"considere TRANSLATION_MODE=lazy ou aumentar o cache de tradução."
+        )
+    return recommendations
+
+
+def _tool_name(label: str) -> str:
+    return label.split(":", 1)[1] if label.startswith("tool:") else label
+
+
+def _markdown(result: Dict[str, Any]) -> str:
+    summary = result["summary"]
+    if not summary["reports"]:
+        return "# Relatório de Performance\n\nNenhuma chamada de modelo registrada.\n"
+
+    lines = [
+        "# Relatório de Performance",
+        "",
+        f"- **Relatórios:** {summary['reports']} ({summary['sessions']} sessões)",
+        f"- **Tokens:** {summary['total_tokens']:,} "
+        f"(prompt {summary['prompt_tokens']:,} / resposta {summary['candidates_tokens']:,} / cache {summary['cached_tokens']:,})",
+        f"- **Tempo total de modelo:** {summary['total_latency_ms'] / 1000:.2f}s",
+    ]
+    if summary["sampled"]:
+        lines.append("- Valores estimados a partir de relatórios amostrados (peso 1 / sample_rate)")
+
+    lines += [
+        "",
+        "## Por Modelo",
+        "",
+        "| Modelo | Chamadas | Tokens | p50 (ms) | p95 (ms) | p99 (ms) | Tokens/s | Cache |",
+        "|--------|----------|--------|----------|----------|----------|----------|-------|",
+    ]
+    for m in result["per_model"]:
+        lines.append(
+            f"| {m['model_name']} | {m['calls']} | {m['total_tokens']:,} | {m['latency_ms_p50']:.0f} | "
+            f"{m['latency_ms_p95']:.0f} | {m['latency_ms_p99']:.0f} | {m['tokens_per_sec']:.1f} | "
+            f"{m['cache_hit_ratio']:.0%} |"
+        )
+
+    if result["per_tool"]:
+        lines += [
+            "",
+            "## Por Tool",
+            "",
+            "| Tool | Chamadas | p50 (ms) | p95 (ms) | p99 (ms) |",
+            "|------|----------|----------|----------|----------|",
+        ]
+        for t in result["per_tool"]:
+            lines.append(
+                f"| {_tool_name(t['model_name'])} | {t['calls']} | {t['latency_ms_p50']:.0f} | "
+                f"{t['latency_ms_p95']:.0f} | {t['latency_ms_p99']:.0f} |"
+            )
+
+    lines += [
+        "",
+        "## Por Tipo de Interação",
+        "",
+        "| Tipo | Chamadas | Tokens | p95 (ms) |",
+        "|------|----------|--------|----------|",
+    ]
+    for k in result["per_kind"]:
+        lines.append(f"| {k['interaction_kind']} | {k['calls']} | {k['total_tokens']:,} | {k['latency_ms_p95']:.0f} |")
+
+    translation = result["translation"]
+    if translation["calls"] or translation["skipped_language"]:
+        lines += [
+            "",
+            "## Tradução",
+            "",
+            f"- **Chamadas:** {translation['calls']} ({translation['cache_hit_ratio']:.0%} servidas pelo cache)",
+            f"- **Evitadas (texto já em pt-br):** {translation['skipped_language']}",
+            f"- **Overhead de tokens:** {translation['token_overhead']:.1%} dos tokens do agente",
+            f"- **Parcela do tempo de modelo:** {translation['latency_share']:.1%}",
+        ]
+
+    if result["recommendations"]:
+        lines += ["", "## Recomendações", ""]
+        lines += [f"- {r}" for r in result["recommendations"]]
+
+    return "\n".join(lines) + "\n"
+
+
+def get_performance_report_md(reports: Reports) -> str:
+    """Relatório de performance em Markdown a partir de um lote de relatórios FinOps."""
+    return _markdown(analyze_performance(reports))
+
+
+def get_performance_report_json(reports: Reports) -> str:
+    """Relatório de performance em JSON a partir de um lote de relatórios FinOps."""
+    return json.dumps(analyze_performance(reports), ensure_ascii=False)
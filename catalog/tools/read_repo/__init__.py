@@ -1,3 +1,40 @@
-from .tool import read_repo_context, RepoReadError
+from .tool import read_repo_context, read_repo_file, read_repo_page, search_repo, RepoReadError
+from .clone import CLONE_MODES, CloneOptions, checkout_repo
+from .context import pack_repo_context, resolve_commit
+from .context_cache import PackedContextCache, get_context_cache
+from .errors import RepoPackError
+from .mirror import RepoMirrorCache, get_mirror_cache
+from .packer import RepoFile, list_repo_files, pack_repo, pack_repo_to_string, scan_repo
+from .pages import RepoPage, decode_cursor, rank_files
+from .index import RepoIndex, SearchHit
+from .search import RepoIndexStore, get_index_store
 
-__all__ = ["read_repo_context", "RepoReadError"]
+__all__ = [
+    "read_repo_context",
+    "read_repo_page",
+    "search_repo",
+    "read_repo_file",
+    "RepoReadError",
+    "RepoPackError",
+    "CLONE_MODES",
+    "CloneOptions",
+    "checkout_repo",
+    "RepoMirrorCache",
+    "get_mirror_cache",
+    "pack_repo_context",
+    "resolve_commit",
+    "PackedContextCache",
+    "get_context_cache",
+    "RepoFile",
+    "list_repo_files",
+    "pack_repo",
+    "pack_repo_to_string",
+    "scan_repo",
+    "RepoPage",
+    "decode_cursor",
+    "rank_files",
+    "RepoIndex",
+    "SearchHit",
+    "RepoIndexStore",
+    "get_index_store",
+]
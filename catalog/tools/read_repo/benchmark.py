@@ -0,0 +1,145 @@
+"""
+Benchmark dos modos de clone do read_repo_context.
+
+Cria um repositório bare local com histórico, diretório vendorizado e binários,
+e mede tempo e bytes recebidos (objetos gravados no clone) de cada modo.
+
+Uso:
+    python -m catalog.tools.read_repo.benchmark --commits 300 --files 400
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from .clone import BLOBLESS, FULL, SHALLOW, CloneOptions, checkout_repo
+from .mirror import RepoMirrorCache, _dir_size
+
+SPARSE_PATHS = ("src/**", "!**/vendor/**")
+REPO_KEY = "local/benchmark"
+
+
+def _git(cwd: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=bench", "-c", "user.email=bench@local", *args],
+        cwd=cwd, check=True, capture_output=True
+    )
+
+
+def _build_repo(root: Path, commits: int, files: int, seed: int = 42) -> Path:
+    """Repositório com src/ (texto), src/vendor/ e assets/ (binários), e `commits` commits de histórico."""
+    rng = random.Random(seed)
+    work = root / "work"
+    work.mkdir()
+    _git(work, "init", "-q", "-b", "main")
+
+    layout = (
+        [f"src/pkg{i % 20}/module_{i}.py" for i in range(files)]
+        + [f"src/vendor/lib{i % 10}/vendored_{i}.js" for i in range(files // 2)]
+        + [f"assets/blob_{i}.bin" for i in range(files // 10)]
+    )
+    for commit in range(commits):
+        # O primeiro commit cria tudo; os seguintes alteram uma amostra dos arquivos
+        touched = layout if commit == 0 else rng.sample(layout, max(1, len(layout) // 20))
+        for rel in touched:
+            path = work / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if rel.endswith(".bin"):
+                path.write_bytes(rng.randbytes(32 * 1024))
+            else:
+                lines = [f"value_{commit}_{n} = {rng.random()!r}" for n in range(rng.randint(20, 120))]
+                path.write_text("\n".join(lines) + "\n")
+        _git(work, "add", "-A")
+        _git(work, "commit", "-q", "-m", f"commit {commit}")
+
+    bare = root / "remote.git"
+    _git(root, "clone", "-q", "--bare", str(work), str(bare))
+    # Necessário para --filter em clones via file://
+    _git(bare, "config", "uploadpack.allowFilter", "true")
+    return bare
+
+
+def _working_tree_files(path: Path) -> int:
+    # Em worktrees, `.git` é um arquivo apontando para o mirror
+    return sum(
+        len([name for name in files if name != ".git"])
+        for root, _, files in os.walk(path) if ".git" not in Path(root).parts
+    )
+
+
+async def _measure_clone(url: str, options: CloneOptions) -> dict:
+    start = time.perf_counter()
+    async with checkout_repo(REPO_KEY, url, "main", options) as path:
+        elapsed = time.perf_counter() - start
+        return {
+            "seconds": elapsed,
+            "bytes": _dir_size(path / ".git" / "objects"),
+            "files": _working_tree_files(path),
+        }
+
+
+async def _measure_mirror(cache: RepoMirrorCache, url: str, sparse_paths=()) -> dict:
+    objects = cache.mirror_path(REPO_KEY) / "objects"
+    before = _dir_size(objects) if objects.exists() else 0
+    start = time.perf_counter()
+    async with cache.checkout(REPO_KEY, url, "main", sparse_paths) as path:
+        elapsed = time.perf_counter() - start
+        return {
+            "seconds": elapsed,
+            "bytes": _dir_size(objects) - before,
+            "files": _working_tree_files(path),
+        }
+
+
+async def _run(commits: int, files: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        print(f"Criando repositório ({commits} commits, {files} módulos)...")
+        bare = _build_repo(root, commits, files)
+        url = bare.resolve().as_uri()
+        print(f"Repositório bare: {_dir_size(bare) / 1e6:.1f} MB\n")
+
+        cases = [
+            ("full", CloneOptions(mode=FULL)),
+            ("shallow", CloneOptions(mode=SHALLOW)),
+            ("blobless", CloneOptions(mode=BLOBLESS)),
+            ("shallow + sparse", CloneOptions(mode=SHALLOW, sparse_paths=SPARSE_PATHS)),
+            ("blobless + sparse", CloneOptions(mode=BLOBLESS, sparse_paths=SPARSE_PATHS)),
+        ]
+
+        print(f"{'modo':<22}{'tempo (s)':>11}{'recebido (MB)':>15}{'arquivos':>10}")
+        for label, options in cases:
+            results = [await _measure_clone(url, options) for _ in range(repeat)]
+            best = min(results, key=lambda r: r["seconds"])
+            print(f"{label:<22}{best['seconds']:>11.3f}{best['bytes'] / 1e6:>15.3f}{best['files']:>10}")
+
+        cache = RepoMirrorCache(root=str(root / "mirrors"), max_bytes=10 * 1024 ** 3)
+        cold = await _measure_mirror(cache, url)
+        warm = await _measure_mirror(cache, url)
+        (root / "work" / "src" / "pkg0" / "module_0.py").write_text("changed = True\n" * 200)
+        _git(root / "work", "commit", "-q", "-am", "novo commit")
+        _git(root / "work", "push", "-q", str(bare), "main")
+        incremental = await _measure_mirror(cache, url, SPARSE_PATHS)
+        for label, result in (
+            ("mirror (frio)", cold),
+            ("mirror (sem mudança)", warm),
+            ("mirror (+1, sparse)", incremental),
+        ):
+            print(f"{label:<22}{result['seconds']:>11.3f}{result['bytes'] / 1e6:>15.3f}{result['files']:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, default=300)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(_run(args.commits, args.files, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark do empacotador Python contra o `npx repomix`.
+
+Gera uma árvore sintética (ou usa --path) e mede o throughput do empacotador
+Python com leitura sequencial e em pool de threads, a contagem de tokens na
+própria thread e em pool de processos, e o caminho atual via npx repomix
+(quando Node e rede estão disponíveis).
+
+Uso:
+    python -m catalog.tools.read_repo.benchmark_packer --files 3000
+    python -m catalog.tools.read_repo.benchmark_packer --path /caminho/do/repo
+"""
+import argparse
+import os
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from .packer import count_tokens, iter_repo_files, list_repo_files, pack_repo
+
+WORDS = ("def", "return", "self", "value", "config", "import", "class", "async", "await", "result", "data", "items")
+
+
+def _build_tree(root: Path, files: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    for i in range(files):
+        path = root / f"pkg{i % 30}" / f"sub{i % 7}" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [
+            "    " * rng.randint(0, 3) + " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+            for _ in range(rng.randint(40, 400))
+        ]
+        path.write_text("\n".join(lines) + "\n")
+    # Conteúdo que deve ser ignorado
+    (root / "node_modules" / "lib").mkdir(parents=True)
+    (root / "node_modules" / "lib" / "index.js").write_text("module.exports = {}\n" * 1000)
+    (root / "assets").mkdir()
+    for i in range(50):
+        (root / "assets" / f"image_{i}.dat").write_bytes(b"\x00" + rng.randbytes(64 * 1024))
+    (root / ".gitignore").write_text("*.tmp\nbuild/\n")
+
+
+def _timed(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _report(label: str, seconds: float, size: int, files: int) -> None:
+    print(f"{label:<34}{seconds:>9.3f}{size / 1e6 / seconds:>10.1f}{files / seconds:>12.0f}")
+
+
+def _run_repomix(root: Path, timeout: float):
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(
+            ["npx", "-y", "repomix", "--stdout", "--style", "markdown"],
+            cwd=root, capture_output=True, timeout=timeout
+        )
+    except FileNotFoundError:
+        return None, "npx não encontrado"
+    except subprocess.TimeoutExpired:
+        return None, f"excedeu {timeout:.0f}s"
+    if result.returncode != 0:
+        return None, result.stderr.decode(errors="replace").strip().splitlines()[0:1]
+    return time.perf_counter() - start, len(result.stdout)
+
+
+def _run(root: Path, repeat: int, workers: int, processes: int, repomix_timeout: float) -> None:
+    paths = list_repo_files(root)
+    print(f"{len(paths)} arquivos após .gitignore e ignores padrão\n")
+    print(f"{'caminho':<34}{'tempo (s)':>9}{'MB/s':>10}{'arquivos/s':>12}")
+
+    seconds, files = _timed(lambda: list(iter_repo_files(root, paths, workers=1)), repeat)
+    size = sum(f.size for f in files)
+    _report("leitura sequencial", seconds, size, len(files))
+    seconds, _ = _timed(lambda: list(iter_repo_files(root, paths, workers=workers)), repeat)
+    _report(f"leitura com {workers} threads", seconds, size, len(files))
+
+    seconds, output = _timed(lambda: sum(len(part) for part in pack_repo(root, workers=workers)), repeat)
+    _report("pack_repo (markdown completo)", seconds, output, len(files))
+
+    seconds, _ = _timed(lambda: count_tokens(files, processes=0), repeat)
+    _report("tokens na thread", seconds, size, len(files))
+    if processes > 1:
+        seconds, _ = _timed(lambda: count_tokens(files, processes=processes), repeat)
+        _report(f"tokens em {processes} processos", seconds, size, len(files))
+    print(f"\ntokens estimados: {sum(f.tokens for f in files):,}")
+
+    seconds, output = _run_repomix(root, repomix_timeout)
+    if seconds is None:
+        print(f"npx repomix: indisponível ({output})")
+    else:
+        _report("npx repomix --stdout", seconds, output, len(files))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", type=Path, help="Repositório existente (sem ele, gera uma árvore sintética)")
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repomix-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    if args.path:
+        _run(args.path, args.repeat, args.workers, args.processes, args.repomix_timeout)
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f"Gerando {args.files} arquivos...")
+        _build_tree(Path(tmpdir), args.files)
+        _run(Path(tmpdir), args.repeat, args.workers, args.processes, args.repomix_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import contextlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from .errors import RepoReadError
+from .mirror import get_mirror_cache, run_git, sparse_checkout
+
+logger = logging.getLogger(__name__)
+
+MIRROR = "mirror"
+FULL = "full"
+SHALLOW = "shallow"
+BLOBLESS = "blobless"
+CLONE_MODES = (MIRROR, FULL, SHALLOW, BLOBLESS)
+
+# Modo usado quando nem a chamada nem o YAML escolhem um
+READ_REPO_CLONE_MODE = os.getenv("READ_REPO_CLONE_MODE", MIRROR).lower()
+
+# Argumentos extras do `git clone` por modo
+_CLONE_ARGS = {
+    FULL: [],
+    # Só o último commit da branch
+    SHALLOW: ["--depth", "1", "--single-branch"],
+    # Histórico completo sem conteúdo; os blobs do checkout vêm sob demanda
+    BLOBLESS: ["--filter=blob:none", "--single-branch"],
+}
+
+
+@dataclass(frozen=True)
+class CloneOptions:
+    """Como obter o working tree: modo do clone e padrões do sparse checkout."""
+    mode: str = READ_REPO_CLONE_MODE
+    sparse_paths: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        if self.mode not in CLONE_MODES:
+            raise RepoReadError(f"Modo de clone inválido: '{self.mode}'. Use um de {', '.join(CLONE_MODES)}.")
+
+    @classmethod
+    def from_params(
+        cls,
+        params: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+        sparse_paths: Optional[Sequence[str]] = None
+    ) -> "CloneOptions":
+        """Combina os argumentos da chamada com os `params` do YAML (a chamada tem prioridade)."""
+        params = params or {}
+        mode = (mode or params.get("clone_mode") or READ_REPO_CLONE_MODE).lower()
+        paths = sparse_paths or params.get("sparse_paths") or ()
+        if isinstance(paths, str):
+            paths = paths.split(",")
+        return cls(mode=mode, sparse_paths=tuple(p.strip() for p in paths if p and p.strip()))
+
+
+@contextlib.asynccontextmanager
+async def checkout_repo(
+    repo_key: str,
+    source_url: str,
+    branch: str,
+    options: Optional[CloneOptions] = None
+) -> AsyncIterator[Path]:
+    """
+    Diretório com a branch do repositório, válido dentro do bloco.
+
+    No modo `mirror` usa o cache de mirrors (se desabilitado, cai para `full`);
+    nos demais clona em um diretório temporário com os argumentos do modo.
+    """
+    options = options or CloneOptions()
+    cache = get_mirror_cache() if options.mode == MIRROR else None
+    if cache is not None:
+        async with cache.checkout(repo_key, source_url, branch, options.sparse_paths) as path:
+            yield path
+        return
+
+    mode = FULL if options.mode == MIRROR else options.mode
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir)
+        await run_git(
+            "clone", "--quiet", *_CLONE_ARGS[mode], *(["--no-checkout"] if options.sparse_paths else []),
+            "-b", branch, source_url, str(path),
+            secrets=[(source_url, f"https://{repo_key}.git")]
+        )
+        if options.sparse_paths:
+            # Em clones blobless, só os blobs dos caminhos selecionados são baixados
+            await sparse_checkout(path, options.sparse_paths)
+        yield path
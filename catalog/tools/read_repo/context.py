@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .clone import CloneOptions, checkout_repo
+from .context_cache import get_context_cache
+from .errors import RepoPackError, RepoReadError
+from .mirror import run_git
+from .packer import READ_REPO_PACKER_MAX_FILE_BYTES, pack_repo_to_string
+
+logger = logging.getLogger(__name__)
+
+# python (empacotador em processo, sem Node nem rede) | repomix (npx -y repomix)
+READ_REPO_PACKER = os.getenv("READ_REPO_PACKER", "python").lower()
+# Muda a chave do cache de contexto quando o layout do empacotador Python mudar
+PYTHON_PACKER_VERSION = "2"
+
+
+async def resolve_commit(repo_key: str, source_url: str, branch: str) -> str:
+    """SHA da ponta da branch no remoto, com um único `git ls-remote`."""
+    ref = f"refs/heads/{branch}"
+    output = await run_git("ls-remote", source_url, ref, secrets=[(source_url, f"https://{repo_key}.git")])
+    for line in output.splitlines():
+        sha, _, name = line.partition("\t")
+        if name == ref:
+            return sha
+    raise RepoReadError(f"Branch '{branch}' não encontrada em '{repo_key}'")
+
+
+async def _run_repomix(path: Path, repomix_args: Sequence[str]) -> str:
+    try:
+        repomix = await asyncio.create_subprocess_exec(
+            "npx", "-y", "repomix", "--stdout", *repomix_args,
+            cwd=path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except OSError as e:
+        raise RepoPackError(f"Não foi possível executar o npx: {e}") from e
+    stdout, stderr = await repomix.communicate()
+    if repomix.returncode != 0:
+        raise RepoPackError(f"Erro ao executar repomix: {stderr.decode().strip()}")
+    return stdout.decode().strip()
+
+
+async def _run_python_packer(path: Path) -> str:
+    try:
+        # Leitura e montagem fora do event loop
+        return await asyncio.to_thread(pack_repo_to_string, path)
+    except Exception as e:
+        raise RepoPackError(f"Erro ao empacotar o repositório: {e}") from e
+
+
+async def pack_repo_context(
+    repo_key: str,
+    source_url: str,
+    branch: str,
+    options: Optional[CloneOptions] = None,
+    repomix_args: Sequence[str] = ()
+) -> str:
+    """
+    Contexto empacotado da ponta da branch, pelo empacotador de READ_REPO_PACKER.
+
+    Com o cache de contexto habilitado, resolve o commit com `git ls-remote` e
+    só clona e empacota quando (repositório, commit, opções) ainda não está em
+    cache. Erros de clone levantam RepoReadError; do empacotamento, RepoPackError.
+    `repomix_args` só se aplica ao empacotador repomix.
+    """
+    options = options or CloneOptions()
+    cache = get_context_cache()
+    # O modo de clone não muda o conteúdo empacotado; o empacotador e os caminhos do sparse, sim
+    if READ_REPO_PACKER == "repomix":
+        pack_options = ["repomix", *repomix_args, *options.sparse_paths]
+    else:
+        pack_options = ["python", PYTHON_PACKER_VERSION, READ_REPO_PACKER_MAX_FILE_BYTES, *options.sparse_paths]
+
+    if cache is not None:
+        commit = await resolve_commit(repo_key, source_url, branch)
+        cached = await asyncio.to_thread(cache.get, cache.key(repo_key, commit, pack_options))
+        if cached is not None:
+            logger.info("Contexto de '%s' (%s) servido do cache", repo_key, commit[:12])
+            return cached
+
+    async with checkout_repo(repo_key, source_url, branch, options) as path:
+        if READ_REPO_PACKER == "repomix":
+            context = await _run_repomix(path, repomix_args)
+        else:
+            context = await _run_python_packer(path)
+        if cache is not None:
+            # A branch pode ter andado desde o ls-remote: a chave é o commit empacotado
+            commit = await run_git("rev-parse", "HEAD", cwd=path)
+
+    if cache is not None:
+        try:
+            await asyncio.to_thread(cache.put, cache.key(repo_key, commit, pack_options), context)
+        except Exception as e:
+            logger.warning("Falha ao gravar o contexto de '%s' no cache: %s", repo_key, e)
+    return context
@@ -0,0 +1,183 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Contexto empacotado (saída do repomix) por (repositório, commit, opções de empacotamento)
+READ_REPO_CONTEXT_CACHE_ENABLED = os.getenv("READ_REPO_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+READ_REPO_CONTEXT_CACHE_DIR = os.getenv("READ_REPO_CONTEXT_CACHE_DIR", ".adk/repo_context_cache")
+READ_REPO_CONTEXT_CACHE_MAX_BYTES = int(os.getenv("READ_REPO_CONTEXT_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+# zstd | zlib (zstd cai para zlib quando o zstandard não está instalado)
+READ_REPO_CONTEXT_CACHE_COMPRESSION = os.getenv("READ_REPO_CONTEXT_CACHE_COMPRESSION", "zstd").lower()
+
+_EXTENSIONS = {"zstd": ".zst", "zlib": ".zz"}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+class PackedContextCache:
+    """
+    Cache em disco do contexto empacotado de um repositório.
+
+    A chave é o hash de (repositório, SHA do commit, opções de empacotamento):
+    um commit nunca muda, então uma entrada não expira, só sai por LRU quando o
+    diretório passa de `max_bytes`. O último acesso é o mtime do arquivo, o que
+    vale também entre processos que compartilham o diretório.
+    """
+
+    def __init__(
+        self,
+        root: str = READ_REPO_CONTEXT_CACHE_DIR,
+        max_bytes: int = READ_REPO_CONTEXT_CACHE_MAX_BYTES,
+        compression: str = READ_REPO_CONTEXT_CACHE_COMPRESSION
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        if compression == "zstd" and _zstd() is None:
+            logger.warning("zstandard não instalado, o cache de contexto usará zlib.")
+            compression = "zlib"
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Compressão '{compression}' não suportada. Use zstd ou zlib.")
+        self.compression = compression
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0, "bytes_read": 0, "bytes_written": 0}
+
+    @staticmethod
+    def key(repo_key: str, commit: str, options: Sequence[Any] = ()) -> str:
+        payload = json.dumps([repo_key.lower(), commit, list(options)], separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        for compression, extension in _EXTENSIONS.items():
+            path = self.root / f"{key}{extension}"
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            try:
+                text = self._decompress(data, compression)
+            except Exception as e:
+                logger.warning("Entrada corrompida no cache de contexto '%s': %s", path.name, e)
+                path.unlink(missing_ok=True)
+                continue
+            # mtime = último acesso (LRU)
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(path)
+            with self._lock:
+                self.stats["hits"] += 1
+                self.stats["bytes_read"] += len(data)
+            return text
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        data = self._compress(text)
+        if len(data) > self.max_bytes:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Escrita atômica: leitores nunca veem um arquivo pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.root / f"{key}{_EXTENSIONS[self.compression]}")
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self.stats["puts"] += 1
+            self.stats["bytes_written"] += len(data)
+        self._evict()
+
+    def snapshot(self) -> Dict[str, Any]:
+        entries = self._entries()
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": stats["hits"] / lookups if lookups else None,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "compression": self.compression,
+            "dir": str(self.root),
+        }
+
+    def _entries(self) -> List[tuple]:
+        entries = []
+        for extension in _EXTENSIONS.values():
+            for path in self.root.glob(f"*{extension}"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self.stats["evictions"] += 1
+
+    def _compress(self, text: str) -> bytes:
+        raw = text.encode("utf-8")
+        if self.compression == "zstd":
+            return _zstd().ZstdCompressor(level=3).compress(raw)
+        return zlib.compress(raw, 6)
+
+    @staticmethod
+    def _decompress(data: bytes, compression: str) -> str:
+        if compression == "zstd":
+            zstandard = _zstd()
+            if zstandard is None:
+                raise RuntimeError("zstandard não instalado")
+            return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+        return zlib.decompress(data).decode("utf-8")
+
+
+# --- Singleton Factory ---
+_context_cache_instance: Optional[PackedContextCache] = None
+_context_cache_lock = threading.Lock()
+
+
+def get_context_cache() -> Optional[PackedContextCache]:
+    """Lazy singleton factory for the PackedContextCache. Returns None when disabled."""
+    global _context_cache_instance
+    if not READ_REPO_CONTEXT_CACHE_ENABLED:
+        return None
+    if _context_cache_instance:
+        return _context_cache_instance
+
+    with _context_cache_lock:
+        if _context_cache_instance is None:
+            _context_cache_instance = PackedContextCache()
+            logger.info(
+                "Cache de contexto em '%s' (limite de %d bytes, %s)",
+                READ_REPO_CONTEXT_CACHE_DIR, READ_REPO_CONTEXT_CACHE_MAX_BYTES, _context_cache_instance.compression
+            )
+
+    return _context_cache_instance
@@ -0,0 +1,8 @@
+class RepoReadError(RuntimeError):
+    """Erro ao clonar ou ler o contexto de um repositório."""
+    pass
+
+
+class RepoPackError(RepoReadError):
+    """Erro ao empacotar (repomix) um repositório já clonado."""
+    pass
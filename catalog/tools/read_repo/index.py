@@ -0,0 +1,321 @@
+import bisect
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .packer import RepoFile
+
+# Linhas por trecho indexado (a unidade de resultado do BM25)
+READ_REPO_INDEX_CHUNK_LINES = int(os.getenv("READ_REPO_INDEX_CHUNK_LINES", "60"))
+# Muda a chave do índice persistido quando o formato ou a tokenização mudarem
+INDEX_VERSION = "1"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Peso dos termos do caminho em cada trecho do arquivo
+PATH_TERM_WEIGHT = 2
+# Bônus por termo da busca que é o nome de um símbolo definido no trecho
+SYMBOL_BOOST = 3.0
+SNIPPET_LINES = 10
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# getUserName -> get, User, Name; HTTPServer -> HTTP, Server; snake_case sai pelo "_"
+_PART_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+_PY = [
+    (re.compile(r"^[ \t]*(?:async[ \t]+)?def[ \t]+(\w+)", re.M), "def"),
+    (re.compile(r"^[ \t]*class[ \t]+(\w+)", re.M), "class"),
+]
+_JS = [
+    (re.compile(r"^[ \t]*(?:export[ \t]+)?(?:default[ \t]+)?(?:async[ \t]+)?function\*?[ \t]+(\w+)", re.M), "function"),
+    (re.compile(r"^[ \t]*(?:export[ \t]+)?(?:default[ \t]+)?(?:abstract[ \t]+)?class[ \t]+(\w+)", re.M), "class"),
+    (re.compile(r"^[ \t]*(?:export[ \t]+)?(?:interface|type|enum)[ \t]+(\w+)", re.M), "type"),
+    (re.compile(r"^[ \t]*(?:export[ \t]+)?(?:const|let|var)[ \t]+(\w+)[ \t]*=[ \t]*(?:async[ \t]*)?(?:\([^)\n]*\)|\w+)[ \t]*=>", re.M), "function"),
+]
+_JVM = [
+    (re.compile(r"^[ \t]*(?:[\w@]+[ \t]+)*(?:class|interface|enum|record|object|trait)[ \t]+(\w+)", re.M), "class"),
+    (re.compile(r"^[ \t]*(?:[\w@]+[ \t]+)*fun[ \t]+(?:<[^>]*>[ \t]*)?(?:\w+\.)?(\w+)", re.M), "function"),
+    (re.compile(r"^[ \t]*def[ \t]+(\w+)", re.M), "def"),
+]
+SYMBOL_PATTERNS: Dict[str, List[Tuple[re.Pattern, str]]] = {
+    ".py": _PY, ".pyi": _PY,
+    ".js": _JS, ".jsx": _JS, ".mjs": _JS, ".cjs": _JS, ".ts": _JS, ".tsx": _JS,
+    ".java": _JVM, ".kt": _JVM, ".kts": _JVM, ".scala": _JVM, ".cs": _JVM,
+    ".go": [
+        (re.compile(r"^func[ \t]+(?:\([^)]*\)[ \t]*)?(\w+)", re.M), "func"),
+        (re.compile(r"^type[ \t]+(\w+)[ \t]+(?:struct|interface)", re.M), "type"),
+    ],
+    ".rs": [
+        (re.compile(r"^[ \t]*(?:pub(?:\([^)]*\))?[ \t]+)?(?:async[ \t]+)?fn[ \t]+(\w+)", re.M), "fn"),
+        (re.compile(r"^[ \t]*(?:pub(?:\([^)]*\))?[ \t]+)?(?:struct|enum|trait)[ \t]+(\w+)", re.M), "type"),
+    ],
+    ".rb": [
+        (re.compile(r"^[ \t]*def[ \t]+(?:self\.)?(\w+[?!]?)", re.M), "def"),
+        (re.compile(r"^[ \t]*(?:class|module)[ \t]+(\w+)", re.M), "class"),
+    ],
+    ".php": [
+        (re.compile(r"^[ \t]*(?:[\w]+[ \t]+)*function[ \t]+(\w+)", re.M), "function"),
+        (re.compile(r"^[ \t]*(?:abstract[ \t]+|final[ \t]+)?(?:class|interface|trait)[ \t]+(\w+)", re.M), "class"),
+    ],
+}
+
+
+@lru_cache(maxsize=65536)
+def _word_terms(word: str) -> Tuple[str, ...]:
+    lower = word.lower()
+    terms = [lower] if len(lower) > 1 else []
+    parts = _PART_RE.findall(word)
+    if len(parts) > 1:
+        terms.extend(p for p in (part.lower() for part in parts) if len(p) > 1 and p != lower)
+    return tuple(terms)
+
+
+def index_terms(text: str) -> Counter:
+    """Termos do BM25: identificadores inteiros e suas partes (camelCase, snake_case), em minúsculas."""
+    counts: Counter = Counter()
+    for word, count in Counter(_WORD_RE.findall(text)).items():
+        for term in _word_terms(word):
+            counts[term] += count
+    return counts
+
+
+def _symbol_key(name: str) -> str:
+    # charge_customer, chargeCustomer e ChargeCustomer são o mesmo símbolo na busca
+    return name.replace("_", "").lower()
+
+
+@dataclass(slots=True)
+class Symbol:
+    name: str
+    kind: str
+    line: int
+
+
+@dataclass(slots=True)
+class Chunk:
+    """Trecho de [start, end] (linhas, base 1) com as contagens de termos."""
+    start: int
+    end: int
+    terms: Dict[str, int]
+
+
+@dataclass(slots=True)
+class IndexedFile:
+    content: str
+    chunks: List[Chunk]
+    symbols: List[Symbol]
+
+
+@dataclass(slots=True)
+class SearchHit:
+    path: str
+    start: int
+    end: int
+    score: float
+    snippet_start: int
+    snippet: str
+
+
+def extract_symbols(path: str, content: str) -> List[Symbol]:
+    """Definições (funções, classes, tipos) por regex, pela extensão do arquivo."""
+    patterns = SYMBOL_PATTERNS.get(os.path.splitext(path)[1].lower())
+    if not patterns:
+        return []
+    line_starts = [0] + [m.end() for m in re.finditer("\n", content)]
+    symbols = [
+        Symbol(match.group(1), kind, bisect.bisect_right(line_starts, match.start(1)))
+        for pattern, kind in patterns
+        for match in pattern.finditer(content)
+    ]
+    symbols.sort(key=lambda s: (s.line, s.name))
+    return symbols
+
+
+def index_file(repo_file: RepoFile, chunk_lines: int = READ_REPO_INDEX_CHUNK_LINES) -> IndexedFile:
+    lines = repo_file.content.splitlines()
+    path_terms = index_terms(repo_file.path)
+    chunks = []
+    for offset in range(0, max(len(lines), 1), chunk_lines):
+        terms = index_terms("\n".join(lines[offset:offset + chunk_lines]))
+        for term, count in path_terms.items():
+            terms[term] += count * PATH_TERM_WEIGHT
+        chunks.append(Chunk(offset + 1, min(offset + chunk_lines, len(lines)) or 1, dict(terms)))
+    return IndexedFile(repo_file.content, chunks, extract_symbols(repo_file.path, repo_file.content))
+
+
+class RepoIndex:
+    """
+    Índice de busca de um commit: BM25 sobre trechos de arquivo e uma tabela de
+    símbolos (defs e classes).
+
+    O que se persiste são os arquivos com as contagens de termos de cada
+    trecho; as listas invertidas são derivadas delas na primeira busca. Assim
+    `updated()` só lê e tokeniza os arquivos que mudaram entre dois commits.
+    `paths` tem todos os caminhos listados, inclusive binários (que não têm
+    entrada em `files`).
+    """
+
+    def __init__(
+        self,
+        commit: str,
+        files: Dict[str, IndexedFile],
+        paths: Optional[List[str]] = None,
+        chunk_lines: int = READ_REPO_INDEX_CHUNK_LINES
+    ):
+        self.commit = commit
+        self.files = files
+        self.paths = paths if paths is not None else sorted(files)
+        self.chunk_lines = chunk_lines
+        self._chunks: Optional[List[Tuple[str, Chunk]]] = None
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        self._avg_length = 0.0
+        self._symbols: Dict[str, List[Tuple[str, Symbol]]] = {}
+
+    @classmethod
+    def build(
+        cls,
+        commit: str,
+        files: Iterable[RepoFile],
+        paths: Optional[List[str]] = None,
+        chunk_lines: int = READ_REPO_INDEX_CHUNK_LINES
+    ) -> "RepoIndex":
+        return cls(commit, {f.path: index_file(f, chunk_lines) for f in files}, paths, chunk_lines)
+
+    def updated(self, commit: str, changed: Mapping[str, Optional[RepoFile]], paths: List[str]) -> "RepoIndex":
+        """Novo índice com `changed` aplicado: caminho -> arquivo novo, ou None se saiu (ou virou binário)."""
+        files = dict(self.files)
+        for path, repo_file in changed.items():
+            if repo_file is None:
+                files.pop(path, None)
+            else:
+                files[path] = index_file(repo_file, self.chunk_lines)
+        return RepoIndex(commit, files, paths, self.chunk_lines)
+
+    # --- Persistência ---
+
+    def dumps(self) -> str:
+        files = {
+            path: [
+                entry.content,
+                [[c.start, c.end, c.terms] for c in entry.chunks],
+                [[s.name, s.kind, s.line] for s in entry.symbols],
+            ]
+            for path, entry in self.files.items()
+        }
+        payload = {"commit": self.commit, "chunk_lines": self.chunk_lines, "paths": self.paths, "files": files}
+        return json.dumps(payload, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, data: str) -> "RepoIndex":
+        payload = json.loads(data)
+        files = {
+            path: IndexedFile(
+                content,
+                [Chunk(start, end, terms) for start, end, terms in chunks],
+                [Symbol(name, kind, line) for name, kind, line in symbols],
+            )
+            for path, (content, chunks, symbols) in payload["files"].items()
+        }
+        return cls(payload["commit"], files, payload["paths"], payload["chunk_lines"])
+
+    # --- Busca ---
+
+    def _ensure_postings(self) -> None:
+        if self._chunks is not None:
+            return
+        chunks: List[Tuple[str, Chunk]] = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths: List[int] = []
+        symbols: Dict[str, List[Tuple[str, Symbol]]] = {}
+        for path in sorted(self.files):
+            entry = self.files[path]
+            for chunk in entry.chunks:
+                chunk_id = len(chunks)
+                chunks.append((path, chunk))
+                lengths.append(sum(chunk.terms.values()))
+                for term, count in chunk.terms.items():
+                    postings.setdefault(term, []).append((chunk_id, count))
+            for symbol in entry.symbols:
+                symbols.setdefault(_symbol_key(symbol.name), []).append((path, symbol))
+        self._postings, self._lengths, self._symbols = postings, lengths, symbols
+        self._avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        self._chunks = chunks
+
+    def find_symbols(self, query: str, limit: int = 20) -> List[Tuple[str, Symbol]]:
+        """Símbolos cujo nome é um identificador da busca (sem diferenciar maiúsculas nem `_`)."""
+        self._ensure_postings()
+        names = dict.fromkeys(_symbol_key(word) for word in _WORD_RE.findall(query))
+        found = [hit for name in names for hit in self._symbols.get(name, [])]
+        return found[:limit]
+
+    def search(self, query: str, k: int = 10) -> List[SearchHit]:
+        """Os `k` trechos de maior BM25 para a busca, com um recorte das linhas mais relevantes."""
+        self._ensure_postings()
+        terms = list(index_terms(query))
+        if not terms or not self._chunks:
+            return []
+
+        total = len(self._chunks)
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, count in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[chunk_id] / self._avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * count * (BM25_K1 + 1) / (count + norm)
+
+        query_names = {_symbol_key(word) for word in _WORD_RE.findall(query)}
+        for name in query_names:
+            for path, symbol in self._symbols.get(name, []):
+                for chunk_id in self._chunk_ids(path, symbol.line):
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + SYMBOL_BOOST
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self._hit(chunk_id, score, set(terms)) for chunk_id, score in top]
+
+    def _chunk_ids(self, path: str, line: int) -> List[int]:
+        # Os trechos de cada arquivo são contíguos em self._chunks, na ordem das linhas
+        first = bisect.bisect_left(self._chunks, path, key=lambda item: item[0])
+        for chunk_id in range(first, len(self._chunks)):
+            chunk_path, chunk = self._chunks[chunk_id]
+            if chunk_path != path:
+                break
+            if chunk.start <= line <= chunk.end:
+                return [chunk_id]
+        return []
+
+    def _hit(self, chunk_id: int, score: float, terms: set) -> SearchHit:
+        path, chunk = self._chunks[chunk_id]
+        lines = self.files[path].content.splitlines()[chunk.start - 1:chunk.end]
+        # Janela de SNIPPET_LINES linhas com mais ocorrências dos termos da busca
+        weights = [sum(count for term, count in index_terms(line).items() if term in terms) for line in lines]
+        best, best_weight = 0, -1
+        window = sum(weights[:SNIPPET_LINES])
+        for offset in range(max(len(lines) - SNIPPET_LINES + 1, 1)):
+            if offset:
+                window += weights[offset + SNIPPET_LINES - 1] - weights[offset - 1]
+            if window > best_weight:
+                best, best_weight = offset, window
+        snippet = "\n".join(lines[best:best + SNIPPET_LINES])
+        return SearchHit(path, chunk.start, chunk.end, round(score, 3), chunk.start + best, snippet)
+
+    # --- Leitura ---
+
+    def read(self, path: str, start: int = 1, end: int = 0) -> Tuple[List[str], int, int, int]:
+        """Linhas [start, end] (base 1, inclusive; end 0 = até o fim), o intervalo efetivo e o total."""
+        entry = self.files.get(path.lstrip("/").removeprefix("./"))
+        if entry is None:
+            raise KeyError(path)
+        lines = entry.content.splitlines()
+        start = max(1, start or 1)
+        end = len(lines) if not end or end > len(lines) else end
+        return lines[start - 1:end], start, end, len(lines)
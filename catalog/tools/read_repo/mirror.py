@@ -0,0 +1,276 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas o lock em processo
+    fcntl = None
+
+from .errors import RepoReadError
+
+logger = logging.getLogger(__name__)
+
+# Cache local de mirrors bare, reaproveitado entre chamadas (fetch incremental + worktree)
+READ_REPO_MIRROR_ENABLED = os.getenv("READ_REPO_MIRROR_ENABLED", "true").lower() == "true"
+READ_REPO_MIRROR_DIR = os.getenv("READ_REPO_MIRROR_DIR", ".adk/repo_mirrors")
+READ_REPO_MIRROR_MAX_BYTES = int(os.getenv("READ_REPO_MIRROR_MAX_BYTES", str(5 * 1024 ** 3)))
+READ_REPO_GIT_TIMEOUT_SECONDS = float(os.getenv("READ_REPO_GIT_TIMEOUT_SECONDS", "600"))
+
+LAST_USED_FILE = "LAST_USED"
+
+
+def _redact(text: str, secrets: Sequence[Tuple[str, str]]) -> str:
+    for secret, replacement in secrets:
+        if secret:
+            text = text.replace(secret, replacement)
+    return text
+
+
+async def run_git(
+    *args: str,
+    cwd: Optional[Path] = None,
+    secrets: Sequence[Tuple[str, str]] = (),
+    stdin: Optional[str] = None
+) -> str:
+    """Executa um comando git e retorna a saída; em erro levanta RepoReadError sem expor credenciais."""
+    process = await asyncio.create_subprocess_exec(
+        "git", *args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        # Sem prompt de credenciais: uma URL inválida falha em vez de travar a chamada
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    )
+    try:
+        output, _ = await asyncio.wait_for(
+            process.communicate(stdin.encode() if stdin is not None else None), READ_REPO_GIT_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise RepoReadError(f"git {args[0]} excedeu {READ_REPO_GIT_TIMEOUT_SECONDS:.0f}s")
+
+    text = _redact(output.decode(errors="replace").strip(), secrets)
+    if process.returncode != 0:
+        raise RepoReadError(text or f"git {args[0]} terminou com código {process.returncode}")
+    return text
+
+
+async def sparse_checkout(path: Path, patterns: Sequence[str]) -> None:
+    """
+    Restringe o working tree de `path` aos padrões (sintaxe do .gitignore, `!` exclui).
+
+    Os padrões vão pelo stdin, então nenhum deles é interpretado como opção do git.
+    """
+    if all(p.startswith("!") for p in patterns):
+        # Só exclusões: parte do repositório inteiro
+        patterns = ["/*", *patterns]
+    await run_git("sparse-checkout", "set", "--no-cone", "--stdin", cwd=path, stdin="\n".join(patterns) + "\n")
+    # Popula o working tree de um checkout criado com --no-checkout
+    await run_git("read-tree", "-mu", "HEAD", cwd=path)
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class RepoMirrorCache:
+    """
+    Mirrors bare locais, um por URL de repositório.
+
+    Cada chamada faz `git fetch` só da branch pedida (incremental: baixa apenas
+    os objetos novos) e monta o commit em um `git worktree` temporário, removido
+    ao final. Chamadas concorrentes ao mesmo repositório são serializadas por um
+    lock (asyncio + flock entre processos); quem esperou por um fetch iniciado
+    depois do seu pedido reaproveita o resultado em vez de buscar de novo.
+    Acima de `max_bytes`, os mirrors usados há mais tempo são removidos.
+    """
+
+    def __init__(self, root: str = READ_REPO_MIRROR_DIR, max_bytes: int = READ_REPO_MIRROR_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # (mirror, branch) -> instante (monotonic) em que começou o último fetch bem-sucedido
+        self._fetched: Dict[Tuple[str, str], float] = {}
+        self._in_use: Dict[str, int] = {}
+        self.stats = {"fetches": 0, "shared_fetches": 0, "mirrors_created": 0, "evictions": 0}
+
+    def mirror_path(self, repo_key: str) -> Path:
+        digest = hashlib.sha256(repo_key.lower().encode()).hexdigest()[:16]
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", repo_key.rstrip("/").rsplit("/", 1)[-1])[:40]
+        return self.root / f"{name}-{digest}.git"
+
+    @contextlib.asynccontextmanager
+    async def checkout(
+        self,
+        repo_key: str,
+        source_url: str,
+        branch: str,
+        sparse_paths: Sequence[str] = ()
+    ) -> AsyncIterator[Path]:
+        """Atualiza o mirror e entrega um worktree com a ponta da branch (opcionalmente esparso)."""
+        mirror = self.mirror_path(repo_key)
+        secrets = [(source_url, f"https://{repo_key}.git")]
+        requested_at = time.monotonic()
+
+        self._in_use[mirror.name] = self._in_use.get(mirror.name, 0) + 1
+        try:
+            worktree = Path(tempfile.mkdtemp(prefix="read_repo_")) / "repo"
+            try:
+                async with self._lock(mirror):
+                    commit = await self._update(mirror, source_url, branch, requested_at, secrets)
+                    await run_git(
+                        "--git-dir", str(mirror), "worktree", "add", "--detach", "--quiet",
+                        *(["--no-checkout"] if sparse_paths else []), str(worktree), commit
+                    )
+                    if sparse_paths:
+                        # Grava extensions.worktreeConfig no mirror: fica sob o lock
+                        await sparse_checkout(worktree, sparse_paths)
+
+                await self._evict(keep=mirror.name)
+                yield worktree
+            finally:
+                async with self._lock(mirror):
+                    await self._remove_worktree(mirror, worktree)
+        finally:
+            self._in_use[mirror.name] -= 1
+
+    async def _update(
+        self,
+        mirror: Path,
+        source_url: str,
+        branch: str,
+        requested_at: float,
+        secrets: Sequence[Tuple[str, str]]
+    ) -> str:
+        ref = f"refs/heads/{branch}"
+        try:
+            await run_git("check-ref-format", ref)
+        except RepoReadError:
+            raise RepoReadError(f"Branch inválida: '{branch}'")
+
+        if not (mirror / "HEAD").exists():
+            # Sobra de uma criação interrompida
+            shutil.rmtree(mirror, ignore_errors=True)
+            await run_git("init", "--bare", "--quiet", str(mirror))
+            self.stats["mirrors_created"] += 1
+
+        key = (mirror.name, branch)
+        if self._fetched.get(key, -1.0) >= requested_at:
+            self.stats["shared_fetches"] += 1
+        else:
+            started = time.monotonic()
+            await run_git(
+                "--git-dir", str(mirror), "fetch", "--quiet", "--no-tags", source_url, f"+{ref}:{ref}",
+                secrets=secrets
+            )
+            self._fetched[key] = started
+            self.stats["fetches"] += 1
+
+        (mirror / LAST_USED_FILE).touch()
+        return await run_git("--git-dir", str(mirror), "rev-parse", "--verify", f"{ref}^{{commit}}")
+
+    async def _remove_worktree(self, mirror: Path, worktree: Path) -> None:
+        if worktree.exists():
+            try:
+                await run_git("--git-dir", str(mirror), "worktree", "remove", "--force", str(worktree))
+            except RepoReadError as e:
+                logger.warning("Falha ao remover worktree '%s': %s", worktree, e)
+        shutil.rmtree(worktree.parent, ignore_errors=True)
+        with contextlib.suppress(RepoReadError):
+            await run_git("--git-dir", str(mirror), "worktree", "prune")
+
+    @contextlib.asynccontextmanager
+    async def _lock(self, mirror: Path) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(mirror.name, asyncio.Lock())
+        async with lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd = os.open(mirror.with_suffix(".lock"), os.O_CREAT | os.O_RDWR)
+            try:
+                if fcntl:
+                    await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Fechar o descritor libera o flock
+                os.close(fd)
+
+    async def _evict(self, keep: str) -> None:
+        evicted = await asyncio.to_thread(self._evict_sync, keep)
+        for name in evicted:
+            self.stats["evictions"] += 1
+            for key in [k for k in self._fetched if k[0] == name]:
+                del self._fetched[key]
+
+    def _evict_sync(self, keep: str) -> List[str]:
+        mirrors = []
+        for path in self.root.glob("*.git"):
+            marker = path / LAST_USED_FILE
+            last_used = marker.stat().st_mtime if marker.exists() else 0.0
+            mirrors.append((last_used, _dir_size(path), path))
+
+        total = sum(size for _, size, _ in mirrors)
+        evicted = []
+        for _, size, path in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            if path.name == keep or self._in_use.get(path.name):
+                continue
+            if not self._remove_if_unlocked(path):
+                continue
+            total -= size
+            evicted.append(path.name)
+            logger.info("Mirror '%s' removido do cache (%d bytes)", path.name, size)
+        return evicted
+
+    def _remove_if_unlocked(self, path: Path) -> bool:
+        fd = os.open(path.with_suffix(".lock"), os.O_CREAT | os.O_RDWR)
+        try:
+            if fcntl:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Em uso por outro processo
+                    return False
+            shutil.rmtree(path, ignore_errors=True)
+            return True
+        finally:
+            os.close(fd)
+
+
+# --- Singleton Factory ---
+_mirror_cache_instance: Optional[RepoMirrorCache] = None
+_mirror_cache_lock = threading.Lock()
+
+
+def get_mirror_cache() -> Optional[RepoMirrorCache]:
+    """Lazy singleton factory for the RepoMirrorCache. Returns None when disabled."""
+    global _mirror_cache_instance
+    if not READ_REPO_MIRROR_ENABLED:
+        return None
+    if _mirror_cache_instance:
+        return _mirror_cache_instance
+
+    with _mirror_cache_lock:
+        if _mirror_cache_instance is None:
+            _mirror_cache_instance = RepoMirrorCache()
+            logger.info("Cache de mirrors em '%s' (limite de %d bytes)", READ_REPO_MIRROR_DIR, READ_REPO_MIRROR_MAX_BYTES)
+
+    return _mirror_cache_instance
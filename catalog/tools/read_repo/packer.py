@@ -0,0 +1,412 @@
+import codecs
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Empacotador em Python com o mesmo layout markdown do `repomix --style markdown`
+READ_REPO_PACKER_MAX_FILE_BYTES = int(os.getenv("READ_REPO_PACKER_MAX_FILE_BYTES", str(1024 ** 2)))
+READ_REPO_PACKER_READ_WORKERS = int(os.getenv("READ_REPO_PACKER_READ_WORKERS", "8"))
+# > 1 conta tokens em um pool de processos (CPU); 0 ou 1 conta na própria thread
+READ_REPO_PACKER_TOKEN_PROCESSES = int(os.getenv("READ_REPO_PACKER_TOKEN_PROCESSES", "0"))
+
+SNIFF_BYTES = 8192
+
+# Equivalente à lista padrão de ignores do repomix (além do .gitignore).
+# ".git" sem barra: em worktrees (cache de mirrors) ele é um arquivo, não um diretório
+DEFAULT_IGNORE_PATTERNS = (
+    ".git", ".svn/", ".hg/", ".DS_Store",
+    "node_modules/", "bower_components/", "jspm_packages/", ".yarn/",
+    "__pycache__/", "*.pyc", "*.pyo", ".venv/", "venv/", ".tox/", ".nox/",
+    ".mypy_cache/", ".pytest_cache/", ".ruff_cache/", "*.egg-info/",
+    ".idea/", ".vscode/", "coverage/", ".nyc_output/", "*.log",
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb", "poetry.lock",
+    "Pipfile.lock", "uv.lock", "Cargo.lock", "composer.lock", "Gemfile.lock", "go.sum",
+)
+
+# Pulados pela extensão, sem abrir o arquivo
+BINARY_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tiff", ".psd",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".jar", ".war",
+    ".exe", ".dll", ".so", ".dylib", ".a", ".o", ".obj", ".class", ".pyc", ".wasm",
+    ".mp3", ".mp4", ".wav", ".ogg", ".avi", ".mov", ".mkv", ".flac",
+    ".ttf", ".otf", ".woff", ".woff2", ".eot",
+    ".sqlite", ".db", ".parquet", ".avro", ".pkl", ".npy", ".npz", ".bin",
+})
+
+LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".jsx": "jsx", ".ts": "typescript", ".tsx": "tsx",
+    ".java": "java", ".kt": "kotlin", ".go": "go", ".rs": "rust", ".rb": "ruby", ".php": "php",
+    ".c": "c", ".h": "c", ".cpp": "cpp", ".hpp": "cpp", ".cs": "csharp", ".swift": "swift",
+    ".scala": "scala", ".sh": "bash", ".bash": "bash", ".ps1": "powershell", ".sql": "sql",
+    ".html": "html", ".css": "css", ".scss": "scss", ".vue": "vue", ".svelte": "svelte",
+    ".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml", ".xml": "xml",
+    ".md": "markdown", ".tf": "hcl", ".dockerfile": "dockerfile", ".proto": "protobuf",
+}
+LANGUAGES_BY_NAME = {"Dockerfile": "dockerfile", "Makefile": "makefile"}
+
+SUMMARY = """This file is a merged representation of the entire codebase, combined into a single document.
+
+# File Summary
+
+## Purpose
+This file contains a packed representation of the entire repository's contents.
+It is designed to be easily consumable by AI systems for analysis, code review,
+or other automated processes.
+
+## File Format
+The content is organized as follows:
+1. This summary section
+2. Directory structure
+3. Repository files, each consisting of:
+  a. A header with the file path (## File: path/to/file)
+  b. The full contents of the file in a code block
+
+## Usage Guidelines
+- This file should be treated as read-only. Any changes should be made to the
+  original repository files, not this packed version.
+- When processing this file, use the file path to distinguish
+  between different files in the repository.
+- Be aware that this file may contain sensitive information. Handle it with
+  the same level of security as you would the original repository.
+
+## Notes
+- Some files may have been excluded based on .gitignore rules and the default ignore patterns
+- Binary files are not included in this packed representation. Please refer to the Directory Structure section for a complete list of file paths, including binary files
+- Files larger than {max_file_bytes} bytes are not included
+- Files are sorted by path
+
+"""
+
+
+@dataclass(slots=True)
+class RepoFile:
+    """Arquivo de texto do repositório (caminho relativo em formato posix)."""
+    path: str
+    content: str
+    size: int
+    tokens: int = 0
+
+
+# --- .gitignore ---
+
+def _glob_to_regex(pattern: str) -> str:
+    i, out = 0, []
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                out.append(f"[^{body[1:]}]" if body.startswith("!") else f"[{body}]")
+                i = end + 1
+        elif c == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """
+    Regras no formato do .gitignore, relativas a um diretório base.
+
+    Suporta negação (`!`), padrões só de diretório (`/` final), padrões
+    ancorados (com `/` no meio ou no início) e `**`. A última regra que casa vence.
+    """
+
+    def __init__(self, patterns: Iterable[str], base: str = ""):
+        self.base = base
+        self._rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for line in patterns:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            regex = _glob_to_regex(line)
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            self._rules.append((re.compile(regex + r"\Z", re.DOTALL), negate, dir_only))
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """True (ignorar), False (re-incluído por negação) ou None (nenhuma regra casa)."""
+        if self.base:
+            if not path.startswith(self.base + "/"):
+                return None
+            path = path[len(self.base) + 1:]
+        result = None
+        for regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(path):
+                result = not negate
+        return result
+
+
+def _is_ignored(rules: Sequence[IgnoreRules], path: str, is_dir: bool) -> bool:
+    ignored = False
+    # Regras de diretórios mais profundos têm prioridade, como no git
+    for rule in rules:
+        result = rule.match(path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def list_repo_files(
+    root: Path,
+    ignore_patterns: Sequence[str] = DEFAULT_IGNORE_PATTERNS,
+    use_gitignore: bool = True
+) -> List[str]:
+    """
+    Caminhos (posix, relativos a `root`) dos arquivos do repositório, ordenados.
+
+    Respeita os .gitignore de cada diretório e `ignore_patterns`. Links
+    simbólicos são ignorados: podem apontar para fora do repositório.
+    """
+    root = Path(root)
+    files: List[str] = []
+    base_rules = [IgnoreRules(ignore_patterns)]
+
+    def walk(directory: Path, rel_dir: str, rules: List[IgnoreRules]) -> None:
+        gitignore = directory / ".gitignore"
+        if use_gitignore and gitignore.is_file():
+            try:
+                local = IgnoreRules(gitignore.read_text(encoding="utf-8", errors="replace").splitlines(), rel_dir)
+            except OSError:
+                local = None
+            if local:
+                rules = [*rules, local]
+
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError as e:
+            logger.warning("Não foi possível listar '%s': %s", directory, e)
+            return
+
+        for entry in entries:
+            if entry.is_symlink():
+                continue
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if _is_ignored(rules, rel, is_dir):
+                continue
+            if is_dir:
+                walk(Path(entry.path), rel, rules)
+            elif entry.is_file(follow_symlinks=False):
+                files.append(rel)
+
+    walk(root, "", base_rules)
+    files.sort()
+    return files
+
+
+# --- Leitura ---
+
+def _read_text(path: Path, max_file_bytes: int) -> Optional[str]:
+    """Conteúdo do arquivo, ou None se for binário, grande demais ou ilegível."""
+    if path.suffix.lower() in BINARY_EXTENSIONS:
+        return None
+    try:
+        if path.stat().st_size > max_file_bytes:
+            return None
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            if b"\x00" in head:
+                return None
+            rest = f.read()
+    except OSError:
+        return None
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        # final=False: um caractere multibyte cortado no fim do bloco de sniff não é erro
+        text = decoder.decode(head, final=False) + decoder.decode(rest, final=True)
+    except UnicodeDecodeError:
+        return None
+    return text.lstrip("\ufeff")
+
+
+def iter_repo_files(
+    root: Path,
+    paths: Sequence[str],
+    workers: int = READ_REPO_PACKER_READ_WORKERS,
+    max_file_bytes: int = READ_REPO_PACKER_MAX_FILE_BYTES
+) -> Iterator[RepoFile]:
+    """
+    Lê os arquivos de texto em um pool de threads, na ordem de `paths`.
+
+    Só `workers * 4` leituras ficam adiantadas, então a memória não cresce
+    com o tamanho do repositório quando o consumidor é um stream.
+    """
+    root = Path(root)
+    if workers <= 1:
+        for rel in paths:
+            content = _read_text(root / rel, max_file_bytes)
+            if content is not None:
+                yield RepoFile(rel, content, len(content.encode("utf-8")))
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="repo-packer") as pool:
+        pending = iter(paths)
+        window = deque(
+            (rel, pool.submit(_read_text, root / rel, max_file_bytes))
+            for rel in islice(pending, workers * 4)
+        )
+        while window:
+            rel, future = window.popleft()
+            following = next(pending, None)
+            if following is not None:
+                window.append((following, pool.submit(_read_text, root / following, max_file_bytes)))
+            content = future.result()
+            if content is not None:
+                yield RepoFile(rel, content, len(content.encode("utf-8")))
+
+
+# --- Tokens ---
+
+# Palavras em pedaços de até 4 letras, números de até 3 dígitos, cada símbolo e cada bloco de espaços
+_TOKEN_RE = re.compile(r"[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]|\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens próxima de um tokenizador BPE, sem dependências."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def count_tokens(files: List[RepoFile], processes: int = READ_REPO_PACKER_TOKEN_PROCESSES) -> List[RepoFile]:
+    """Preenche `tokens` de cada arquivo; com `processes` > 1 usa um ProcessPoolExecutor."""
+    if processes > 1 and len(files) > 1:
+        chunksize = max(1, len(files) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            counts = list(pool.map(estimate_tokens, (f.content for f in files), chunksize=chunksize))
+    else:
+        counts = [estimate_tokens(f.content) for f in files]
+
+    for repo_file, tokens in zip(files, counts):
+        repo_file.tokens = tokens
+    return files
+
+
+def scan_repo(
+    root: Path,
+    ignore_patterns: Sequence[str] = DEFAULT_IGNORE_PATTERNS,
+    token_processes: int = READ_REPO_PACKER_TOKEN_PROCESSES
+) -> List[RepoFile]:
+    """Todos os arquivos de texto do repositório, com a contagem de tokens."""
+    paths = list_repo_files(root, ignore_patterns)
+    return count_tokens(list(iter_repo_files(root, paths)), token_processes)
+
+
+# --- Markdown ---
+
+def directory_tree(paths: Sequence[str]) -> str:
+    """Árvore indentada (diretórios primeiro, com `/` no fim), como a do repomix."""
+    tree: Dict[str, dict] = {}
+    for path in paths:
+        node = tree
+        parts = path.split("/")
+        for part in parts[:-1]:
+            node = node.setdefault(part + "/", {})
+        node.setdefault(parts[-1], None)
+
+    lines: List[str] = []
+
+    def render(node: Dict[str, Optional[dict]], depth: int) -> None:
+        dirs = sorted(name for name, child in node.items() if child is not None)
+        names = sorted(name for name, child in node.items() if child is None)
+        for name in dirs:
+            lines.append("  " * depth + name)
+            render(node[name], depth + 1)
+        for name in names:
+            lines.append("  " * depth + name)
+
+    render(tree, 0)
+    return "\n".join(lines)
+
+
+def file_language(path: str) -> str:
+    """Linguagem do bloco de código markdown, pelo nome ou pela extensão."""
+    name = path.rsplit("/", 1)[-1]
+    if name in LANGUAGES_BY_NAME:
+        return LANGUAGES_BY_NAME[name]
+    _, ext = os.path.splitext(name)
+    return LANGUAGES.get(ext.lower(), ext.lstrip(".").lower())
+
+
+def _fence(content: str) -> str:
+    if "````" not in content:
+        return "````"
+    # Mais crases que qualquer sequência do próprio arquivo (ex.: markdown com blocos de código)
+    longest = max((len(run) for run in re.findall(r"`+", content)), default=0)
+    return "`" * max(4, longest + 1)
+
+
+def render_file(repo_file: RepoFile, note: str = "") -> str:
+    """Seção `## File:` do arquivo; `note` vai depois do caminho (ex.: faixa de linhas)."""
+    fence = _fence(repo_file.content)
+    content = repo_file.content if repo_file.content.endswith("\n") or not repo_file.content else repo_file.content + "\n"
+    return f"## File: {repo_file.path}{note}\n{fence}{file_language(repo_file.path)}\n{content}{fence}\n\n"
+
+
+def pack_repo(
+    root: Path,
+    ignore_patterns: Sequence[str] = DEFAULT_IGNORE_PATTERNS,
+    workers: int = READ_REPO_PACKER_READ_WORKERS,
+    max_file_bytes: int = READ_REPO_PACKER_MAX_FILE_BYTES
+) -> Iterator[str]:
+    """
+    Empacota o repositório em markdown, em partes (um gerador).
+
+    Layout do `repomix --style markdown`: resumo, árvore de diretórios e uma
+    seção `## File:` por arquivo de texto. Não depende de Node nem de rede.
+    """
+    root = Path(root)
+    paths = list_repo_files(root, ignore_patterns)
+    yield SUMMARY.format(max_file_bytes=max_file_bytes)
+    yield f"# Directory Structure\n```\n{directory_tree(paths)}\n```\n\n# Files\n\n"
+    for repo_file in iter_repo_files(root, paths, workers, max_file_bytes):
+        yield render_file(repo_file)
+
+
+def pack_repo_to_string(root: Path, **kwargs) -> str:
+    return "".join(pack_repo(root, **kwargs)).strip()
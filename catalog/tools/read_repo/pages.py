@@ -0,0 +1,377 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import math
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .clone import CloneOptions, checkout_repo
+from .context import resolve_commit
+from .context_cache import PackedContextCache, get_context_cache
+from .errors import RepoPackError, RepoReadError
+from .mirror import run_git
+from .packer import (
+    READ_REPO_PACKER_MAX_FILE_BYTES,
+    RepoFile,
+    count_tokens,
+    directory_tree,
+    estimate_tokens,
+    iter_repo_files,
+    list_repo_files,
+    render_file,
+)
+
+logger = logging.getLogger(__name__)
+
+# Orçamento de tokens por página (o agente pode pedir outro, limitado a [MIN, MAX])
+READ_REPO_PAGE_TOKENS = int(os.getenv("READ_REPO_PAGE_TOKENS", "8000"))
+READ_REPO_PAGE_MIN_TOKENS = int(os.getenv("READ_REPO_PAGE_MIN_TOKENS", "1000"))
+READ_REPO_PAGE_MAX_TOKENS = int(os.getenv("READ_REPO_PAGE_MAX_TOKENS", "32000"))
+# Muda a chave do manifesto em cache quando o formato mudar
+MANIFEST_VERSION = "1"
+CURSOR_VERSION = 2
+
+# Fração máxima da primeira página ocupada pela árvore de diretórios
+TREE_BUDGET_RATIO = 0.25
+# Com menos que esta fração livre, um arquivo grande fica para a próxima página
+SPLIT_MIN_RATIO = 0.25
+# Cabeçalho, rodapé com o cursor e aviso de branch alterada (além do título)
+PAGE_OVERHEAD_TOKENS = 160
+
+README_RE = re.compile(r"^readme(\.[a-z0-9]+)?$", re.IGNORECASE)
+MANIFEST_NAMES = frozenset({
+    "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "Pipfile", "environment.yml",
+    "package.json", "tsconfig.json", "go.mod", "Cargo.toml", "pom.xml", "build.gradle", "build.gradle.kts",
+    "Gemfile", "composer.json", "Dockerfile", "docker-compose.yml", "docker-compose.yaml", "Makefile",
+})
+ENTRY_POINT_STEMS = frozenset({"main", "__main__", "app", "index", "cli", "server", "manage", "wsgi", "asgi"})
+ENTRY_POINT_EXTENSIONS = frozenset({".py", ".js", ".ts", ".mjs", ".go", ".rs", ".java", ".kt", ".rb", ".php", ".cs"})
+
+
+@dataclass(slots=True)
+class RepoManifest:
+    """Arquivos de texto de um commit, com tokens, e todos os caminhos para a árvore."""
+    commit: str
+    paths: List[str]
+    files: List[RepoFile]
+
+    def dumps(self) -> str:
+        files = [[f.path, f.content, f.tokens] for f in self.files]
+        return json.dumps({"commit": self.commit, "paths": self.paths, "files": files}, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, data: str) -> "RepoManifest":
+        payload = json.loads(data)
+        files = [RepoFile(path, content, len(content.encode("utf-8")), tokens) for path, content, tokens in payload["files"]]
+        return cls(payload["commit"], payload["paths"], files)
+
+
+@dataclass(slots=True)
+class RepoPage:
+    """Uma página do contexto; `cursor` é None na última."""
+    content: str
+    cursor: Optional[str]
+    commit: str
+    page: int
+    files: int
+    tokens: int
+
+
+# --- Cursor ---
+
+def encode_cursor(fingerprint: str, page: int, index: int, line: int, query: str, column: int = 0) -> str:
+    payload = {"v": CURSOR_VERSION, "k": fingerprint, "p": page, "i": index, "l": line, "c": column, "q": query}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload.get("v") != CURSOR_VERSION:
+            raise ValueError("versão")
+        for field in ("p", "i", "l", "c"):
+            if not isinstance(payload.get(field), int) or payload[field] < 0:
+                raise ValueError(field)
+        if not isinstance(payload.get("k"), str) or not isinstance(payload.get("q"), str):
+            raise ValueError("k/q")
+        return payload
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, AttributeError) as e:
+        raise RepoReadError(f"Cursor inválido ({e}); recomece sem cursor.") from e
+
+
+# --- Ranking ---
+
+def _tier(path: str) -> int:
+    """0 README, 1 manifesto, 2 ponto de entrada, 3 o resto (só nos níveis mais rasos)."""
+    depth = path.count("/")
+    name = path.rsplit("/", 1)[-1]
+    if depth <= 1 and README_RE.match(name):
+        return 0
+    if depth <= 2 and name in MANIFEST_NAMES:
+        return 1
+    stem, ext = os.path.splitext(name)
+    if depth <= 2 and stem in ENTRY_POINT_STEMS and ext in ENTRY_POINT_EXTENSIONS:
+        return 2
+    return 3
+
+
+def _query_terms(query: str) -> List[str]:
+    return list(dict.fromkeys(term for term in re.findall(r"\w+", query.lower()) if len(term) > 1))
+
+
+def _relevance(repo_file: RepoFile, terms: Sequence[str]) -> float:
+    path = repo_file.path.lower()
+    content = repo_file.content.lower()
+    return sum((3.0 if term in path else 0.0) + math.log1p(content.count(term)) for term in terms)
+
+
+def rank_files(files: Sequence[RepoFile], query: str = "") -> List[RepoFile]:
+    """
+    Ordem de leitura: READMEs, manifestos e pontos de entrada primeiro (do mais
+    raso ao mais fundo); o resto por relevância à `query` e, sem ela ou no
+    empate, do menor para o maior. A ordem é determinística para o cursor.
+    """
+    terms = _query_terms(query)
+
+    def sort_key(repo_file: RepoFile) -> Tuple:
+        tier = _tier(repo_file.path)
+        if tier < 3:
+            return (tier, repo_file.path.count("/"), 0.0, 0, repo_file.path)
+        score = _relevance(repo_file, terms) if terms else 0.0
+        return (tier, 0, -score, repo_file.tokens, repo_file.path)
+
+    return sorted(files, key=sort_key)
+
+
+# --- Página ---
+
+def _section_overhead(repo_file: RepoFile) -> int:
+    # Cabeçalho `## File:`, cercas e linguagem
+    return estimate_tokens(repo_file.path) + 12
+
+
+def _capped_tree(paths: Sequence[str], budget: int) -> Tuple[str, int]:
+    lines = directory_tree(paths).splitlines()
+    used, kept = 0, 0
+    for line in lines:
+        tokens = estimate_tokens(line) + 1
+        if used + tokens > budget:
+            break
+        used += tokens
+        kept += 1
+    tree = "\n".join(lines[:kept])
+    if kept < len(lines):
+        tree += f"\n... (+{len(lines) - kept} linhas)"
+    return tree, used
+
+
+def _fit_chars(text: str, limit: int) -> int:
+    """Maior prefixo de `text` com até `limit` tokens (ao menos 1 caractere, para o cursor andar)."""
+    # Cada token tem ao menos 1 caractere e, fora blocos de espaço, no máximo 4
+    lo, hi = min(len(text), max(1, limit)), min(len(text), max(1, limit) * 4)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= limit:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _span(lines: Sequence[str], line: int, end: int, column: int) -> str:
+    if column:
+        return f" (linhas {line + 1}-{end} de {len(lines)}, a partir do caractere {column + 1} da linha {line + 1})"
+    return f" (linhas {line + 1}-{end} de {len(lines)})"
+
+
+def build_page(
+    manifest: RepoManifest,
+    ranked: Sequence[RepoFile],
+    title: str,
+    budget: int,
+    fingerprint: str,
+    page: int = 0,
+    index: int = 0,
+    line: int = 0,
+    query: str = "",
+    column: int = 0
+) -> RepoPage:
+    """Monta a página a partir de (índice, linha, caractere) em `ranked`, dentro de `budget` tokens."""
+    parts: List[str] = []
+    used = 0
+    budget_total, budget = budget, budget - PAGE_OVERHEAD_TOKENS - estimate_tokens(title)
+    if page == 0:
+        tree, used = _capped_tree(manifest.paths, int(budget * TREE_BUDGET_RATIO))
+        parts.append(f"# Directory Structure\n```\n{tree}\n```\n\n")
+
+    first_index, files = index, 0
+    while index < len(ranked):
+        repo_file = ranked[index]
+        overhead = _section_overhead(repo_file)
+        remaining = budget - used
+        resumed = bool(line or column)
+        lines = repo_file.content.splitlines(keepends=True) if resumed else None
+        if resumed:
+            rest_tokens = estimate_tokens(lines[line][column:]) + sum(estimate_tokens(text) for text in lines[line + 1:])
+        else:
+            rest_tokens = repo_file.tokens
+
+        if rest_tokens + overhead <= remaining:
+            if resumed:
+                partial = RepoFile(repo_file.path, lines[line][column:] + "".join(lines[line + 1:]), 0)
+                parts.append(render_file(partial, _span(lines, line, len(lines), column)))
+            else:
+                parts.append(render_file(repo_file))
+            used += rest_tokens + overhead
+            files += 1
+            index, line, column = index + 1, 0, 0
+            continue
+
+        # Cabe inteiro numa página própria, ou sobra pouco espaço: fica para a próxima
+        if files and (rest_tokens + overhead <= budget or remaining < budget * SPLIT_MIN_RATIO):
+            break
+
+        # Maior que a página: entra o quanto couber, linha a linha, e o cursor guarda a linha
+        lines = lines or repo_file.content.splitlines(keepends=True)
+        end, taken = line, 0
+        while end < len(lines):
+            tokens = estimate_tokens(lines[end][column:] if end == line else lines[end])
+            if taken + tokens + overhead > remaining:
+                break
+            taken += tokens
+            end += 1
+
+        if end == line < len(lines):
+            # Nem a primeira linha cabe (arquivo minificado ou gerado): corta por caracteres
+            text = lines[line][column:]
+            cut = _fit_chars(text, remaining - overhead)
+            taken = estimate_tokens(text[:cut])
+            partial = RepoFile(repo_file.path, text[:cut], 0)
+            suffix = f" (linha {line + 1} de {len(lines)}, caracteres {column + 1}-{column + cut} de {len(lines[line])})"
+            parts.append(render_file(partial, suffix))
+            column += cut
+            if column >= len(lines[line]):
+                line, column = line + 1, 0
+        else:
+            partial = RepoFile(repo_file.path, lines[line][column:] + "".join(lines[line + 1:end]), 0)
+            parts.append(render_file(partial, _span(lines, line, end, column)))
+            line, column = end, 0
+        used += taken + overhead
+        files += 1
+        if line >= len(lines):
+            index, line = index + 1, 0
+        break
+
+    cursor = encode_cursor(fingerprint, page + 1, index, line, query, column) if index < len(ranked) else None
+    last_index = index if line or column else index - 1
+    listed = f"arquivos {first_index + 1}-{last_index + 1} de {len(ranked)}" if files else "nenhum arquivo de texto"
+    header = f"# {title}\nPágina {page + 1}: {listed} na ordem de leitura, ~{used} de {budget_total} tokens.\n\n"
+    if cursor:
+        footer = f"Há mais arquivos. Próxima página: chame novamente com cursor=\"{cursor}\".\n"
+    else:
+        footer = "Fim do repositório: todos os arquivos foram lidos.\n"
+    return RepoPage(header + "".join(parts) + footer, cursor, manifest.commit, page + 1, files, used)
+
+
+# --- Manifesto ---
+
+def _scan(root: Path) -> Tuple[List[str], List[RepoFile]]:
+    paths = list_repo_files(root)
+    return paths, count_tokens(list(iter_repo_files(root, paths)))
+
+
+def _manifest_options(options: CloneOptions) -> list:
+    return ["manifest", MANIFEST_VERSION, READ_REPO_PACKER_MAX_FILE_BYTES, *options.sparse_paths]
+
+
+async def load_manifest(
+    repo_key: str,
+    source_url: str,
+    branch: str,
+    options: CloneOptions
+) -> Tuple[RepoManifest, str]:
+    """
+    Manifesto da ponta da branch e sua impressão digital (vai no cursor).
+
+    Usa o cache de contexto empacotado (chave com o commit), então as páginas
+    seguintes custam um `git ls-remote` e não clonam de novo.
+    """
+    cache = get_context_cache()
+    manifest_options = _manifest_options(options)
+    if cache is not None:
+        commit = await resolve_commit(repo_key, source_url, branch)
+        key = cache.key(repo_key, commit, manifest_options)
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return RepoManifest.loads(cached), key[:16]
+
+    async with checkout_repo(repo_key, source_url, branch, options) as path:
+        try:
+            paths, files = await asyncio.to_thread(_scan, path)
+        except Exception as e:
+            raise RepoPackError(f"Erro ao ler os arquivos do repositório: {e}") from e
+        commit = await run_git("rev-parse", "HEAD", cwd=path)
+
+    manifest = RepoManifest(commit, paths, files)
+    key = PackedContextCache.key(repo_key, commit, manifest_options)
+    if cache is not None:
+        try:
+            await asyncio.to_thread(cache.put, key, manifest.dumps())
+        except Exception as e:
+            logger.warning("Falha ao gravar o manifesto de '%s' no cache: %s", repo_key, e)
+    return manifest, key[:16]
+
+
+def clamp_budget(token_budget: Optional[int]) -> int:
+    if not token_budget or token_budget <= 0:
+        token_budget = READ_REPO_PAGE_TOKENS
+    return max(READ_REPO_PAGE_MIN_TOKENS, min(READ_REPO_PAGE_MAX_TOKENS, int(token_budget)))
+
+
+async def read_repo_page(
+    repo_key: str,
+    source_url: str,
+    branch: str,
+    token_budget: Optional[int] = None,
+    cursor: str = "",
+    query: str = "",
+    options: Optional[CloneOptions] = None
+) -> RepoPage:
+    """
+    Uma página do contexto da branch, com no máximo `token_budget` tokens.
+
+    Sem `cursor`, começa pela árvore de diretórios e pelos arquivos mais
+    importantes (ordem de `rank_files`, com a `query`); com ele, continua de
+    onde a página anterior parou, com a mesma query. Se a branch andou desde o
+    cursor, recomeça da primeira página do commit novo.
+    """
+    options = options or CloneOptions()
+    budget = clamp_budget(token_budget)
+    state = decode_cursor(cursor) if cursor else None
+
+    manifest, fingerprint = await load_manifest(repo_key, source_url, branch, options)
+    notice = ""
+    if state is not None and state["k"] != fingerprint:
+        notice = f"> A branch mudou desde o cursor (agora em {manifest.commit[:12]}); recomeçando da primeira página.\n\n"
+        query, state = state["q"], None
+    elif state is not None:
+        query = state["q"]
+
+    ranked = await asyncio.to_thread(rank_files, manifest.files, query)
+    title = f"{repo_key} @ {branch} ({manifest.commit[:12]})"
+    if state is None:
+        page = build_page(manifest, ranked, title, budget, fingerprint, query=query)
+    else:
+        if state["i"] > len(ranked):
+            raise RepoReadError("Cursor inválido (fora do repositório); recomece sem cursor.")
+        page = build_page(manifest, ranked, title, budget, fingerprint, state["p"], state["i"], state["l"], query, state["c"])
+    if notice:
+        page.content = notice + page.content
+    return page
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .clone import CloneOptions, checkout_repo
+from .context import resolve_commit
+from .context_cache import get_context_cache
+from .errors import RepoPackError, RepoReadError
+from .index import INDEX_VERSION, READ_REPO_INDEX_CHUNK_LINES, RepoIndex, SearchHit, Symbol
+from .mirror import run_git
+from .packer import READ_REPO_PACKER_MAX_FILE_BYTES, RepoFile, file_language, iter_repo_files, list_repo_files
+
+logger = logging.getLogger(__name__)
+
+# Índices carregados em memória (LRU); os demais ficam no cache de contexto em disco
+READ_REPO_INDEX_MEMORY_ENTRIES = int(os.getenv("READ_REPO_INDEX_MEMORY_ENTRIES", "4"))
+# Por quanto tempo o commit resolvido da branch vale sem um novo `git ls-remote`
+READ_REPO_INDEX_REFRESH_SECONDS = float(os.getenv("READ_REPO_INDEX_REFRESH_SECONDS", "30"))
+READ_REPO_SEARCH_MAX_RESULTS = int(os.getenv("READ_REPO_SEARCH_MAX_RESULTS", "50"))
+READ_REPO_READ_FILE_MAX_LINES = int(os.getenv("READ_REPO_READ_FILE_MAX_LINES", "400"))
+
+
+def _index_tree(root: Path, commit: str, base: Optional[RepoIndex], changed: Optional[Sequence[str]]) -> Tuple[RepoIndex, int]:
+    """Índice do working tree e quantos arquivos foram lidos; com `base` e `changed`, só relê o que mudou."""
+    paths = list_repo_files(root)
+    if base is None or changed is None:
+        files = list(iter_repo_files(root, paths))
+        return RepoIndex.build(commit, files, paths), len(files)
+
+    # O diff diz o que mudou de conteúdo; a listagem nova cobre adições, remoções e mudanças de .gitignore
+    current, known, changed = set(paths), set(base.paths), set(changed)
+    to_read = [p for p in paths if p in changed or p not in known]
+    updates: Dict[str, Optional[RepoFile]] = {p: None for p in base.paths if p not in current}
+    updates.update(dict.fromkeys(to_read))
+    updates.update((f.path, f) for f in iter_repo_files(root, to_read))
+    return base.updated(commit, updates, paths), len(to_read)
+
+
+class RepoIndexStore:
+    """
+    Índices de busca por (repositório, commit), com atualização incremental.
+
+    Cada índice é persistido no cache de contexto empacotado (chave com o SHA
+    do commit) e os mais recentes ficam em memória. Quando a branch anda, o
+    índice do commit anterior é atualizado com o `git diff` entre os dois
+    commits: só os arquivos alterados são lidos e tokenizados de novo.
+    """
+
+    def __init__(self, memory_entries: int = READ_REPO_INDEX_MEMORY_ENTRIES):
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple, RepoIndex]" = OrderedDict()
+        self._heads: Dict[Tuple, Tuple[str, float]] = {}
+        self._locks: Dict[Tuple, asyncio.Lock] = {}
+        self._guard = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "builds": 0, "incremental_updates": 0, "files_indexed": 0}
+
+    @staticmethod
+    def options_key(options: CloneOptions) -> List:
+        # O modo de clone não muda o índice; os caminhos do sparse, sim
+        return ["index", INDEX_VERSION, READ_REPO_PACKER_MAX_FILE_BYTES, READ_REPO_INDEX_CHUNK_LINES, *options.sparse_paths]
+
+    async def get(self, repo_key: str, source_url: str, branch: str, options: Optional[CloneOptions] = None) -> RepoIndex:
+        """Índice da ponta da branch: da memória, do disco, atualizado a partir do anterior ou construído."""
+        options = options or CloneOptions()
+        opts = self.options_key(options)
+        head_id = (repo_key.lower(), branch, tuple(opts))
+        lock = self._locks.setdefault(head_id, asyncio.Lock())
+        async with lock:
+            head = self._heads.get(head_id)
+            if head and time.monotonic() - head[1] < READ_REPO_INDEX_REFRESH_SECONDS:
+                index = self._memory_get(repo_key, head[0], opts)
+                if index is not None:
+                    return index
+
+            commit = await resolve_commit(repo_key, source_url, branch)
+            index = await self.load(repo_key, commit, options)
+            if index is None:
+                base = await self._base_index(repo_key, branch, head_id, options)
+                index = await self._build(repo_key, source_url, branch, options, base)
+                await self._persist(repo_key, branch, index, opts)
+            self._heads[head_id] = (index.commit, time.monotonic())
+            return index
+
+    async def load(self, repo_key: str, commit: str, options: Optional[CloneOptions] = None) -> Optional[RepoIndex]:
+        """Índice já construído de (repositório, commit), sem git; None se não existe."""
+        opts = self.options_key(options or CloneOptions())
+        index = self._memory_get(repo_key, commit, opts)
+        if index is not None:
+            return index
+        cache = get_context_cache()
+        if cache is None:
+            return None
+        data = await asyncio.to_thread(cache.get, cache.key(repo_key, commit, opts))
+        if data is None:
+            return None
+        try:
+            index = await asyncio.to_thread(RepoIndex.loads, data)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Índice de '%s' (%s) inválido no cache: %s", repo_key, commit[:12], e)
+            return None
+        self.stats["disk_hits"] += 1
+        self._memory_put(repo_key, commit, opts, index)
+        return index
+
+    async def _base_index(self, repo_key: str, branch: str, head_id: Tuple, options: CloneOptions) -> Optional[RepoIndex]:
+        """Índice do último commit indexado da branch (memória ou ponteiro no disco), base do diff."""
+        head = self._heads.get(head_id)
+        commit = head[0] if head else None
+        cache = get_context_cache()
+        if commit is None and cache is not None:
+            commit = await asyncio.to_thread(cache.get, self._head_key(cache, repo_key, branch, self.options_key(options)))
+        return await self.load(repo_key, commit, options) if commit else None
+
+    async def _build(
+        self,
+        repo_key: str,
+        source_url: str,
+        branch: str,
+        options: CloneOptions,
+        base: Optional[RepoIndex]
+    ) -> RepoIndex:
+        async with checkout_repo(repo_key, source_url, branch, options) as path:
+            commit = await run_git("rev-parse", "HEAD", cwd=path)
+            changed = None
+            if base is not None:
+                try:
+                    diff = await run_git("diff", "--name-only", "--no-renames", "-z", base.commit, commit, cwd=path)
+                    changed = [p for p in diff.split("\0") if p]
+                except RepoReadError as e:
+                    # Commit base fora do clone (shallow, force push): reconstrói do zero
+                    logger.info("Sem diff de '%s' a partir de %s, reindexando: %s", repo_key, base.commit[:12], e)
+            try:
+                index, files = await asyncio.to_thread(_index_tree, path, commit, base, changed)
+            except Exception as e:
+                raise RepoPackError(f"Erro ao indexar o repositório: {e}") from e
+
+        if changed is None:
+            self.stats["builds"] += 1
+            logger.info("Índice de '%s' (%s) construído com %d arquivos", repo_key, commit[:12], files)
+        else:
+            self.stats["incremental_updates"] += 1
+            logger.info("Índice de '%s' atualizado de %s para %s (%d arquivos relidos)",
+                        repo_key, base.commit[:12], commit[:12], files)
+        self.stats["files_indexed"] += files
+        return index
+
+    async def _persist(self, repo_key: str, branch: str, index: RepoIndex, opts: List) -> None:
+        self._memory_put(repo_key, index.commit, opts, index)
+        cache = get_context_cache()
+        if cache is None:
+            return
+        try:
+            await asyncio.to_thread(cache.put, cache.key(repo_key, index.commit, opts), index.dumps())
+            await asyncio.to_thread(cache.put, self._head_key(cache, repo_key, branch, opts), index.commit)
+        except Exception as e:
+            logger.warning("Falha ao gravar o índice de '%s' no cache: %s", repo_key, e)
+
+    @staticmethod
+    def _head_key(cache, repo_key: str, branch: str, opts: List) -> str:
+        return cache.key(repo_key, f"refs/heads/{branch}", ["index-head", *opts])
+
+    def _memory_get(self, repo_key: str, commit: str, opts: List) -> Optional[RepoIndex]:
+        key = (repo_key.lower(), commit, tuple(opts))
+        with self._guard:
+            index = self._memory.get(key)
+            if index is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            return index
+
+    def _memory_put(self, repo_key: str, commit: str, opts: List, index: RepoIndex) -> None:
+        with self._guard:
+            self._memory[(repo_key.lower(), commit, tuple(opts))] = index
+            while len(self._memory) > max(self.memory_entries, 1):
+                self._memory.popitem(last=False)
+
+
+_index_store_instance: Optional[RepoIndexStore] = None
+_index_store_lock = threading.Lock()
+
+
+def get_index_store() -> RepoIndexStore:
+    """Lazy singleton factory for the RepoIndexStore."""
+    global _index_store_instance
+    if _index_store_instance:
+        return _index_store_instance
+
+    with _index_store_lock:
+        if _index_store_instance is None:
+            _index_store_instance = RepoIndexStore()
+
+    return _index_store_instance
+
+
+# --- Saída para o agente ---
+
+def render_search(
+    repo_key: str,
+    branch: str,
+    index: RepoIndex,
+    query: str,
+    hits: Sequence[SearchHit],
+    symbols: Sequence[Tuple[str, Symbol]]
+) -> str:
+    """Resultados em Markdown: símbolos definidos e trechos com recorte das linhas relevantes."""
+    parts = [f"# Busca por \"{query}\" em {repo_key} @ {branch} ({index.commit[:12]})\n"]
+    if symbols:
+        parts.append("\n## Símbolos\n")
+        parts.extend(f"- {symbol.kind} `{symbol.name}` em {path}:{symbol.line}\n" for path, symbol in symbols)
+    if not hits:
+        parts.append("\nNenhum trecho encontrado.\n")
+        return "".join(parts)
+
+    parts.append(f"\n## Trechos ({len(hits)})\n")
+    for position, hit in enumerate(hits, 1):
+        snippet_end = hit.snippet_start + hit.snippet.count("\n")
+        parts.append(
+            f"\n### {position}. {hit.path}:{hit.start}-{hit.end} (score {hit.score})\n"
+            f"````{file_language(hit.path)}\n{hit.snippet}\n````\n"
+            f"Linhas {hit.snippet_start}-{snippet_end}; read_file(\"{hit.path}\", {hit.start}, {hit.end}) lê o trecho inteiro.\n"
+        )
+    return "".join(parts)
+
+
+def render_lines(path: str, lines: List[str], start: int, end: int, total: int) -> str:
+    """Linhas numeradas de um arquivo, em Markdown."""
+    width = len(str(end))
+    numbered = "\n".join(f"{number:>{width}} | {line}" for number, line in enumerate(lines, start))
+    header = f"## {path} (linhas {start}-{end} de {total})\n" if lines else f"## {path} (sem linhas em {start}-{end} de {total})\n"
+    return f"{header}````{file_language(path)}\n{numbered}\n````\n"
+
+
+async def search_repo(
+    repo_key: str,
+    source_url: str,
+    branch: str,
+    query: str,
+    k: int = 10,
+    options: Optional[CloneOptions] = None
+) -> Tuple[RepoIndex, str]:
+    """Busca no índice da ponta da branch; devolve o índice (para read_file) e os resultados em Markdown."""
+    if not query or not query.strip():
+        raise RepoReadError("A busca não pode ser vazia.")
+    k = max(1, min(READ_REPO_SEARCH_MAX_RESULTS, int(k or 10)))
+    index = await get_index_store().get(repo_key, source_url, branch, options)
+    hits = await asyncio.to_thread(index.search, query, k)
+    symbols = index.find_symbols(query, limit=k)
+    return index, render_search(repo_key, branch, index, query, hits, symbols)
+
+
+def read_indexed_file(index: RepoIndex, path: str, start: int = 1, end: int = 0) -> str:
+    """Linhas de um arquivo do commit indexado, limitadas a READ_REPO_READ_FILE_MAX_LINES."""
+    try:
+        lines, start, end, total = index.read(path, start, end)
+    except KeyError:
+        raise RepoReadError(f"Arquivo '{path}' não está no índice (binário, ignorado ou inexistente).")
+    if len(lines) > READ_REPO_READ_FILE_MAX_LINES:
+        lines = lines[:READ_REPO_READ_FILE_MAX_LINES]
+        end = start + READ_REPO_READ_FILE_MAX_LINES - 1
+        return render_lines(path, lines, start, end, total) + f"Limite de {READ_REPO_READ_FILE_MAX_LINES} linhas; continue com start={end + 1}.\n"
+    return render_lines(path, lines, start, end, total)
@@ -1,59 +1,138 @@
 import logging
-import tempfile
-import asyncio
-from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .clone import CloneOptions
+from .context import pack_repo_context
+from .errors import RepoPackError, RepoReadError
+from .pages import RepoPage, read_repo_page as read_repo_page_from_source
+from .search import get_index_store, read_indexed_file, search_repo as search_repo_from_source
 
 logger = logging.getLogger(__name__)
 
 
+def _repo_source(repo_url: str, provider: str, username: str, token: str) -> Tuple[str, str]:
+    if not (username and token and provider):
+        raise RepoReadError("Configurações de autenticação incompletas (username, token ou provider).")
+
+    base_repo = repo_url.removesuffix(".git").removeprefix("https://").removeprefix("http://")
+
+    if provider not in base_repo:
+        raise RepoReadError(f"URL '{repo_url}' não pertence ao provedor '{provider}'.")
+
+    return base_repo, f"https://{username}:{token}@{base_repo}.git"
+
+
 async def read_repo_context(
     repo_url: str,
     branch: str,
     provider: str,
     username: str,
-    token: str
+    token: str,
+    clone_mode: str = "",
+    sparse_paths: Optional[List[str]] = None
 ) -> str:
-    """Clona um repositório e retorna o contexto via repomix."""
+    """Clona um repositório e retorna o contexto em Markdown (layout do repomix)."""
 
-    if not (username and token and provider):
-        raise RuntimeError("Configurações de autenticação incompletas (username, token ou provider).")
+    base_repo, source_url = _repo_source(repo_url, provider, username, token)
+    options = CloneOptions.from_params(mode=clone_mode, sparse_paths=sparse_paths)
 
-    base_repo = repo_url.removesuffix(".git").removeprefix("https://").removeprefix("http://")
+    try:
+        return await pack_repo_context(base_repo, source_url, branch, options)
+    except RepoPackError:
+        raise
+    except RepoReadError as e:
+        raise RepoReadError(f"Falha ao clonar '{repo_url}': {e}") from e
+    except RuntimeError:
+        raise
+    except Exception as e:
+        logger.exception("Erro ao ler repositório '%s'", repo_url)
+        raise RepoReadError(f"Erro inesperado: {e}") from e
 
-    if provider not in base_repo:
-        raise RuntimeError(f"URL '{repo_url}' não pertence ao provedor '{provider}'.")
 
-    source_url = f"https://{username}:{token}@{base_repo}.git"
+async def read_repo_page(
+    repo_url: str,
+    branch: str,
+    provider: str,
+    username: str,
+    token: str,
+    cursor: str = "",
+    query: str = "",
+    token_budget: int = 0,
+    clone_mode: str = "",
+    sparse_paths: Optional[List[str]] = None
+) -> RepoPage:
+    """Uma página do contexto do repositório, limitada a `token_budget` tokens; continue com `cursor`."""
+
+    base_repo, source_url = _repo_source(repo_url, provider, username, token)
+    options = CloneOptions.from_params(mode=clone_mode, sparse_paths=sparse_paths)
 
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmp_path = Path(tmpdir)
+        return await read_repo_page_from_source(base_repo, source_url, branch, token_budget, cursor, query, options)
+    except RepoPackError:
+        raise
+    except RepoReadError as e:
+        raise RepoReadError(f"Falha ao ler '{repo_url}': {e}") from e
+    except RuntimeError:
+        raise
+    except Exception as e:
+        logger.exception("Erro ao ler repositório '%s'", repo_url)
+        raise RepoReadError(f"Erro inesperado: {e}") from e
+
+
+async def search_repo(
+    repo_url: str,
+    branch: str,
+    query: str,
+    provider: str,
+    username: str,
+    token: str,
+    k: int = 10,
+    sparse_paths: Optional[List[str]] = None
+) -> str:
+    """Busca BM25 e de símbolos no índice da branch; retorna os trechos em Markdown."""
 
-            clone = await asyncio.create_subprocess_exec(
-                "git", "clone", "-b", branch, source_url, str(tmp_path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT
-            )
-            clone_out, _ = await clone.communicate()
+    base_repo, source_url = _repo_source(repo_url, provider, username, token)
+    options = CloneOptions.from_params(sparse_paths=sparse_paths)
 
-            if clone.returncode != 0:
-                raise RuntimeError(f"Falha ao clonar '{repo_url}': {clone_out.decode().strip()}")
+    try:
+        _, results = await search_repo_from_source(base_repo, source_url, branch, query, k, options)
+        return results
+    except RepoPackError:
+        raise
+    except RepoReadError as e:
+        raise RepoReadError(f"Falha ao pesquisar '{repo_url}': {e}") from e
+    except RuntimeError:
+        raise
+    except Exception as e:
+        logger.exception("Erro ao pesquisar repositório '%s'", repo_url)
+        raise RepoReadError(f"Erro inesperado: {e}") from e
 
-            repomix = await asyncio.create_subprocess_exec(
-                "npx", "-y", "repomix", "--stdout",
-                cwd=tmp_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await repomix.communicate()
 
-            if repomix.returncode != 0:
-                raise RuntimeError(f"Erro ao executar repomix: {stderr.decode().strip()}")
+async def read_repo_file(
+    repo_url: str,
+    branch: str,
+    path: str,
+    provider: str,
+    username: str,
+    token: str,
+    start: int = 1,
+    end: int = 0,
+    sparse_paths: Optional[List[str]] = None
+) -> str:
+    """Linhas [start, end] de um arquivo da ponta da branch, lidas do índice de busca."""
 
-            return stdout.decode().strip()
+    base_repo, source_url = _repo_source(repo_url, provider, username, token)
+    options = CloneOptions.from_params(sparse_paths=sparse_paths)
 
+    try:
+        index = await get_index_store().get(base_repo, source_url, branch, options)
+        return read_indexed_file(index, path, start, end)
+    except RepoPackError:
+        raise
+    except RepoReadError as e:
+        raise RepoReadError(f"Falha ao ler '{path}' de '{repo_url}': {e}") from e
     except RuntimeError:
         raise
     except Exception as e:
-        logger.exception("Erro ao ler repositório '%s'", repo_url)
-        raise RuntimeError(f"Erro inesperado: {e}") from e
+        logger.exception("Erro ao ler '%s' de '%s'", path, repo_url)
+        raise RepoReadError(f"Erro inesperado: {e}") from e
@@ -5,6 +5,8 @@ import google.cloud.logging
 from google.adk.cli.fast_api import get_fast_api_app
 
 from agents.container import services
+from agents.api import finops, metrics, read_repo, thoughts
+from agents.helpers.finops_persistence import shutdown_all_workers
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOCAL_DEVELOPMENT = os.getenv("LOCAL_DEVELOPMENT", "false").lower() == "true"
@@ -48,4 +50,11 @@ if __name__ == "__main__":
         port=8080,
         reload_agents=False,
     )
-    uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
+    app.include_router(thoughts.router)
+    app.include_router(finops.router)
+    app.include_router(metrics.router)
+    app.include_router(read_repo.router)
+    uvicorn.run(app, host="0.0.0.0", port=8080)
+
+    # Garante que relatórios FinOps enfileirados sejam enviados antes de encerrar
+    shutdown_all_workers()
\ No newline at end of file